@@ -0,0 +1,102 @@
+"""Streamlit-free analysis core for A/B/N tests."""
+from .analysis import (
+    analyze_files,
+    analyze_table,
+    find_experiment_files,
+    load_experiment_table,
+    split_table,
+    write_results,
+)
+from .bayes import (
+    DEFAULT_P2BB_METHOD,
+    JOINT_POSTERIOR_DRAWS,
+    P2BB_METHODS,
+    calculate_joint_posterior,
+    calculate_p2bb,
+    calculate_p2bb_matrix,
+    calculate_p2bb_pairs,
+)
+from .bootstrap import (
+    BOOTSTRAP_RESAMPLES,
+    BOOTSTRAP_WEIGHTS,
+    RATIO_METHODS,
+    bootstrap_ratios,
+    calculate_ratio_matrix,
+)
+from .cache import cache_stats, clear_cache, persistent_cache
+from .continuous import (
+    CONTINUOUS_P2BB_NODES,
+    accumulate_sufficient_stats,
+    calculate_continuous_matrix,
+    continuous_comparison_from_matrix,
+    merge_sufficient_stats,
+    sufficient_stats,
+    sufficient_stats_from_csv,
+)
+from .corrections import (
+    CORRECTION_METHODS,
+    DEFAULT_CORRECTION_METHOD,
+    adjust_p_values,
+    correct_matrices,
+    correct_pairs,
+)
+from .cuped import calculate_cuped_matrix, cuped_from_variants
+from .incremental import merge_metric_deltas, parse_metric_deltas, update_experiment
+from .ingest import (
+    CONTINUOUS_COLUMNS,
+    COVARIATE_COLUMNS,
+    DIMENSION_COLUMNS,
+    SEGMENT_COLUMN,
+    SEGMENT_TOTAL,
+    TABLE_COLUMNS,
+    TIME_COLUMN,
+    aggregate_table,
+    collapse_periods,
+    columns_to_table,
+    dimension_columns,
+    has_covariates,
+    has_time_series,
+    is_continuous_table,
+    load_metrics_table,
+    metric_keys,
+    normalize_metrics_table,
+    segment_table,
+    table_to_metrics,
+)
+from .intervals import (
+    LIFT_INTERVAL_METHODS,
+    RATE_INTERVAL_METHODS,
+    calculate_intervals,
+    credible_intervals,
+    lift_intervals,
+    rate_intervals,
+)
+from .parsing import (
+    columns_to_metrics,
+    convert_metrics_to_text,
+    iter_metric_rows,
+    parse_metrics_columns,
+    parse_metrics_data,
+)
+from .planning import calculate_mde, calculate_sample_size, plan_experiments
+from .rng import DEFAULT_SEED, counts_key, derive_rng
+from .sequential import SEQUENTIAL_MIXTURE_SD, calculate_sequential_test, sequential_decision
+from .sharing import decode_data_from_url, encode_data_to_url
+from .srm import SRM_ALPHA, calculate_srm_batch, calculate_table_srm, check_srm
+from .stats import (
+    ab_test_from_matrix,
+    calculate_ab_test,
+    calculate_all_pairwise_comparisons,
+    calculate_chi_square_batch,
+    calculate_chi_square_test,
+    calculate_metric_statistics,
+    calculate_pairwise_comparisons,
+    calculate_pairwise_matrix,
+    calculate_single_comparison,
+    calculate_table_results,
+    comparison_from_matrix,
+    update_metric_statistics,
+)
+from .store import experiment_id, load_experiment, results_key, save_experiment
+from .stratified import calculate_cmh_matrix, calculate_stratified_results
+from .timeseries import calculate_trajectory, extend_trajectory, series_from_table, update_trajectory
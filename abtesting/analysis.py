@@ -0,0 +1,183 @@
+"""Headless analysis pipeline: parse files, compute statistics, write result tables."""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import pandas as pd
+
+from .bayes import DEFAULT_P2BB_METHOD
+from .corrections import DEFAULT_CORRECTION_METHOD, correct_pairs
+from .ingest import (
+    DIMENSION_COLUMNS,
+    SEGMENT_COLUMN,
+    aggregate_table,
+    collapse_periods,
+    columns_to_table,
+    dimension_columns,
+    has_time_series,
+    load_metrics_table,
+    metric_keys,
+    normalize_metrics_table,
+    segment_table,
+)
+from .parsing import parse_metrics_columns
+from .rng import DEFAULT_SEED
+from .srm import SRM_ALPHA, calculate_table_srm
+from .stats import calculate_table_results
+from .stratified import calculate_stratified_results
+
+# Extensiones de archivo que se pueden analizar
+SUPPORTED_SUFFIXES = ('.txt', '.csv', '.parquet')
+RESULT_FORMATS = ('csv', 'json')
+# Tareas por proceso cuando no se indica el tamaño de bloque
+TASKS_PER_WORKER = 4
+
+def find_experiment_files(paths):
+    """Expand files and directories into the sorted list of analysable experiment files."""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(
+                child for child in path.iterdir()
+                if child.is_file() and child.suffix.lower() in SUPPORTED_SUFFIXES
+            ))
+        elif path.suffix.lower() in SUPPORTED_SUFFIXES:
+            files.append(path)
+        else:
+            raise ValueError(f"Formato de archivo no soportado: {path}")
+    return files
+
+def load_experiment_table(path, dimensions=None):
+    """Load a .txt, .csv or .parquet experiment file into the metrics table."""
+    path = Path(path)
+    if path.suffix.lower() == '.txt':
+        with open(path, encoding='utf-8') as source:
+            table = columns_to_table(parse_metrics_columns(source))
+    else:
+        table = load_metrics_table(path, dimensions=dimensions)
+    
+    # Sin título de experimento, usar el nombre del archivo
+    if '' in table['experiment'].cat.categories:
+        table['experiment'] = table['experiment'].cat.rename_categories({'': path.stem})
+    return table
+
+def split_table(table, chunksize):
+    """Split a metrics table into sub-tables of at most chunksize whole metrics, in order."""
+    group_id = table.groupby(metric_keys(table), sort=False, observed=True).ngroup().to_numpy()
+    chunk_id = group_id // chunksize
+    return [chunk for _, chunk in table.groupby(chunk_id, sort=True)]
+
+def _analyze_chunk(table, p2bb_method, seed):
+    """Worker task: analyse one chunk of metrics."""
+    return calculate_table_results(table, p2bb_method=p2bb_method, seed=seed)
+
+def analyze_table(table, p2bb_method=DEFAULT_P2BB_METHOD, workers=1, chunksize=None, seed=DEFAULT_SEED,
+                  correction=DEFAULT_CORRECTION_METHOD, srm_weights=None, srm_alpha=SRM_ALPHA, skip_srm=True):
+    """Analyse a metrics table, optionally spreading chunks of metrics across a process pool.
+    
+    workers=None uses every CPU. Results are identical for any worker count
+    or chunk size because each metric draws from its own seeded stream. The
+    multiple-comparison correction runs once over all pairs of each
+    experiment, after the chunks are merged. Every metric is first checked
+    for sample ratio mismatch against srm_weights (see calculate_table_srm)
+    and, with skip_srm, experiments with a mismatch in any metric are left
+    out of the pairwise and Bayesian computation. The check is returned as
+    an 'srm' table. Time-series exports are first summed over their periods
+    (see collapse_periods).
+    """
+    # Una fila por periodo no es una variante más: se suman los periodos antes de agrupar
+    table = collapse_periods(table)
+    
+    # Un split roto invalida todos los p-values del experimento: se descarta antes de calcular
+    srm = calculate_table_srm(table, srm_weights, srm_alpha)
+    flagged = srm.loc[srm['srm_mismatch'].astype(bool), 'experiment'].unique()
+    srm['skipped'] = srm['experiment'].isin(flagged) & skip_srm
+    if skip_srm and len(flagged):
+        table = table[~table['experiment'].astype(str).isin(flagged)]
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    n_metrics = table.groupby(metric_keys(table), sort=False, observed=True).ngroups
+    if workers <= 1 or n_metrics <= 1:
+        results = calculate_table_results(table, p2bb_method=p2bb_method, seed=seed)
+    else:
+        if chunksize is None:
+            chunksize = math.ceil(n_metrics / (workers * TASKS_PER_WORKER))
+        chunks = split_table(table, chunksize)
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            parts = list(executor.map(_analyze_chunk, chunks, repeat(p2bb_method), repeat(seed)))
+        
+        # Los bloques se devuelven en orden, así que basta con concatenarlos
+        results = {}
+        for name in ('pairs', 'metrics'):
+            frames = [part[name] for part in parts if len(part[name])]
+            results[name] = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    
+    results['pairs'] = correct_pairs(results['pairs'], method=correction)
+    results['srm'] = srm
+    return results
+
+def analyze_files(paths, p2bb_method=DEFAULT_P2BB_METHOD, workers=1, chunksize=None, seed=DEFAULT_SEED,
+                  correction=DEFAULT_CORRECTION_METHOD, dimensions=None, segments=False, stratify=None,
+                  srm_weights=None, srm_alpha=SRM_ALPHA, skip_srm=True):
+    """Analyse every experiment file under paths in one batched computation.
+    
+    Exports with segment dimensions (dimensions, or the known ones by
+    default) are analysed on their totals or, with segments=True, for every
+    segment × metric (see segment_table); time-series exports are analysed
+    on their totals over every period. stratify names a dimension to add
+    a 'stratified' table of CMH tests pooled across its values. The SRM
+    options are passed to analyze_table; skipped experiments are left out
+    of the stratified table too.
+    """
+    files = find_experiment_files(paths)
+    if not files:
+        raise ValueError("No se encontraron archivos de experimentos para analizar")
+    # La dimensión de estratificación se conserva aunque no sea una de las conocidas
+    if stratify is not None and (dimensions is not None or stratify not in DIMENSION_COLUMNS):
+        dimensions = list(dict.fromkeys([*(dimensions or []), stratify]))
+    table = normalize_metrics_table(pd.concat(
+        [load_experiment_table(path, dimensions) for path in files], ignore_index=True
+    ), dimensions)
+    dimension_table = table
+    
+    if segments:
+        table = segment_table(table)
+    elif dimension_columns(table) or SEGMENT_COLUMN in table.columns or has_time_series(table):
+        table = aggregate_table(table)
+    results = analyze_table(
+        table, p2bb_method=p2bb_method, workers=workers, chunksize=chunksize, seed=seed, correction=correction,
+        srm_weights=srm_weights, srm_alpha=srm_alpha, skip_srm=skip_srm
+    )
+    if stratify is not None:
+        skipped = results['srm'].loc[results['srm']['skipped'], 'experiment'].unique()
+        dimension_table = dimension_table[~dimension_table['experiment'].astype(str).isin(skipped)]
+        results['stratified'] = correct_pairs(
+            calculate_stratified_results(dimension_table, stratify), method=correction
+        )
+    return results
+
+def write_results(results, output_dir, formats=('csv',)):
+    """Write every result table as <name>.csv and/or <name>.json and return the paths.
+    
+    results maps table names to DataFrames, e.g. the output of
+    analyze_files ('pairs', 'metrics', 'srm' and, with stratify,
+    'stratified').
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    written = []
+    for name, frame in results.items():
+        for file_format in formats:
+            if file_format not in RESULT_FORMATS:
+                raise ValueError(f"Formato de salida desconocido: {file_format}")
+            path = output_dir / f"{name}.{file_format}"
+            if file_format == 'csv':
+                frame.to_csv(path, index=False)
+            else:
+                frame.to_json(path, orient='records', indent=2)
+            written.append(path)
+    return written
@@ -0,0 +1,300 @@
+"""Bayesian probability to beat baseline (P2BB) for Beta posteriors."""
+import functools
+
+import numpy as np
+from scipy import special
+from scipy.special import betaln, logsumexp
+from scipy.stats import beta
+
+from .rng import counts_key, derive_rng
+
+
+# Métodos disponibles para P2BB: suma cerrada/cuadratura (exacto) o simulación
+P2BB_METHODS = ('exact', 'montecarlo')
+DEFAULT_P2BB_METHOD = 'exact'
+# Sobre este número de términos la suma cerrada se reemplaza por cuadratura
+P2BB_MAX_SUM_TERMS = 20000
+P2BB_TOLERANCE = 1e-10
+# Nodos de Gauss-Legendre para el cálculo vectorizado de P2BB en matrices: iniciales y tope al refinar
+P2BB_QUADRATURE_NODES = 64
+P2BB_MAX_QUADRATURE_NODES = 1024
+
+def _beta_std(a, b):
+    """Standard deviation of a Beta(a, b) distribution, stable for large counts."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    total = a + b
+    return np.sqrt(a * b / (total ** 2 * (total + 1)))
+
+def _p2bb_closed_form(alpha_a, beta_a, alpha_b, beta_b):
+    """Exact P(B > A) for two Beta posteriors, summing alpha_b terms."""
+    i = np.arange(alpha_b)
+    log_terms = (
+        betaln(alpha_a + i, beta_a + beta_b)
+        - np.log(beta_b + i)
+        - betaln(1 + i, beta_b)
+        - betaln(alpha_a, beta_a)
+    )
+    return float(min(1.0, np.exp(logsumexp(log_terms))))
+
+def calculate_p2bb(a_n, a_x, b_n, b_x, method=DEFAULT_P2BB_METHOD, tol=P2BB_TOLERANCE, n_simulations=10000, rng=None):
+    """Calculate P(B > A) for Beta(1, 1) priors, exactly or by Monte Carlo.
+    
+    Monte Carlo draws from rng, e.g. derive_rng(experiment, metric, a, b);
+    by default the stream is derived from the counts, so it is reproducible.
+    """
+    alpha_a, beta_a = a_x + 1, a_n - a_x + 1
+    alpha_b, beta_b = b_x + 1, b_n - b_x + 1
+    
+    if method == 'montecarlo':
+        if rng is None:
+            rng = derive_rng('p2bb', *counts_key([a_n, b_n], [a_x, b_x]))
+        a_posterior = rng.beta(alpha_a, beta_a, n_simulations)
+        b_posterior = rng.beta(alpha_b, beta_b, n_simulations)
+        return float(np.mean(b_posterior > a_posterior))
+    if method != 'exact':
+        raise ValueError(f"Método de P2BB desconocido: {method}. Opciones: {', '.join(P2BB_METHODS)}")
+    
+    # La suma cerrada tiene tantos términos como su parámetro; usando las simetrías
+    # P(B>A) = 1 - P(A>B) y p -> 1 - p se elige la forma con menos términos
+    candidates = [
+        (alpha_b, lambda: _p2bb_closed_form(alpha_a, beta_a, alpha_b, beta_b)),
+        (alpha_a, lambda: 1 - _p2bb_closed_form(alpha_b, beta_b, alpha_a, beta_a)),
+        (beta_a, lambda: _p2bb_closed_form(beta_b, alpha_b, beta_a, alpha_a)),
+        (beta_b, lambda: 1 - _p2bb_closed_form(beta_a, alpha_a, beta_b, alpha_b)),
+    ]
+    n_terms, closed_form = min(candidates, key=lambda candidate: candidate[0])
+    # Los términos restan betaln del orden de (a + b) log(a + b): su redondeo
+    # debe quedar bajo tol, si no se usa la cuadratura de calculate_p2bb_pairs
+    total = alpha_a + beta_a + alpha_b + beta_b
+    if n_terms <= P2BB_MAX_SUM_TERMS and np.finfo(float).eps * total * np.log(total) <= tol:
+        return closed_form()
+    
+    # Para conteos grandes, cuadratura vectorizada sobre las densidades Beta
+    return float(calculate_p2bb_pairs([a_n, b_n], [a_x, b_x], [0], [1], tol=tol)[0])
+
+# Con ambos parámetros sobre este valor la posterior es casi normal y su soporte
+# efectivo se toma como media ± P2BB_SUPPORT_SDS desviaciones (sin ppf iterativo)
+P2BB_NORMAL_SUPPORT_MIN = 100
+P2BB_SUPPORT_SDS = 10
+
+def _beta_support(alpha_post, beta_post, tol=P2BB_TOLERANCE):
+    """Interval leaving out less than tol / 5 of each Beta posterior's mass."""
+    mean = alpha_post / (alpha_post + beta_post)
+    sd = _beta_std(alpha_post, beta_post)
+    lower = np.clip(mean - P2BB_SUPPORT_SDS * sd, 0.0, 1.0)
+    upper = np.clip(mean + P2BB_SUPPORT_SDS * sd, 0.0, 1.0)
+    
+    # Posteriores sesgadas (pocas conversiones o pocas no conversiones): cuantiles exactos
+    skewed = np.minimum(alpha_post, beta_post) < P2BB_NORMAL_SUPPORT_MIN
+    if np.any(skewed):
+        lower[skewed] = beta.ppf(tol / 10, alpha_post[skewed], beta_post[skewed])
+        upper[skewed] = beta.isf(tol / 10, alpha_post[skewed], beta_post[skewed])
+    return lower, upper
+
+# Bajo este parámetro el resto de Stirling se calcula con gammaln; sobre él, con su serie asintótica
+P2BB_STIRLING_SERIES_MIN = 20
+
+def _stirling_remainder(z):
+    """lgamma(z) minus its Stirling approximation (z - 1/2) log z - z + log(2 pi) / 2."""
+    z = np.asarray(z, dtype=float)
+    direct = special.gammaln(z) - (z - 0.5) * np.log(z) + z - 0.5 * np.log(2 * np.pi)
+    inverse_sq = 1 / z ** 2
+    series = (1 / 12 - inverse_sq * (1 / 360 - inverse_sq * (1 / 1260 - inverse_sq / 1680))) / z
+    return np.where(z < P2BB_STIRLING_SERIES_MIN, direct, series)
+
+def _log_relative_normalizer(alpha_post, beta_post):
+    """log of the integral of (t / m)^(a-1) ((1 - t) / (1 - m))^(b-1), m the posterior mean.
+    
+    Equals betaln(a, b) - (a - 1) log m - (b - 1) log(1 - m), written in
+    Stirling form so no terms of order (a + b) log(a + b) cancel.
+    """
+    total = alpha_post + beta_post
+    return (
+        0.5 * np.log(2 * np.pi * alpha_post * beta_post / total ** 3)
+        + _stirling_remainder(alpha_post) + _stirling_remainder(beta_post) - _stirling_remainder(total)
+    )
+
+@functools.lru_cache(maxsize=None)
+def _gauss_legendre(n_nodes):
+    """Gauss-Legendre nodes and weights on [-1, 1], computed once per node count."""
+    return np.polynomial.legendre.leggauss(n_nodes)
+
+def _posterior_nodes(alpha_post, beta_post, support, n_nodes):
+    """Gauss-Legendre nodes and density-weighted weights (..., variants, n_nodes) of each posterior.
+    
+    The log-density is evaluated as an offset from the posterior mean, so it
+    stays accurate to rounding even with counts in the billions.
+    """
+    nodes, weights = _gauss_legendre(int(n_nodes))
+    lower, upper = support
+    total = alpha_post + beta_post
+    mean = (alpha_post / total)[..., None]
+    width = (upper - lower)[..., None]
+    offset = (lower[..., None] - mean) + width * (nodes + 1) / 2
+    log_density = (
+        (alpha_post[..., None] - 1) * np.log1p(offset / mean)
+        + (beta_post[..., None] - 1) * np.log1p(-offset / (beta_post / total)[..., None])
+        - _log_relative_normalizer(alpha_post, beta_post)[..., None]
+    )
+    return mean + offset, width * weights / 2 * np.exp(log_density)
+
+def _p2bb_pairs_quadrature(alpha_post, beta_post, first, second, t, w):
+    """P(second > first) for the given variant index pairs from each posterior's quadrature nodes."""
+    # Para cada par se integra sobre la densidad más concentrada, donde la CDF
+    # de la otra variante es suave: P(j > i) = ∫ f_j F_i  o  1 - ∫ f_i F_j
+    sd = _beta_std(alpha_post, beta_post)
+    second_is_narrower = sd[..., second] <= sd[..., first]
+    narrow = np.where(second_is_narrower, second, first)
+    wide = np.where(second_is_narrower, first, second)
+    
+    narrow_nodes = np.take_along_axis(t, narrow[..., None], axis=-2)
+    narrow_weights = np.take_along_axis(w, narrow[..., None], axis=-2)
+    wide_cdf = special.betainc(
+        np.take_along_axis(alpha_post, wide, axis=-1)[..., None],
+        np.take_along_axis(beta_post, wide, axis=-1)[..., None],
+        narrow_nodes
+    )
+    integral = np.clip(np.sum(narrow_weights * wide_cdf, axis=-1), 0.0, 1.0)
+    return np.where(second_is_narrower, integral, 1 - integral)
+
+def _p2bb_pairs_within_tol(alpha_post, beta_post, first, second, n_nodes, tol):
+    """_p2bb_pairs_quadrature with, per metric, the fewest doublings of n_nodes that integrate to tol.
+    
+    A metric's node count is accepted once, for every posterior, both the
+    density and P(X > Y) for two copies of it (density times its own CDF,
+    exactly 1 / 2) integrate within tol on its support. In each pair the
+    CDF of the wider posterior is smoother than that, so the check bounds
+    the error of the whole integral, truncation included. Only V integrals
+    are checked per refinement; the V (V - 1) / 2 pair integrals are
+    computed once per metric. Refinement stops at P2BB_MAX_QUADRATURE_NODES.
+    """
+    # Lote plano (métricas, variantes): cada métrica elige sus nodos por separado
+    batch_shape = alpha_post.shape[:-1]
+    alpha_post = alpha_post.reshape(-1, alpha_post.shape[-1])
+    beta_post = beta_post.reshape(-1, beta_post.shape[-1])
+    lower, upper = _beta_support(alpha_post, beta_post, tol)
+    
+    metric_nodes = np.full(len(alpha_post), n_nodes)
+    pending = np.arange(len(alpha_post))
+    while len(pending):
+        t, w = _posterior_nodes(alpha_post[pending], beta_post[pending], (lower[pending], upper[pending]), n_nodes)
+        self_cdf = special.betainc(alpha_post[pending][..., None], beta_post[pending][..., None], t)
+        error = np.maximum(np.abs(w.sum(axis=-1) - 1), np.abs(np.sum(w * self_cdf, axis=-1) - 0.5))
+        pending = pending[np.any(error > tol, axis=-1)]
+        if n_nodes >= P2BB_MAX_QUADRATURE_NODES:
+            break
+        n_nodes *= 2
+        metric_nodes[pending] = n_nodes
+    
+    result = np.empty((len(alpha_post), len(first)))
+    for nodes in np.unique(metric_nodes):
+        rows = np.flatnonzero(metric_nodes == nodes)
+        t, w = _posterior_nodes(alpha_post[rows], beta_post[rows], (lower[rows], upper[rows]), nodes)
+        result[rows] = _p2bb_pairs_quadrature(alpha_post[rows], beta_post[rows], first, second, t, w)
+    return result.reshape(batch_shape + (len(first),))
+
+def _p2bb_matrix_quadrature(alpha_post, beta_post, n_nodes, tol):
+    """P(j > i) for all pairs by Gauss-Legendre quadrature over the narrower posterior."""
+    n_variants = alpha_post.shape[-1]
+    first, second = np.triu_indices(n_variants, 1)
+    p_second_beats_first = _p2bb_pairs_within_tol(alpha_post, beta_post, first, second, n_nodes, tol)
+    
+    matrix = np.empty(alpha_post.shape + (n_variants,))
+    matrix[..., first, second] = p_second_beats_first
+    matrix[..., second, first] = 1 - p_second_beats_first
+    return matrix
+
+def calculate_p2bb_pairs(n, x, first, second, n_nodes=P2BB_QUADRATURE_NODES, tol=P2BB_TOLERANCE):
+    """Calculate exact P(variant second[k] > variant first[k]) for selected pairs only.
+    
+    Uses the same quadrature as calculate_p2bb_matrix, so with first < second
+    the values match the corresponding matrix entries within tol. n_nodes is
+    the starting node count; it is doubled until the integration error is
+    below tol.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    return _p2bb_pairs_within_tol(
+        x + 1, n - x + 1, np.asarray(first, dtype=int), np.asarray(second, dtype=int), n_nodes, tol
+    )
+
+def _posterior_draws(alpha_post, beta_post, n_draws, rng):
+    """Joint draws (..., draws, variants) from independent Beta posteriors."""
+    return rng.beta(
+        alpha_post[..., None, :], beta_post[..., None, :],
+        size=alpha_post.shape[:-1] + (n_draws, alpha_post.shape[-1])
+    )
+
+def _pairwise_beats(draws):
+    """P(variant j > variant i) for every pair, from the same joint draws."""
+    return np.mean(draws[..., :, None, :] > draws[..., :, :, None], axis=-3)
+
+def calculate_p2bb_matrix(n, x, method=DEFAULT_P2BB_METHOD, n_nodes=P2BB_QUADRATURE_NODES,
+                          n_simulations=10000, rng=None, tol=P2BB_TOLERANCE):
+    """Calculate P(variant j > variant i) for every pair of variants in one vectorized pass.
+    
+    The exact method starts from n_nodes quadrature nodes and doubles them
+    until the integration error of every entry is below tol. For Monte
+    Carlo, rng is a numpy Generator, or a list with one Generator per row
+    of a 2-D batch of metrics so each metric has its own stream. By default
+    the stream is derived from the counts, so it is reproducible.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    alpha_post = x + 1
+    beta_post = n - x + 1
+    
+    if method == 'montecarlo' and isinstance(rng, (list, tuple)):
+        return np.stack([
+            calculate_p2bb_matrix(n[k], x[k], method, n_nodes, n_simulations, rng=generator, tol=tol)
+            for k, generator in enumerate(rng)
+        ])
+    if method == 'montecarlo':
+        # Una sola matriz de muestras (..., simulaciones, variantes) para todos los pares
+        if rng is None:
+            rng = derive_rng('p2bb_matrix', *counts_key(n, x))
+        draws = _posterior_draws(alpha_post, beta_post, n_simulations, rng)
+        matrix = _pairwise_beats(draws)
+    elif method == 'exact':
+        matrix = _p2bb_matrix_quadrature(alpha_post, beta_post, n_nodes, tol)
+    else:
+        raise ValueError(f"Método de P2BB desconocido: {method}. Opciones: {', '.join(P2BB_METHODS)}")
+    
+    # Diagonal: una variante contra sí misma
+    diagonal = np.arange(n.shape[-1])
+    matrix[..., diagonal, diagonal] = 0.5
+    return matrix
+
+# Muestras de la posterior conjunta por métrica
+JOINT_POSTERIOR_DRAWS = 20000
+
+def calculate_joint_posterior(n, x, n_draws=JOINT_POSTERIOR_DRAWS, rng=None):
+    """Multi-arm Bayesian summary of one metric from a single joint posterior simulation.
+    
+    Draws one (draws, variants) matrix from the Beta(1, 1)-prior posteriors
+    and derives, from those same draws, each variant's 'prob_best' (chance
+    of having the highest rate), 'expected_loss' (expected rate lost by
+    choosing it, E[max - rate]) and the pairwise 'p2bb' matrix, so every
+    number is mutually consistent. By default the stream is derived from
+    the counts, so results are reproducible.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if rng is None:
+        rng = derive_rng('joint_posterior', *counts_key(n, x))
+    draws = _posterior_draws(x + 1, n - x + 1, n_draws, rng)
+    
+    # Empates (prácticamente imposibles con muestras continuas) van a la primera variante
+    best = np.argmax(draws, axis=-1)
+    prob_best = np.mean(best[..., None] == np.arange(n.shape[-1]), axis=-2)
+    expected_loss = np.mean(np.max(draws, axis=-1, keepdims=True) - draws, axis=-2)
+    
+    p2bb = _pairwise_beats(draws)
+    diagonal = np.arange(n.shape[-1])
+    p2bb[..., diagonal, diagonal] = 0.5
+    return {
+        'prob_best': prob_best,
+        'expected_loss': expected_loss,
+        'p2bb': p2bb
+    }
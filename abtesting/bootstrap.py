@@ -0,0 +1,166 @@
+"""Bootstrap and jackknife comparisons for ratio metrics with unit-level (clustered) data."""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+from scipy import stats
+
+from .rng import DEFAULT_SEED, derive_rng
+from .stats import compare_means
+
+# Métodos de remuestreo: bootstrap con pesos aleatorios o jackknife (sin simulación)
+RATIO_METHODS = ('bootstrap', 'jackknife')
+BOOTSTRAP_WEIGHTS = ('poisson', 'multinomial')
+BOOTSTRAP_RESAMPLES = 2000
+# Remuestreos por bloque y unidades por bloque: la matriz de pesos nunca supera su producto
+BOOTSTRAP_CHUNK_SIZE = 100
+BOOTSTRAP_UNIT_BLOCK = 50000
+
+
+def _resample_totals(numerator, denominator, n_resamples, weights, rng, unit_block):
+    """Weighted (numerator, denominator) sums of n_resamples bootstrap replicates of one variant."""
+    n_units = len(numerator)
+    starts = np.arange(0, n_units, unit_block)
+    block_sizes = np.minimum(starts + unit_block, n_units) - starts
+    
+    # Multinomial: primero cuántas unidades caen en cada bloque, luego dentro del bloque
+    if weights == 'multinomial':
+        block_totals = rng.multinomial(n_units, block_sizes / n_units, size=n_resamples)
+    
+    numerator_totals = np.zeros(n_resamples)
+    denominator_totals = np.zeros(n_resamples)
+    for k, (start, size) in enumerate(zip(starts, block_sizes)):
+        if weights == 'poisson':
+            block_weights = rng.poisson(1.0, size=(n_resamples, size))
+        else:
+            block_weights = rng.multinomial(block_totals[:, k], np.full(size, 1 / size))
+        numerator_totals += block_weights @ numerator[start:start + size]
+        denominator_totals += block_weights @ denominator[start:start + size]
+    return numerator_totals, denominator_totals
+
+def _bootstrap_chunk(numerators, denominators, chunk, n_resamples, weights, seed, unit_block):
+    """Worker task: ratios (resamples, variants) of one chunk of replicates, from its own stream."""
+    rng = derive_rng('ratio_bootstrap', chunk, seed=seed)
+    ratios = np.empty((n_resamples, len(numerators)))
+    for v, (numerator, denominator) in enumerate(zip(numerators, denominators)):
+        numerator_totals, denominator_totals = _resample_totals(
+            numerator, denominator, n_resamples, weights, rng, unit_block
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios[:, v] = numerator_totals / denominator_totals
+    return ratios
+
+def bootstrap_ratios(numerators, denominators, n_resamples=BOOTSTRAP_RESAMPLES, weights='poisson',
+                     chunk_size=BOOTSTRAP_CHUNK_SIZE, workers=1, seed=DEFAULT_SEED, unit_block=BOOTSTRAP_UNIT_BLOCK):
+    """Bootstrap replicates (n_resamples, variants) of sum(numerator) / sum(denominator) per variant.
+    
+    Units are reweighted with Poisson(1) or multinomial weights instead of
+    copying resampled arrays, in chunks of chunk_size replicates × unit_block
+    units, so memory stays bounded for millions of units. Chunks can be
+    spread across worker processes (workers=None uses every CPU); each chunk
+    has its own seeded stream, so results do not depend on the worker count.
+    """
+    if weights not in BOOTSTRAP_WEIGHTS:
+        raise ValueError(f"Pesos de bootstrap desconocidos: {weights}. Opciones: {', '.join(BOOTSTRAP_WEIGHTS)}")
+    numerators = [np.asarray(values, dtype=float) for values in numerators]
+    denominators = [np.asarray(values, dtype=float) for values in denominators]
+    
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    chunk_args = (repeat(numerators), repeat(denominators), range(len(sizes)), sizes,
+                  repeat(weights), repeat(seed), repeat(unit_block))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(sizes) <= 1:
+        parts = list(map(_bootstrap_chunk, *chunk_args))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as executor:
+            parts = list(executor.map(_bootstrap_chunk, *chunk_args, chunksize=math.ceil(len(sizes) / workers)))
+    return np.concatenate(parts)
+
+def _ratio_point(numerators, denominators):
+    """Observed sum(numerator) / sum(denominator) of every variant."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.array([
+            np.sum(numerator) / np.sum(denominator) for numerator, denominator in zip(numerators, denominators)
+        ])
+
+def _bootstrap_matrix(numerators, denominators, alpha, **options):
+    """Pairwise matrices from percentile bootstrap intervals and bootstrap p-values."""
+    rate = _ratio_point(numerators, denominators)
+    ratios = bootstrap_ratios(numerators, denominators, **options)
+    n_resamples = len(ratios)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Diferencias y lifts de B (columna) sobre A (fila) en cada réplica
+        difference = ratios[:, None, :] - ratios[:, :, None]
+        lift = (ratios[:, None, :] / ratios[:, :, None] - 1) * 100
+        se = np.nanstd(difference, axis=0, ddof=1)
+        z_score = np.where(se > 0, (rate[None, :] - rate[:, None]) / se, 0.0)
+        relative_lift = np.where(rate[:, None] > 0, (rate[None, :] / rate[:, None] - 1) * 100, 0.0)
+    
+    # p-value por inversión del intervalo percentil, con corrección +1 para no devolver 0
+    below = (np.sum(difference <= 0, axis=0) + 1) / (n_resamples + 1)
+    above = (np.sum(difference >= 0, axis=0) + 1) / (n_resamples + 1)
+    p_value = np.minimum(2 * np.minimum(below, above), 1.0)
+    p2bb = np.mean(difference > 0, axis=0)
+    np.fill_diagonal(p2bb, 0.5)
+    
+    rate_lower, rate_upper = np.nanquantile(ratios, [alpha / 2, 1 - alpha / 2], axis=0)
+    lift_lower, lift_upper = np.nanquantile(lift, [alpha / 2, 1 - alpha / 2], axis=0)
+    return {
+        'rate': rate,
+        'rate_lower': rate_lower,
+        'rate_upper': rate_upper,
+        'se': se,
+        'z_score': z_score,
+        'p_value': p_value,
+        'relative_lift': relative_lift,
+        'lift_lower': lift_lower,
+        'lift_upper': lift_upper,
+        'significant': p_value < alpha,
+        'p2bb': p2bb
+    }
+
+def _jackknife_variance(numerator, denominator):
+    """Delete-one jackknife variance of sum(numerator) / sum(denominator), in closed form."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    n_units = len(numerator)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        leave_one_out = (numerator.sum() - numerator) / (denominator.sum() - denominator)
+    return (n_units - 1) / n_units * np.nansum((leave_one_out - np.nanmean(leave_one_out)) ** 2)
+
+def _jackknife_matrix(numerators, denominators, alpha):
+    """Pairwise matrices from jackknife standard errors and normal approximations."""
+    rate = _ratio_point(numerators, denominators)
+    variance = np.array([
+        _jackknife_variance(numerator, denominator) for numerator, denominator in zip(numerators, denominators)
+    ])
+    z = stats.norm.isf(alpha / 2)
+    return {
+        'rate': rate,
+        'rate_lower': rate - z * np.sqrt(variance),
+        'rate_upper': rate + z * np.sqrt(variance),
+        **compare_means(rate[:, None], variance[:, None], rate[None, :], variance[None, :], alpha)
+    }
+
+def calculate_ratio_matrix(numerators, denominators, method='bootstrap', alpha=0.05, **options):
+    """Calculate dense N×N comparison matrices for a ratio metric from per-unit data.
+    
+    numerators[v] and denominators[v] hold one value per randomization unit
+    (e.g. conversions and sessions of each user) of variant v, so the
+    resampling respects the clustering of sessions within users. The result
+    has the calculate_pairwise_matrix keys (rate is the ratio), so
+    ab_test_from_matrix and comparison_from_matrix give card-ready results.
+    options (n_resamples, weights, chunk_size, workers, seed, unit_block)
+    are passed to bootstrap_ratios.
+    """
+    if len(numerators) != len(denominators):
+        raise ValueError("Se necesita un array de numeradores y uno de denominadores por variante")
+    if method == 'bootstrap':
+        return _bootstrap_matrix(numerators, denominators, alpha, **options)
+    if method == 'jackknife':
+        return _jackknife_matrix(numerators, denominators, alpha)
+    raise ValueError(f"Método de remuestreo desconocido: {method}. Opciones: {', '.join(RATIO_METHODS)}")
@@ -0,0 +1,198 @@
+"""Persistent on-disk cache of computed statistics, shared across sessions and processes."""
+import atexit
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .serialization import dumps, loads
+
+# Ruta de la base SQLite del caché (configurable con ABTEST_CACHE_PATH); por defecto en el
+# directorio de caché del usuario, nunca en el directorio de trabajo de quien importa el paquete
+CACHE_PATH_ENV = 'ABTEST_CACHE_PATH'
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'abtesting',
+    'cache.sqlite3'
+)
+# Máximo de entradas (configurable con ABTEST_CACHE_MAX_ENTRIES; 0 desactiva el caché)
+CACHE_MAX_ENTRIES_ENV = 'ABTEST_CACHE_MAX_ENTRIES'
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+# Al superar el máximo se descartan las menos usadas hasta esta fracción del máximo
+CACHE_EVICTION_RATIO = 0.9
+# Hits acumulados en memoria antes de escribirlos a disco en una sola transacción
+CACHE_FLUSH_INTERVAL = 100
+# Versión del formato de los resultados: cambiarla invalida las entradas anteriores
+CACHE_VERSION = 3
+
+# Una conexión por proceso y ruta (las conexiones SQLite no sobreviven a un fork)
+_connections = {}
+# Contadores y last_used pendientes de escribir, por proceso y ruta
+_pending = {}
+# Los hilos de Streamlit comparten la conexión (sin transacción propia) y _pending:
+# toda lectura, escritura y vaciado pasa por este lock
+_lock = threading.RLock()
+
+def _cache_path():
+    return os.environ.get(CACHE_PATH_ENV, DEFAULT_CACHE_PATH)
+
+def _max_entries():
+    return int(os.environ.get(CACHE_MAX_ENTRIES_ENV, DEFAULT_CACHE_MAX_ENTRIES))
+
+def _connection(path=None):
+    """Return this process's connection to the cache, creating the schema on first use.
+
+    Callers must hold _lock while they use the connection.
+    """
+    path = path or _cache_path()
+    key = (os.getpid(), path)
+    if key not in _connections:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        _connections[key] = connection
+    return _connections[key]
+
+def _pending_state(path=None):
+    """This process's in-memory hit/miss counters and last_used times for one cache path."""
+    key = (os.getpid(), path or _cache_path())
+    if key not in _pending:
+        _pending[key] = {'hits': 0, 'misses': 0, 'last_used': {}}
+    return _pending[key]
+
+def _flush(connection, path=None):
+    """Write the pending counters and last_used times in one transaction."""
+    pending = _pending_state(path)
+    if not (pending['hits'] or pending['misses'] or pending['last_used']):
+        return
+    connection.execute("BEGIN")
+    try:
+        connection.executemany(
+            "UPDATE entries SET last_used = ? WHERE key = ?",
+            [(used, digest) for digest, used in pending['last_used'].items()]
+        )
+        connection.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, pending[name]) for name in ('hits', 'misses') if pending[name]]
+        )
+        connection.execute("COMMIT")
+    except sqlite3.Error:
+        connection.execute("ROLLBACK")
+        raise
+    pending.update(hits=0, misses=0, last_used={})
+
+@atexit.register
+def _flush_all():
+    """Write the pending counters of this process before it exits."""
+    with _lock:
+        for pid, path in list(_connections):
+            if pid == os.getpid():
+                try:
+                    _flush(_connections[(pid, path)], path)
+                except sqlite3.Error:
+                    pass
+
+def _evict(connection, max_entries):
+    """Drop least recently used entries once the cache grows past max_entries."""
+    (entries,) = connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+    if entries > max_entries:
+        keep = int(max_entries * CACHE_EVICTION_RATIO)
+        connection.execute(
+            "DELETE FROM entries WHERE key IN "
+            "(SELECT key FROM entries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (keep,)
+        )
+        connection.execute(
+            "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (entries - keep,)
+        )
+
+def persistent_cache(name, key):
+    """Cache a function's results on disk under name + key(*args, **kwargs).
+
+    key must return JSON-serializable canonical data (e.g. the (n, x) counts
+    and method parameters), or None to bypass the cache for that call. If
+    the cache database is unavailable the function simply runs uncached.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            max_entries = _max_entries()
+            if cache_key is None or max_entries <= 0:
+                return function(*args, **kwargs)
+
+            digest = hashlib.sha256(
+                json.dumps([CACHE_VERSION, name, cache_key], separators=(',', ':')).encode()
+            ).hexdigest()
+            with _lock:
+                try:
+                    connection = _connection()
+                    row = connection.execute("SELECT value FROM entries WHERE key = ?", (digest,)).fetchone()
+                except (OSError, sqlite3.Error):
+                    row, connection = None, None
+
+                # Un hit solo lee: su last_used y el contador se escriben en lote más tarde
+                if connection is not None:
+                    pending = _pending_state()
+                    if row is not None:
+                        pending['hits'] += 1
+                        pending['last_used'][digest] = time.time()
+                        if pending['hits'] >= CACHE_FLUSH_INTERVAL:
+                            try:
+                                _flush(connection)
+                            except sqlite3.Error:
+                                pass
+                        return loads(row[0])
+                    pending['misses'] += 1
+
+            # El cálculo corre fuera del lock para no serializar los hilos
+            result = function(*args, **kwargs)
+            if connection is None:
+                return result
+            with _lock:
+                try:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO entries (key, value, last_used) VALUES (?, ?, ?)",
+                        (digest, dumps(result), time.time())
+                    )
+                    _flush(connection)
+                    _evict(connection, max_entries)
+                except sqlite3.Error:
+                    pass
+            return result
+        return wrapper
+    return decorator
+
+def cache_stats(path=None):
+    """Return the cache's hit, miss and eviction counters and its current size."""
+    with _lock:
+        connection = _connection(path)
+        _flush(connection, path)
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        stats.update(dict(connection.execute("SELECT name, value FROM counters").fetchall()))
+        (stats['entries'],) = connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+    return stats
+
+def clear_cache(path=None):
+    """Remove every cached entry and reset the counters."""
+    with _lock:
+        connection = _connection(path)
+        _pending_state(path).update(hits=0, misses=0, last_used={})
+        connection.execute("DELETE FROM entries")
+        connection.execute("DELETE FROM counters")
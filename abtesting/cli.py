@@ -0,0 +1,96 @@
+"""Command-line entry point for batch analysis without the Streamlit UI."""
+import argparse
+import sys
+
+from .analysis import RESULT_FORMATS, analyze_files, write_results
+from .bayes import DEFAULT_P2BB_METHOD, P2BB_METHODS
+from .corrections import CORRECTION_METHODS, DEFAULT_CORRECTION_METHOD
+from .rng import DEFAULT_SEED
+from .srm import SRM_ALPHA
+
+def build_parser():
+    """Build the argument parser for the batch analysis command."""
+    parser = argparse.ArgumentParser(
+        prog='python -m abtesting',
+        description="Analiza en lote experimentos A/B/N (.txt, .csv o .parquet) y escribe los resultados."
+    )
+    parser.add_argument('inputs', nargs='+', help="Archivos o directorios de experimentos")
+    parser.add_argument('-o', '--output', default='results', help="Directorio de salida (default: results)")
+    parser.add_argument(
+        '-f', '--format', dest='formats', nargs='+', choices=RESULT_FORMATS, default=['csv'],
+        help="Formatos de salida (default: csv)"
+    )
+    parser.add_argument(
+        '--p2bb-method', choices=P2BB_METHODS, default=DEFAULT_P2BB_METHOD,
+        help=f"Método de cálculo de P2BB (default: {DEFAULT_P2BB_METHOD})"
+    )
+    parser.add_argument(
+        '--correction', choices=CORRECTION_METHODS, default=DEFAULT_CORRECTION_METHOD,
+        help=f"Corrección por comparaciones múltiples dentro de cada experimento (default: {DEFAULT_CORRECTION_METHOD})"
+    )
+    parser.add_argument(
+        '--segments', nargs='*', metavar='DIM', default=None,
+        help="Analiza cada segmento × métrica; sin columnas usa las dimensiones conocidas (device, country, ...)"
+    )
+    parser.add_argument(
+        '--stratify', metavar='DIM', default=None,
+        help="Agrega stratified.* con el test CMH de cada par estratificado por esta dimensión"
+    )
+    parser.add_argument(
+        '--srm-weights', nargs='+', type=float, metavar='W', default=None,
+        help="Split esperado por variante, en orden (ej. 50 25 25); default: partes iguales"
+    )
+    parser.add_argument(
+        '--srm-alpha', type=float, default=SRM_ALPHA,
+        help=f"Umbral del p-value del test de SRM (default: {SRM_ALPHA})"
+    )
+    parser.add_argument(
+        '--keep-srm', action='store_true',
+        help="Analiza también los experimentos con SRM en lugar de omitirlos"
+    )
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Procesos en paralelo; 0 usa todos los CPUs (default: 1)"
+    )
+    parser.add_argument(
+        '--chunksize', type=int, default=None,
+        help="Métricas por tarea en modo paralelo (default: automático)"
+    )
+    parser.add_argument(
+        '--seed', type=int, default=DEFAULT_SEED,
+        help=f"Semilla base para las simulaciones Monte Carlo (default: {DEFAULT_SEED})"
+    )
+    return parser
+
+def main(argv=None):
+    """Run the batch analysis and return the process exit code."""
+    args = build_parser().parse_args(argv)
+    try:
+        results = analyze_files(
+            args.inputs,
+            p2bb_method=args.p2bb_method,
+            workers=args.workers or None,
+            chunksize=args.chunksize,
+            seed=args.seed,
+            correction=args.correction,
+            dimensions=args.segments or None,
+            segments=args.segments is not None,
+            stratify=args.stratify,
+            srm_weights=args.srm_weights,
+            srm_alpha=args.srm_alpha,
+            skip_srm=not args.keep_srm
+        )
+        written = write_results(results, args.output, args.formats)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    
+    srm = results['srm']
+    flagged = srm.loc[srm['srm_mismatch'].astype(bool), 'experiment'].unique()
+    if len(flagged):
+        action = "omitidos del análisis" if not args.keep_srm else "analizados de todos modos"
+        print(f"SRM detectado en {len(flagged)} experimentos ({action}): {', '.join(flagged)}", file=sys.stderr)
+    print(f"{len(results['metrics'])} métricas, {len(results['pairs'])} comparaciones analizadas")
+    for path in written:
+        print(f"  → {path}")
+    return 0
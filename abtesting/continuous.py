@@ -0,0 +1,147 @@
+"""Continuous metrics (revenue, AOV) from per-variant sufficient statistics (n, sum, sum of squares)."""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .stats import compare_means
+
+# Nodos de Gauss-Legendre para P2BB con posteriores t de Student
+CONTINUOUS_P2BB_NODES = 64
+# Filas de valores crudos leídas por bloque al acumular desde un CSV
+RAW_VALUES_CHUNKSIZE = 100000
+
+
+def sufficient_stats(values):
+    """Sufficient statistics {'n', 'sum', 'sum_sq'} of an array of per-user values."""
+    values = np.asarray(values, dtype=float)
+    return {'n': int(values.size), 'sum': float(values.sum()), 'sum_sq': float(np.square(values).sum())}
+
+def merge_sufficient_stats(*parts):
+    """Combine sufficient statistics of disjoint batches of values."""
+    return {
+        'n': sum(part['n'] for part in parts),
+        'sum': sum(part['sum'] for part in parts),
+        'sum_sq': sum(part['sum_sq'] for part in parts)
+    }
+
+def accumulate_sufficient_stats(chunks, totals=None):
+    """Fold (variant, values) chunks into per-variant sufficient statistics.
+    
+    chunks yields (variant_labels, values) pairs of equal-length arrays, so
+    raw per-user data can be streamed without ever being held in memory as
+    a whole. Returns {variant: {'n', 'sum', 'sum_sq'}} in order of appearance.
+    """
+    totals = {} if totals is None else totals
+    for variants, values in chunks:
+        frame = pd.DataFrame({'variant': np.asarray(variants), 'value': np.asarray(values, dtype=float)})
+        frame['value_sq'] = np.square(frame['value'])
+        grouped = frame.groupby('variant', sort=False).agg(
+            n=('value', 'size'), sum=('value', 'sum'), sum_sq=('value_sq', 'sum')
+        )
+        for variant, row in grouped.iterrows():
+            part = {'n': int(row['n']), 'sum': float(row['sum']), 'sum_sq': float(row['sum_sq'])}
+            totals[variant] = merge_sufficient_stats(totals[variant], part) if variant in totals else part
+    return totals
+
+def sufficient_stats_from_csv(source, variant_column='variant', value_column='value', chunksize=RAW_VALUES_CHUNKSIZE):
+    """Stream a CSV of raw per-user values (one row per user) into per-variant sufficient statistics."""
+    reader = pd.read_csv(source, usecols=[variant_column, value_column], chunksize=chunksize)
+    return accumulate_sufficient_stats(
+        (chunk[variant_column].astype(str).to_numpy(), chunk[value_column].to_numpy()) for chunk in reader
+    )
+
+def _mean_posterior_p2bb(mean, scale, dof, n_nodes):
+    """P(mu_j > mu_i) for Student-t posteriors of the means, by quadrature over the narrower one."""
+    first, second = np.triu_indices(mean.shape[-1], 1)
+    nodes, weights = np.polynomial.legendre.leggauss(n_nodes)
+    u = (nodes + 1) / 2
+    weights = weights / 2
+    
+    # P(j > i) = ∫ F_i(Q_j(u)) du  o  1 - ∫ F_j(Q_i(u)) du, integrando sobre la posterior más concentrada
+    second_is_narrower = scale[..., second] <= scale[..., first]
+    narrow = np.where(second_is_narrower, second, first)
+    wide = np.where(second_is_narrower, first, second)
+    
+    narrow_mean, narrow_scale, narrow_dof = (
+        np.take_along_axis(values, narrow, axis=-1)[..., None] for values in (mean, scale, dof)
+    )
+    wide_mean, wide_scale, wide_dof = (
+        np.take_along_axis(values, wide, axis=-1)[..., None] for values in (mean, scale, dof)
+    )
+    quantiles = narrow_mean + narrow_scale * stats.t.ppf(u, narrow_dof)
+    wide_cdf = stats.t.cdf((quantiles - wide_mean) / wide_scale, wide_dof)
+    integral = np.clip(np.sum(weights * wide_cdf, axis=-1), 0.0, 1.0)
+    p_second_beats_first = np.where(second_is_narrower, integral, 1 - integral)
+    
+    n_variants = mean.shape[-1]
+    matrix = np.full(mean.shape + (n_variants,), 0.5)
+    matrix[..., first, second] = p_second_beats_first
+    matrix[..., second, first] = 1 - p_second_beats_first
+    return matrix
+
+def calculate_continuous_matrix(n, total, total_sq, alpha=0.05, n_nodes=CONTINUOUS_P2BB_NODES):
+    """Calculate dense N×N Welch t-test, lift and P2BB matrices for a continuous metric.
+    
+    n, total and total_sq are (..., N) per-variant sufficient statistics.
+    Entry [i, j] compares variant j (B) against variant i (A), as in
+    calculate_pairwise_matrix. P2BB uses the Normal-Gamma (reference prior)
+    posterior of each mean, a Student-t with n - 1 degrees of freedom.
+    """
+    n = np.asarray(n, dtype=float)
+    total = np.asarray(total, dtype=float)
+    total_sq = np.asarray(total_sq, dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        variance = np.maximum(total_sq - total * mean, 0.0) / (n - 1)
+        mean_variance = variance / n
+        dof = n - 1
+        
+        # Intervalo t de cada media
+        t_critical = stats.t.isf(alpha / 2, dof)
+        mean_lower = mean - t_critical * np.sqrt(mean_variance)
+        mean_upper = mean + t_critical * np.sqrt(mean_variance)
+        
+        # Lift y su intervalo por método delta; el p-value usa la t de Welch-Satterthwaite
+        a_var, b_var = mean_variance[..., :, None], mean_variance[..., None, :]
+        comparison = compare_means(mean[..., :, None], a_var, mean[..., None, :], b_var, alpha)
+        welch_dof = (a_var + b_var) ** 2 / (a_var ** 2 / dof[..., :, None] + b_var ** 2 / dof[..., None, :])
+        p_value = np.where(
+            comparison['se'] > 0, 2 * stats.t.sf(np.abs(comparison['z_score']), welch_dof), 1.0
+        )
+        
+        p2bb = _mean_posterior_p2bb(mean, np.sqrt(mean_variance), dof, n_nodes)
+    
+    return {
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'mean_lower': mean_lower,
+        'mean_upper': mean_upper,
+        'se': comparison['se'],
+        't_score': comparison['z_score'],
+        'dof': welch_dof,
+        'p_value': p_value,
+        'relative_lift': comparison['relative_lift'],
+        'lift_lower': comparison['lift_lower'],
+        'lift_upper': comparison['lift_upper'],
+        'significant': p_value < alpha,
+        'p2bb': p2bb
+    }
+
+def continuous_comparison_from_matrix(matrix, variants, i, j, is_control_comparison=False):
+    """Extract one pairwise comparison from calculate_continuous_matrix results."""
+    return {
+        'variant_a_name': variants[i]['name'],
+        'variant_b_name': variants[j]['name'],
+        'variant_a_mean': float(matrix['mean'][i]),
+        'variant_b_mean': float(matrix['mean'][j]),
+        'variant_a_ci': (float(matrix['mean_lower'][i]), float(matrix['mean_upper'][i])),
+        'variant_b_ci': (float(matrix['mean_lower'][j]), float(matrix['mean_upper'][j])),
+        'relative_lift': float(matrix['relative_lift'][i, j]),
+        'relative_lift_ci': (float(matrix['lift_lower'][i, j]), float(matrix['lift_upper'][i, j])),
+        't_score': float(matrix['t_score'][i, j]),
+        'p_value': float(matrix['p_value'][i, j]),
+        'p2bb': float(matrix['p2bb'][i, j]),
+        'significant': bool(matrix['significant'][i, j]),
+        'is_control_comparison': is_control_comparison
+    }
@@ -0,0 +1,93 @@
+"""Multiple-comparison corrections applied across every pair and metric of an experiment."""
+import numpy as np
+
+# Correcciones disponibles: control de FWER (Bonferroni, Holm) o de FDR (Benjamini-Hochberg)
+CORRECTION_METHODS = ('holm', 'bh', 'bonferroni', 'none')
+DEFAULT_CORRECTION_METHOD = 'holm'
+
+
+def adjust_p_values(p_values, method=DEFAULT_CORRECTION_METHOD, groups=None):
+    """Adjust an array of p-values for multiple comparisons in one vectorized pass.
+    
+    Each group (e.g. experiment) is corrected as one family; by default the
+    whole array is a single family. nan p-values are ignored and kept as nan.
+    Returns adjusted p-values with the shape of p_values.
+    """
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f"Corrección desconocida: {method}. Opciones: {', '.join(CORRECTION_METHODS)}")
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = p_values.copy()
+    if method == 'none':
+        return adjusted
+    
+    flat = p_values.ravel()
+    valid = np.flatnonzero(~np.isnan(flat))
+    if groups is None:
+        group = np.zeros(len(valid), dtype=int)
+    else:
+        group = np.unique(np.ravel(groups)[valid], return_inverse=True)[1]
+    
+    # Ordenar por familia y p-value; rango y tamaño de familia de cada p-value
+    order = valid[np.lexsort((flat[valid], group))]
+    group = np.sort(group, kind='stable')
+    ranked = flat[order]
+    sizes = np.bincount(group)
+    starts = np.cumsum(sizes) - sizes
+    rank = np.arange(len(ranked)) - starts[group]
+    family_size = sizes[group]
+    
+    # Los acumulados se calculan de una vez para todas las familias desplazando
+    # cada una por 2 * familia, así ningún valor cruza a la familia vecina
+    offset = 2.0 * group
+    if method == 'bonferroni':
+        values = np.minimum(ranked * family_size, 1.0)
+    elif method == 'holm':
+        values = np.minimum((family_size - rank) * ranked, 1.0)
+        values = np.maximum.accumulate(values + offset) - offset
+    else:
+        values = np.minimum(ranked * family_size / (rank + 1), 1.0)
+        values = (np.minimum.accumulate((values + offset)[::-1]) - offset[::-1])[::-1]
+    
+    adjusted_flat = adjusted.reshape(-1)
+    adjusted_flat[order] = values
+    return adjusted_flat.reshape(p_values.shape)
+
+def correct_matrices(matrices, method=DEFAULT_CORRECTION_METHOD, alpha=0.05):
+    """Correct the pairwise p-values of every metric of an experiment as one family.
+    
+    matrices maps metric names to calculate_pairwise_matrix results. Returns
+    copies with an 'adjusted_p_value' matrix and 'significant' recomputed
+    from it; the raw 'p_value' is kept. Each unordered pair counts once.
+    """
+    names = list(matrices)
+    upper = [np.triu_indices(matrices[name]['p_value'].shape[-1], 1) for name in names]
+    p_values = np.concatenate(
+        [matrices[name]['p_value'][rows, cols] for name, (rows, cols) in zip(names, upper)] or [[]]
+    )
+    adjusted = adjust_p_values(p_values, method)
+    
+    corrected = {}
+    position = 0
+    for name, (rows, cols) in zip(names, upper):
+        matrix = dict(matrices[name])
+        adjusted_matrix = np.ones_like(matrix['p_value'])
+        adjusted_matrix[rows, cols] = adjusted[position:position + len(rows)]
+        adjusted_matrix[cols, rows] = adjusted[position:position + len(rows)]
+        position += len(rows)
+        matrix['adjusted_p_value'] = adjusted_matrix
+        matrix['significant'] = adjusted_matrix < alpha
+        corrected[name] = matrix
+    return corrected
+
+def correct_pairs(pairs, method=DEFAULT_CORRECTION_METHOD, alpha=0.05):
+    """Add 'adjusted_p_value' to a batch 'pairs' table, correcting each experiment as one family."""
+    pairs = pairs.copy()
+    if pairs.empty:
+        return pairs
+    pairs.insert(
+        pairs.columns.get_loc('p_value') + 1,
+        'adjusted_p_value',
+        adjust_p_values(pairs['p_value'].to_numpy(), method, groups=pairs['experiment'].astype(str).to_numpy())
+    )
+    pairs['significant'] = pairs['adjusted_p_value'] < alpha
+    return pairs
@@ -0,0 +1,76 @@
+"""CUPED variance reduction using per-variant pre-period covariate aggregates."""
+import numpy as np
+from scipy import stats
+
+from .stats import compare_means
+
+def calculate_cuped_matrix(n, total, total_sq, pre_total, pre_total_sq, cross_total, alpha=0.05):
+    """Calculate CUPED-adjusted means and dense N×N comparison matrices.
+    
+    Every argument is a (..., N) array of per-variant aggregates over users:
+    n, sum and sum of squares of the outcome Y (for conversions, sum and
+    sum of squares are both the conversion count), sum and sum of squares of
+    the pre-period covariate X, and the sum of X·Y. theta is the pooled
+    within-variant regression slope of Y on X, so a treatment effect on Y
+    does not leak into it. Keys match calculate_pairwise_matrix ('rate' is
+    the adjusted mean), plus 'unadjusted_rate', 'theta' and
+    'variance_reduction' (the fraction of variance, and so of sessions
+    needed for the same power, removed by the adjustment).
+    """
+    n, total, total_sq, pre_total, pre_total_sq, cross_total = (
+        np.asarray(values, dtype=float) for values in (n, total, total_sq, pre_total, pre_total_sq, cross_total)
+    )
+    z = stats.norm.isf(alpha / 2)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        pre_mean = pre_total / n
+        # Sumas de cuadrados y productos cruzados centradas dentro de cada variante
+        outcome_ss = total_sq - total * mean
+        pre_ss = pre_total_sq - pre_total * pre_mean
+        cross_ss = cross_total - pre_total * mean
+        
+        theta = np.sum(cross_ss, axis=-1, keepdims=True) / np.sum(pre_ss, axis=-1, keepdims=True)
+        theta = np.where(np.isfinite(theta), theta, 0.0)
+        pooled_pre_mean = np.sum(pre_total, axis=-1, keepdims=True) / np.sum(n, axis=-1, keepdims=True)
+        
+        # Y - theta (X - media de X): misma esperanza, menos varianza
+        adjusted_mean = mean - theta * (pre_mean - pooled_pre_mean)
+        outcome_variance = outcome_ss / (n - 1)
+        adjusted_variance = np.maximum(outcome_ss - 2 * theta * cross_ss + theta ** 2 * pre_ss, 0.0) / (n - 1)
+        mean_variance = adjusted_variance / n
+        variance_reduction = np.where(outcome_variance > 0, 1 - adjusted_variance / outcome_variance, 0.0)
+    
+    # z-test, lift con intervalo por método delta y P2BB normal sobre las medias ajustadas
+    comparison = compare_means(
+        adjusted_mean[..., :, None], mean_variance[..., :, None],
+        adjusted_mean[..., None, :], mean_variance[..., None, :],
+        alpha
+    )
+    return {
+        'rate': adjusted_mean,
+        'unadjusted_rate': mean,
+        'rate_lower': adjusted_mean - z * np.sqrt(mean_variance),
+        'rate_upper': adjusted_mean + z * np.sqrt(mean_variance),
+        'theta': theta[..., 0],
+        'variance_reduction': variance_reduction,
+        **comparison
+    }
+
+def cuped_from_variants(variants, alpha=0.05):
+    """Run calculate_cuped_matrix on metric variants carrying pre_sum, pre_sum_sq and cross_sum.
+    
+    Conversion variants use x as the outcome sum (and sum of squares);
+    continuous variants use their sum and sum_sq.
+    """
+    outcome_total = [variant['sum'] if 'sum' in variant else variant['x'] for variant in variants]
+    outcome_total_sq = [variant['sum_sq'] if 'sum_sq' in variant else variant['x'] for variant in variants]
+    return calculate_cuped_matrix(
+        [variant['n'] for variant in variants],
+        outcome_total,
+        outcome_total_sq,
+        [variant['pre_sum'] for variant in variants],
+        [variant['pre_sum_sq'] for variant in variants],
+        [variant['cross_sum'] for variant in variants],
+        alpha
+    )
@@ -0,0 +1,99 @@
+"""Incremental updates of experiment counts without full recomputation."""
+from .bayes import DEFAULT_P2BB_METHOD
+from .ingest import COVARIATE_COLUMNS
+from .parsing import iter_metric_rows
+from .stats import update_metric_statistics
+
+
+def parse_metric_deltas(source):
+    """Parse delta counts in the metrics text format into {metric: {variant: (n, x)}}.
+    
+    Unlike parse_metrics_data, a metric may list a single variant (only the
+    variants that received new sessions), and repeated rows are added up.
+    """
+    deltas = {}
+    metric = None
+    for record in iter_metric_rows(source):
+        kind = record[0]
+        if kind == 'metric':
+            metric = deltas.setdefault(record[1], {})
+        elif kind == 'variant' and metric is not None:
+            _, name, n, x = record
+            previous_n, previous_x = metric.get(name, (0, 0))
+            metric[name] = (previous_n + n, previous_x + x)
+    return deltas
+
+def merge_metric_deltas(data, deltas):
+    """Add delta counts to metrics data, returning (updated_data, changed).
+    
+    data is the nested dict from parse_metrics_data (it is not modified);
+    changed maps each metric name to the indices of its variants whose
+    counts changed. Unknown variants are appended to their metric and
+    unknown metrics are added, keeping the usual two-variant validation.
+    """
+    if isinstance(data, dict) and 'experiment_title' in data:
+        title, metrics_data = data['experiment_title'], data['metrics']
+    else:
+        title, metrics_data = None, data
+    
+    updated = {}
+    for name, metric in metrics_data.items():
+        updated[name] = {'variants': [dict(variant) for variant in metric['variants']]}
+        if 'type' in metric:
+            updated[name]['type'] = metric['type']
+    changed = {}
+    for metric_name, variant_deltas in deltas.items():
+        if updated.get(metric_name, {}).get('type') == 'continuous':
+            raise ValueError(f"La métrica {metric_name} es continua: solo admite datos nuevos de conversiones")
+        variants = updated.setdefault(metric_name, {'variants': []})['variants']
+        positions = {variant['name']: index for index, variant in enumerate(variants)}
+        for variant_name, (delta_n, delta_x) in variant_deltas.items():
+            if variant_name not in positions:
+                positions[variant_name] = len(variants)
+                variants.append({'name': variant_name, 'n': 0, 'x': 0})
+            variant = variants[positions[variant_name]]
+            variant['n'] += delta_n
+            variant['x'] += delta_x
+            if variant['x'] > variant['n'] or variant['x'] < 0:
+                raise ValueError(
+                    f"Conteos inválidos para {variant_name} en {metric_name}: "
+                    f"{variant['x']} conversiones sobre {variant['n']} sesiones"
+                )
+            changed.setdefault(metric_name, set()).add(positions[variant_name])
+        
+        if len(variants) < 2:
+            raise ValueError(f"La métrica {metric_name} debe tener al menos 2 variantes")
+        
+        # La covariable del pre-periodo ya no corresponde a los usuarios acumulados
+        for variant in variants:
+            for column in COVARIATE_COLUMNS:
+                variant.pop(column, None)
+    
+    # Mantener compatibilidad con formato legacy para 2 variantes
+    for metric in updated.values():
+        if len(metric['variants']) == 2 and metric.get('type') != 'continuous':
+            metric['baseline'] = metric['variants'][0]
+            metric['treatment'] = metric['variants'][1]
+    
+    changed = {name: sorted(indices) for name, indices in changed.items()}
+    if title:
+        return {'experiment_title': title, 'metrics': updated}, changed
+    return updated, changed
+
+def update_experiment(data, results, deltas, p2bb_method=DEFAULT_P2BB_METHOD):
+    """Apply delta counts to an experiment and refresh only the affected statistics.
+    
+    results maps metric names to calculate_metric_statistics output for data
+    (missing metrics are computed from scratch). Returns (updated_data,
+    updated_results); metrics without deltas keep their results untouched.
+    """
+    updated_data, changed = merge_metric_deltas(data, deltas)
+    metrics_data = updated_data['metrics'] if 'experiment_title' in updated_data else updated_data
+    
+    updated_results = dict(results)
+    for metric_name, indices in changed.items():
+        counts = [(variant['n'], variant['x']) for variant in metrics_data[metric_name]['variants']]
+        updated_results[metric_name] = update_metric_statistics(
+            results.get(metric_name), counts, indices, p2bb_method=p2bb_method
+        )
+    return updated_data, updated_results
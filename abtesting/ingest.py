@@ -0,0 +1,309 @@
+"""Columnar metrics table built from CSV/Parquet exports or parsed text."""
+import numpy as np
+import pandas as pd
+
+
+# Columnas del modelo tabular interno (una fila por métrica y variante)
+TABLE_COLUMNS = ['experiment', 'metric', 'variant', 'sessions', 'conversions']
+# Nombres alternativos aceptados en los exports
+TABLE_COLUMN_ALIASES = {
+    'experiment_title': 'experiment',
+    'metric_name': 'metric',
+    'variant_name': 'variant',
+    'n': 'sessions',
+    'x': 'conversions',
+    'sum_squares': 'sum_sq',
+    'sum_of_squares': 'sum_sq',
+    'timestamp': 'date',
+    'datetime': 'date'
+}
+# Estadísticos suficientes opcionales de métricas continuas (ingresos, AOV)
+CONTINUOUS_COLUMNS = ['sum', 'sum_sq']
+# Agregados opcionales de la covariable del pre-periodo para CUPED
+COVARIATE_COLUMNS = ['pre_sum', 'pre_sum_sq', 'cross_sum']
+# Dimensiones de segmentación que se reconocen sin indicarlas
+DIMENSION_COLUMNS = ['device', 'country', 'channel', 'platform', 'browser']
+# Etiqueta de segmento (calculada por segment_table o ya presente en el export)
+SEGMENT_COLUMN = 'segment'
+SEGMENT_TOTAL = 'Total'
+# Periodo (día u hora) de los exports en serie de tiempo: conteos del periodo, no acumulados
+TIME_COLUMN = 'date'
+
+def normalize_metrics_table(table, dimensions=None):
+    """Validate a raw export and coerce it to the internal columnar metrics table.
+    
+    dimensions lists the segment columns to keep (e.g. device, country);
+    by default the known DIMENSION_COLUMNS present in the export are kept.
+    A 'segment' column is kept as a ready-made segment label, and a 'date'
+    column (day or hour of each row's counts) as datetimes.
+    """
+    table = table.rename(columns=lambda column: str(column).strip().lower())
+    table = table.rename(columns=TABLE_COLUMN_ALIASES)
+    
+    if 'experiment' not in table.columns:
+        table['experiment'] = ''
+    continuous_columns = [column for column in CONTINUOUS_COLUMNS if column in table.columns]
+    if continuous_columns and continuous_columns != CONTINUOUS_COLUMNS:
+        raise ValueError(f"Las métricas continuas requieren las columnas: {', '.join(CONTINUOUS_COLUMNS)}")
+    if continuous_columns and 'conversions' not in table.columns:
+        table['conversions'] = 0
+    covariate_columns = [column for column in COVARIATE_COLUMNS if column in table.columns]
+    if covariate_columns and covariate_columns != COVARIATE_COLUMNS:
+        raise ValueError(f"El ajuste CUPED requiere las columnas: {', '.join(COVARIATE_COLUMNS)}")
+    if dimensions is None:
+        dimensions = [column for column in DIMENSION_COLUMNS if column in table.columns]
+    dimensions = [str(column).strip().lower() for column in dimensions]
+    if SEGMENT_COLUMN in table.columns:
+        dimensions = [SEGMENT_COLUMN] + [column for column in dimensions if column != SEGMENT_COLUMN]
+    missing = [column for column in TABLE_COLUMNS + dimensions if column not in table.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(missing)}")
+    
+    time_columns = [TIME_COLUMN] if TIME_COLUMN in table.columns else []
+    table = table[TABLE_COLUMNS + continuous_columns + covariate_columns + dimensions + time_columns].copy()
+    if time_columns:
+        try:
+            table[TIME_COLUMN] = pd.to_datetime(table[TIME_COLUMN])
+        except (ValueError, TypeError):
+            raise ValueError(f"La columna '{TIME_COLUMN}' debe tener fechas u horas válidas")
+    if continuous_columns:
+        table = _normalize_continuous_columns(table)
+    for column in covariate_columns:
+        table[column] = pd.to_numeric(table[column], errors='coerce')
+    for column in ['sessions', 'conversions']:
+        values = pd.to_numeric(table[column], errors='coerce')
+        if values.isna().any() or (values % 1 != 0).any():
+            raise ValueError(f"Los valores de la columna '{column}' deben ser números enteros")
+        table[column] = values.astype(np.int64)
+    
+    invalid = table['conversions'] > table['sessions']
+    if invalid.any():
+        row = table[invalid].iloc[0]
+        raise ValueError(
+            f"El número de conversiones ({row['conversions']}) no puede ser mayor que el número "
+            f"de sesiones ({row['sessions']}) en: {row['metric']} / {row['variant']}"
+        )
+    
+    # Categorías en orden de aparición para agrupar sin copiar strings
+    for column in ['experiment', 'metric', 'variant'] + dimensions:
+        values = table[column].astype(object).fillna('').astype(str).str.strip()
+        table[column] = pd.Categorical(values, categories=pd.unique(values))
+    return table.reset_index(drop=True)
+
+def _normalize_continuous_columns(table):
+    """Coerce sum/sum_sq to floats; rows with a sum belong to continuous metrics and need no conversions."""
+    for column in CONTINUOUS_COLUMNS:
+        table[column] = pd.to_numeric(table[column], errors='coerce')
+    continuous = table['sum'].notna()
+    if (continuous != table['sum_sq'].notna()).any():
+        raise ValueError("Las columnas 'sum' y 'sum_sq' deben venir informadas juntas")
+    
+    # Una métrica es continua o binomial en todas sus variantes
+    keys = [table['experiment'].fillna('').astype(str), table['metric'].fillna('').astype(str)]
+    mixed = continuous.groupby(keys).transform('nunique') > 1
+    if mixed.any():
+        row = table[mixed].iloc[0]
+        raise ValueError(f"La métrica {row['metric']} mezcla variantes continuas y de conversión")
+    table['conversions'] = table['conversions'].where(~continuous, 0)
+    return table
+
+def is_continuous_table(table):
+    """True when the metrics table carries continuous sufficient statistics."""
+    return all(column in table.columns for column in CONTINUOUS_COLUMNS)
+
+def has_covariates(table):
+    """True when the metrics table carries pre-period covariate aggregates for CUPED."""
+    return all(column in table.columns for column in COVARIATE_COLUMNS)
+
+def dimension_columns(table):
+    """Segment dimension columns of a normalized metrics table (not counting the 'segment' label or 'date')."""
+    known = set(TABLE_COLUMNS + CONTINUOUS_COLUMNS + COVARIATE_COLUMNS + [SEGMENT_COLUMN, TIME_COLUMN])
+    return [column for column in table.columns if column not in known]
+
+def metric_keys(table):
+    """Columns that identify one metric (one set of variants) in a metrics table."""
+    return ['experiment', SEGMENT_COLUMN, 'metric'] if SEGMENT_COLUMN in table.columns else ['experiment', 'metric']
+
+def group_metrics(table):
+    """Group a metrics table into its metrics (metric_keys), keeping rows in file order.
+    
+    Returns 'keys', per-row 'group_id' and 'position' (variant index within
+    its metric), per-metric 'sizes' (number of variants), 'first_rows' (row
+    of each metric's first variant) and 'labels' ({key: per-metric value}).
+    """
+    keys = metric_keys(table)
+    groups = table.groupby(keys, sort=False, observed=True)
+    group_id = groups.ngroup().to_numpy()
+    position = groups.cumcount().to_numpy()
+    first_rows = np.flatnonzero(position == 0)
+    labels = {}
+    for key in keys:
+        labels[key] = np.empty(groups.ngroups, dtype=object)
+        labels[key][group_id[first_rows]] = table[key].astype(str).to_numpy()[first_rows]
+    return {
+        'keys': keys,
+        'group_id': group_id,
+        'position': position,
+        'sizes': np.bincount(group_id, minlength=groups.ngroups),
+        'first_rows': first_rows,
+        'labels': labels
+    }
+
+def stack_order(groups, selected):
+    """Row order that stacks the selected metrics (all with the same number of variants) variant by variant.
+    
+    values[stack_order(groups, selected)].reshape(len(selected), size) gives
+    one (metrics, variants) array per column.
+    """
+    rows = np.flatnonzero(np.isin(groups['group_id'], selected))
+    return rows[np.lexsort((groups['position'][rows], groups['group_id'][rows]))]
+
+def sort_by_group(frame):
+    """Sort batch results by their '_group' order of appearance and drop the helper column."""
+    return frame.sort_values('_group', kind='stable').drop(columns='_group').reset_index(drop=True)
+
+def aggregate_table(table, dimensions=()):
+    """Sum the counts of every (experiment, *dimensions, metric, variant) in one group-by.
+    
+    Dimensions left out (and the 'date' of time-series exports) are
+    aggregated over, so aggregate_table(table) gives the experiment-wide
+    totals of a segmented export.
+    """
+    keys = ['experiment', *dimensions, 'metric', 'variant']
+    values = [column for column in TABLE_COLUMNS + CONTINUOUS_COLUMNS + COVARIATE_COLUMNS
+              if column in table.columns and column not in keys]
+    # min_count=1: las sumas continuas de métricas de conversión siguen siendo nan
+    aggregated = table.groupby(keys, sort=False, observed=True)[values].sum(min_count=1).reset_index()
+    for column in ['sessions', 'conversions']:
+        aggregated[column] = aggregated[column].astype(np.int64)
+    return aggregated
+
+def segment_table(table, dimensions=None, include_total=True):
+    """Stack the metrics of every segment into one table with a 'segment' label column.
+    
+    Segments are the total (optional), each value of every dimension on its
+    own and, with several dimensions, every combination of their values,
+    labelled like 'device=Mobile · country=CO'. The batch engine then runs
+    every segment × metric in a single pass. A table that already has a
+    'segment' label column is only aggregated by it.
+    """
+    if SEGMENT_COLUMN in table.columns:
+        return aggregate_table(table, [SEGMENT_COLUMN])
+    dimensions = dimension_columns(table) if dimensions is None else list(dimensions)
+    levels = [[dimension] for dimension in dimensions]
+    if len(dimensions) > 1:
+        levels.append(dimensions)
+    
+    parts = []
+    if include_total:
+        parts.append(aggregate_table(table).assign(**{SEGMENT_COLUMN: SEGMENT_TOTAL}))
+    for level in levels:
+        part = aggregate_table(table, level)
+        labels = [f"{dimension}=" + part[dimension].astype(str) for dimension in level]
+        part[SEGMENT_COLUMN] = labels[0].str.cat(labels[1:], sep=' · ') if len(labels) > 1 else labels[0]
+        parts.append(part.drop(columns=level))
+    
+    segmented = pd.concat(parts, ignore_index=True)
+    for column in ['experiment', SEGMENT_COLUMN, 'metric', 'variant']:
+        values = segmented[column].astype(str)
+        segmented[column] = pd.Categorical(values, categories=pd.unique(values))
+    columns = ['experiment', SEGMENT_COLUMN] + [
+        column for column in segmented.columns if column not in ('experiment', SEGMENT_COLUMN)
+    ]
+    return segmented[columns]
+
+def load_metrics_table(source, file_format=None, dimensions=None):
+    """Read a CSV or Parquet export (path or file-like object) into the metrics table."""
+    if file_format is None:
+        name = str(getattr(source, 'name', source))
+        file_format = 'parquet' if name.lower().endswith(('.parquet', '.pq')) else 'csv'
+    
+    if file_format == 'csv':
+        table = pd.read_csv(source)
+    elif file_format == 'parquet':
+        try:
+            table = pd.read_parquet(source)
+        except ImportError:
+            raise ValueError("Para leer archivos Parquet instala pyarrow (pip install pyarrow)")
+    else:
+        raise ValueError(f"Formato de archivo no soportado: {file_format}")
+    return normalize_metrics_table(table, dimensions)
+
+def columns_to_table(columns):
+    """Convert columnar parse results into the metrics table."""
+    metric_names = np.array(columns['metric_names'], dtype=object)
+    variant_names = np.array(columns['variant_names'], dtype=object)
+    return normalize_metrics_table(pd.DataFrame({
+        'experiment': columns['experiment_title'] or '',
+        'metric': metric_names[columns['metric_id']],
+        'variant': variant_names[columns['variant_id']],
+        'sessions': columns['n'],
+        'conversions': columns['x']
+    }, columns=TABLE_COLUMNS))
+
+def has_time_series(table):
+    """True when the metrics table has one row per period ('date') of every variant."""
+    return TIME_COLUMN in table.columns
+
+def collapse_periods(table):
+    """Sum the periods of a time-series export into one row per variant; other tables are returned as is.
+    
+    A 'segment' label column is kept; any other dimension is aggregated
+    over, as in aggregate_table(table).
+    """
+    if not has_time_series(table):
+        return table
+    return aggregate_table(table, [SEGMENT_COLUMN] if SEGMENT_COLUMN in table.columns else [])
+
+def table_to_metrics(table, experiment=None, segment=None):
+    """Convert one experiment of the metrics table into the nested metrics dict used by the UI.
+    
+    For segmented tables, segment picks one 'segment' label (the first one
+    by default); rows of other dimensions, and of every period of a time
+    series, are aggregated.
+    """
+    if experiment is None:
+        experiment = table['experiment'].iloc[0] if len(table) else ''
+    rows = table[table['experiment'] == experiment]
+    if SEGMENT_COLUMN in rows.columns:
+        if segment is None:
+            segment = rows[SEGMENT_COLUMN].iloc[0] if len(rows) else ''
+        rows = rows[rows[SEGMENT_COLUMN] == segment]
+    if SEGMENT_COLUMN in rows.columns or dimension_columns(rows) or has_time_series(rows):
+        rows = aggregate_table(rows)
+    
+    metrics_data = {}
+    for metric, group in rows.groupby('metric', sort=False, observed=True):
+        if is_continuous_table(table) and group['sum'].notna().all():
+            metrics_data[str(metric)] = {'type': 'continuous', 'variants': [
+                {'name': str(name), 'n': n, 'sum': total, 'sum_sq': total_sq}
+                for name, n, total, total_sq in zip(
+                    group['variant'], group['sessions'].tolist(), group['sum'].tolist(), group['sum_sq'].tolist()
+                )
+            ]}
+        else:
+            metrics_data[str(metric)] = {'variants': [
+                {'name': str(name), 'n': n, 'x': x}
+                for name, n, x in zip(group['variant'], group['sessions'].tolist(), group['conversions'].tolist())
+            ]}
+        
+        # Covariable del pre-periodo solo si todas las variantes la traen
+        if has_covariates(table) and group[COVARIATE_COLUMNS].notna().to_numpy().all():
+            for variant, covariates in zip(
+                metrics_data[str(metric)]['variants'], group[COVARIATE_COLUMNS].to_dict('records')
+            ):
+                variant.update(covariates)
+    
+    for metric, data in metrics_data.items():
+        if len(data['variants']) < 2:
+            raise ValueError(f"La métrica {metric} debe tener al menos 2 variantes")
+        if len(data['variants']) == 2 and data.get('type') != 'continuous':
+            data['baseline'] = data['variants'][0]
+            data['treatment'] = data['variants'][1]
+    
+    if experiment:
+        return {
+            'experiment_title': str(experiment),
+            'metrics': metrics_data
+        }
+    return metrics_data
@@ -0,0 +1,93 @@
+"""Confidence and credible intervals for conversion rates and relative lift."""
+import numpy as np
+from scipy import special, stats
+
+# Métodos de intervalo para tasas (frecuentista) y para el lift relativo
+RATE_INTERVAL_METHODS = ('wilson', 'agresti_coull')
+LIFT_INTERVAL_METHODS = ('delta', 'fieller')
+
+
+def rate_intervals(n, x, alpha=0.05, method='wilson'):
+    """Wilson or Agresti-Coull confidence intervals for the conversion rate of every variant."""
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    z = stats.norm.isf(alpha / 2)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if method == 'wilson':
+            rate = x / n
+            center = (rate + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+            half_width = z / (1 + z ** 2 / n) * np.sqrt(rate * (1 - rate) / n + z ** 2 / (4 * n ** 2))
+        elif method == 'agresti_coull':
+            # Tasa "ajustada" sumando z²/2 éxitos y z²/2 fracasos
+            n_adjusted = n + z ** 2
+            center = (x + z ** 2 / 2) / n_adjusted
+            half_width = z * np.sqrt(center * (1 - center) / n_adjusted)
+        else:
+            raise ValueError(f"Método de intervalo desconocido: {method}. Opciones: {', '.join(RATE_INTERVAL_METHODS)}")
+    
+    return np.clip(center - half_width, 0.0, 1.0), np.clip(center + half_width, 0.0, 1.0)
+
+def credible_intervals(n, x, alpha=0.05):
+    """Equal-tailed credible intervals of the Beta(x + 1, n - x + 1) posterior of every variant."""
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    alpha_post, beta_post = x + 1, n - x + 1
+    lower = special.betaincinv(alpha_post, beta_post, alpha / 2)
+    upper = special.betaincinv(alpha_post, beta_post, 1 - alpha / 2)
+    return lower, upper
+
+def lift_intervals(n, x, alpha=0.05, method='delta'):
+    """Confidence intervals (in %) for the relative lift of variant j over variant i, for every pair.
+    
+    Returns (lower, upper) matrices of shape (..., N, N) matching
+    calculate_pairwise_matrix's relative_lift. 'delta' linearizes the ratio
+    p_j / p_i; 'fieller' inverts the exact test for the ratio and gives
+    infinite bounds when the baseline rate is not distinguishable from zero.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    z = stats.norm.isf(alpha / 2)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = x / n
+        variance = rate * (1 - rate) / n
+        a_p, a_variance = rate[..., :, None], variance[..., :, None]
+        b_p, b_variance = rate[..., None, :], variance[..., None, :]
+        ratio = b_p / a_p
+        
+        if method == 'delta':
+            ratio_se = ratio * np.sqrt(a_variance / a_p ** 2 + b_variance / b_p ** 2)
+            # Sin conversiones en B la varianza relativa no está definida: usar solo la de A
+            ratio_se = np.where(b_p > 0, ratio_se, np.sqrt(b_variance) / a_p)
+            lower, upper = ratio - z * ratio_se, ratio + z * ratio_se
+        elif method == 'fieller':
+            # Raíces de (b - R a)² = z² (var_b + R² var_a)
+            quadratic = a_p ** 2 - z ** 2 * a_variance
+            discriminant = (a_p * b_p) ** 2 - quadratic * (b_p ** 2 - z ** 2 * b_variance)
+            root = np.sqrt(np.maximum(discriminant, 0.0))
+            bounded = quadratic > 0
+            lower = np.where(bounded, (a_p * b_p - root) / quadratic, -np.inf)
+            upper = np.where(bounded, (a_p * b_p + root) / quadratic, np.inf)
+        else:
+            raise ValueError(f"Método de intervalo desconocido: {method}. Opciones: {', '.join(LIFT_INTERVAL_METHODS)}")
+    
+    # Sin conversiones en A el lift no está definido
+    undefined = ~(a_p > 0)
+    lower = np.where(undefined, np.nan, (lower - 1) * 100)
+    upper = np.where(undefined, np.nan, (upper - 1) * 100)
+    return lower, upper
+
+def calculate_intervals(n, x, alpha=0.05, rate_method='wilson', lift_method='delta'):
+    """Compute every interval shown for a metric, vectorized over (..., N) count arrays."""
+    rate_lower, rate_upper = rate_intervals(n, x, alpha, rate_method)
+    credible_lower, credible_upper = credible_intervals(n, x, alpha)
+    lift_lower, lift_upper = lift_intervals(n, x, alpha, lift_method)
+    return {
+        'rate_lower': rate_lower,
+        'rate_upper': rate_upper,
+        'credible_lower': credible_lower,
+        'credible_upper': credible_upper,
+        'lift_lower': lift_lower,
+        'lift_upper': lift_upper
+    }
@@ -0,0 +1,165 @@
+"""Parsing of the metrics text format into columnar arrays and nested dicts."""
+import io
+from array import array
+
+import numpy as np
+
+
+def _iter_text_lines(source):
+    """Yield text lines lazily from a string, an iterable of lines or a (binary) file-like object."""
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    for line in source:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        yield line.rstrip('\r\n')
+
+def _parse_metric_line(line):
+    """Classify one input line as a title, a metric header or a variant row."""
+    stripped = line.strip()
+    # Si la línea está vacía, continuar
+    if not stripped:
+        return None
+    
+    # Detectar título del experimento (líneas que empiezan con EXP-)
+    if stripped.startswith('EXP-'):
+        return ('title', stripped)
+    
+    # Dividir por tabulaciones si hay, si no, tomar los últimos 2 tokens como números
+    if '\t' in stripped:
+        parts = stripped.split('\t')
+        if len(parts) < 3:
+            return None
+        name, n_text, x_text = parts[0].strip(), parts[1].strip(), parts[2].strip()
+    else:
+        parts = stripped.rsplit(None, 2)
+        if len(parts) < 2:
+            return ('metric', stripped)
+        if len(parts) == 2:
+            parts = [''] + parts
+        name, n_text, x_text = parts
+        
+        # Si no hay al menos 2 números al final, es un nombre de métrica
+        if not (n_text.replace(',', '').isdigit() and x_text.replace(',', '').isdigit()):
+            return ('metric', stripped)
+        name = ' '.join(name.split())
+    
+    try:
+        n = int(n_text.replace(',', ''))  # sesiones
+        x = int(x_text.replace(',', ''))  # conversiones
+    except ValueError:
+        raise ValueError(f"Los valores deben ser números enteros en la línea: {line}")
+    
+    if n < x:
+        raise ValueError(f"El número de conversiones ({x}) no puede ser mayor que el número de sesiones ({n}) en: {line}")
+    
+    return ('variant', name, n, x)
+
+def iter_metric_rows(source):
+    """Stream (kind, ...) records from metric text, one input line at a time."""
+    for line in _iter_text_lines(source):
+        record = _parse_metric_line(line)
+        if record is not None:
+            yield record
+
+def parse_metrics_columns(source):
+    """Parse metric text or files into compact columnar arrays.
+    
+    Returns a dict with one entry per metric header in 'metric_names', a
+    deduplicated 'variant_names' list and parallel arrays 'metric_id',
+    'variant_id', 'n' and 'x' with one element per variant row.
+    """
+    experiment_title = None
+    metric_names = []
+    variant_names = []
+    variant_codes = {}
+    metric_id = array('i')
+    variant_id = array('i')
+    n_values = array('q')
+    x_values = array('q')
+    
+    for record in iter_metric_rows(source):
+        kind = record[0]
+        if kind == 'title':
+            experiment_title = record[1]
+        elif kind == 'metric':
+            metric_names.append(record[1])
+        elif metric_names:
+            # Las variantes antes de la primera métrica se ignoran
+            _, name, n, x = record
+            code = variant_codes.get(name)
+            if code is None:
+                code = variant_codes[name] = len(variant_names)
+                variant_names.append(name)
+            metric_id.append(len(metric_names) - 1)
+            variant_id.append(code)
+            n_values.append(n)
+            x_values.append(x)
+    
+    return {
+        'experiment_title': experiment_title,
+        'metric_names': metric_names,
+        'variant_names': variant_names,
+        'metric_id': np.frombuffer(metric_id, dtype=np.int32),
+        'variant_id': np.frombuffer(variant_id, dtype=np.int32),
+        'n': np.frombuffer(n_values, dtype=np.int64),
+        'x': np.frombuffer(x_values, dtype=np.int64)
+    }
+
+def columns_to_metrics(columns):
+    """Convert columnar parse results into the nested metrics dict used by the UI."""
+    metrics_data = {}
+    variant_names = columns['variant_names']
+    rows = [
+        {'name': variant_names[code], 'n': n, 'x': x}
+        for code, n, x in zip(columns['variant_id'].tolist(), columns['n'].tolist(), columns['x'].tolist())
+    ]
+    
+    # Las filas llegan en orden, así que cada métrica ocupa un bloque contiguo
+    bounds = np.searchsorted(columns['metric_id'], np.arange(len(columns['metric_names']) + 1)).tolist()
+    for metric, name in enumerate(columns['metric_names']):
+        # Un encabezado repetido reinicia la métrica, igual que el formato de texto
+        metrics_data[name] = {'variants': rows[bounds[metric]:bounds[metric + 1]]}
+    
+    # Validar que cada métrica tenga al menos 2 variantes
+    for metric, data in metrics_data.items():
+        if len(data['variants']) < 2:
+            raise ValueError(f"La métrica {metric} debe tener al menos 2 variantes")
+    
+    # Mantener compatibilidad con formato legacy para 2 variantes
+    for metric, data in metrics_data.items():
+        if len(data['variants']) == 2:
+            data['baseline'] = data['variants'][0]
+            data['treatment'] = data['variants'][1]
+    
+    # Agregar título del experimento si existe
+    if columns['experiment_title']:
+        return {
+            'experiment_title': columns['experiment_title'],
+            'metrics': metrics_data
+        }
+    else:
+        return metrics_data
+
+def parse_metrics_data(text):
+    """Parse multiple metrics data from text input supporting both legacy and N variants."""
+    return columns_to_metrics(parse_metrics_columns(text))
+
+def convert_metrics_to_text(metrics):
+    """Convert metrics data back to text format for sharing."""
+    text_lines = []
+    
+    # Si hay título de experimento, agregarlo primero
+    if isinstance(metrics, dict) and 'experiment_title' in metrics:
+        text_lines.append(metrics['experiment_title'])
+        text_lines.append("")  # Línea vacía después del título
+        metrics_data = metrics['metrics']
+    else:
+        metrics_data = metrics
+    
+    for metric_name, data in metrics_data.items():
+        text_lines.append(metric_name)
+        for variant in data['variants']:
+            text_lines.append(f"{variant['name']} {variant['n']} {variant['x']}")
+        text_lines.append("")  # Empty line between metrics
+    return "\n".join(text_lines)
@@ -0,0 +1,87 @@
+"""Sample-size, MDE and duration planning for two-proportion z-tests."""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Iteraciones de punto fijo para despejar el MDE (converge en pocas iteraciones)
+MDE_ITERATIONS = 50
+
+
+def _critical_values(n_variants, alpha, power):
+    """Two-sided z for alpha (Bonferroni over the comparisons vs control) and z for power."""
+    comparisons = np.maximum(np.asarray(n_variants) - 1, 1)
+    z_alpha = stats.norm.isf(np.asarray(alpha) / comparisons / 2)
+    z_power = stats.norm.ppf(power)
+    return z_alpha, z_power
+
+def calculate_sample_size(baseline_rate, mde, n_variants=2, alpha=0.05, power=0.8, relative=True):
+    """Sessions needed per variant to detect mde over baseline_rate with the two-proportion z-test.
+    
+    Uses the same unpooled standard error as calculate_ab_test. Every
+    argument broadcasts, so a whole grid is evaluated in one call. mde is a
+    relative lift (0.05 = +5%) or, with relative=False, an absolute
+    difference of rates. With more than two variants alpha is split across
+    the comparisons vs control (Bonferroni). Unreachable targets give nan.
+    """
+    baseline_rate = np.asarray(baseline_rate, dtype=float)
+    mde = np.asarray(mde, dtype=float)
+    treatment_rate = baseline_rate * (1 + mde) if relative else baseline_rate + mde
+    z_alpha, z_power = _critical_values(n_variants, alpha, power)
+    
+    # Mismo error estándar separado (no agrupado) que calculate_ab_test, bajo H0 y bajo H1
+    variance = baseline_rate * (1 - baseline_rate) + treatment_rate * (1 - treatment_rate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sessions = (z_alpha + z_power) ** 2 * variance / (treatment_rate - baseline_rate) ** 2
+    
+    valid = (treatment_rate > 0) & (treatment_rate < 1) & (treatment_rate != baseline_rate)
+    return np.where(valid, np.ceil(sessions), np.nan)
+
+def calculate_mde(sessions_per_variant, baseline_rate, n_variants=2, alpha=0.05, power=0.8, relative=True):
+    """Smallest effect detectable with the given sessions per variant (inverse of calculate_sample_size)."""
+    sessions = np.asarray(sessions_per_variant, dtype=float)
+    baseline_rate = np.asarray(baseline_rate, dtype=float)
+    z_alpha, z_power = _critical_values(n_variants, alpha, power)
+    
+    # Punto fijo sobre la diferencia absoluta, partiendo de la varianza del baseline
+    difference = (z_alpha + z_power) * np.sqrt(2 * baseline_rate * (1 - baseline_rate) / sessions)
+    for _ in range(MDE_ITERATIONS):
+        treatment_rate = np.clip(baseline_rate + difference, 0.0, 1.0)
+        difference = (z_alpha + z_power) * np.sqrt(
+            (baseline_rate * (1 - baseline_rate) + treatment_rate * (1 - treatment_rate)) / sessions
+        )
+    
+    if relative:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(baseline_rate > 0, difference / baseline_rate, np.nan)
+    return difference
+
+def plan_experiments(baseline_rates, mdes, n_variants=(2,), alphas=(0.05,), powers=(0.8,), daily_sessions=None, relative=True):
+    """Evaluate the full planning grid and return one row per combination.
+    
+    Columns: baseline_rate, mde, n_variants, alpha, power, sessions_per_variant,
+    total_sessions and, when daily_sessions (total traffic per day across all
+    variants) is given, days.
+    """
+    grid = np.meshgrid(
+        np.asarray(baseline_rates, dtype=float),
+        np.asarray(mdes, dtype=float),
+        np.asarray(n_variants, dtype=int),
+        np.asarray(alphas, dtype=float),
+        np.asarray(powers, dtype=float),
+        indexing='ij'
+    )
+    baseline_rate, mde, variants, alpha, power = (axis.ravel() for axis in grid)
+    sessions = calculate_sample_size(baseline_rate, mde, variants, alpha, power, relative=relative)
+    
+    plan = pd.DataFrame({
+        'baseline_rate': baseline_rate,
+        'mde': mde,
+        'n_variants': variants,
+        'alpha': alpha,
+        'power': power,
+        'sessions_per_variant': sessions,
+        'total_sessions': sessions * variants
+    })
+    if daily_sessions:
+        plan['days'] = np.ceil(plan['total_sessions'] / daily_sessions)
+    return plan
@@ -0,0 +1,23 @@
+"""Reproducible random streams for Monte Carlo simulation."""
+import hashlib
+import json
+
+import numpy as np
+
+# Semilla base por defecto: las simulaciones son reproducibles salvo que se indique otra
+DEFAULT_SEED = 0
+
+def derive_rng(*key, seed=DEFAULT_SEED):
+    """Return an independent Generator for the stream identified by key.
+    
+    The stream depends only on the seed and the key values (e.g. experiment,
+    metric and pair names), never on call order, global numpy state or the
+    process that runs it.
+    """
+    digest = hashlib.sha256(json.dumps([str(part) for part in key]).encode()).digest()
+    spawn_key = tuple(int(word) for word in np.frombuffer(digest[:16], dtype=np.uint32))
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=spawn_key)))
+
+def counts_key(n, x):
+    """Canonical tuple of integer counts, used to key streams by the data itself."""
+    return tuple(int(value) for value in np.ravel(n)) + tuple(int(value) for value in np.ravel(x))
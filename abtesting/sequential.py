@@ -0,0 +1,84 @@
+"""Sequential testing (mSPRT) with always-valid p-values for continuously monitored experiments."""
+import numpy as np
+
+# Desviación estándar de la mezcla normal sobre la diferencia de tasas (H1 del mSPRT)
+SEQUENTIAL_MIXTURE_SD = 0.01
+
+
+def calculate_sequential_test(n, x, alpha=0.05, tau=SEQUENTIAL_MIXTURE_SD):
+    """Run a mixture SPRT over a time series of cumulative counts for every pair of variants.
+    
+    n and x have shape (looks, ..., N): one row of cumulative sessions and
+    conversions per look (e.g. per hour). Entry [..., i, j] tests variant j
+    (B) against variant i (A) on the difference of rates p_B - p_A, using a
+    normal approximation and a N(0, tau^2) mixture over the alternative.
+    
+    Returns per-look arrays of shape (looks, ..., N, N): 'difference', the
+    always-valid 'p_value' and the 'lower'/'upper' bounds of the confidence
+    sequence, which stay valid however often the data is inspected, plus
+    'significant' and 'stop_look' (first look where the test rejects, -1 if
+    it never does).
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    tau_sq = tau ** 2
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = x / n
+        rate_variance = rate * (1 - rate) / n
+        difference = rate[..., None, :] - rate[..., :, None]
+        variance = rate_variance[..., :, None] + rate_variance[..., None, :]
+        has_variance = variance > 0
+        
+        # Log del cociente de verosimilitud mezclado en cada look
+        log_likelihood_ratio = np.where(
+            has_variance,
+            0.5 * np.log(variance / (variance + tau_sq))
+            + tau_sq * difference ** 2 / (2 * variance * (variance + tau_sq)),
+            0.0
+        )
+        
+        # Radio de la secuencia de confianza: {delta : LR(delta) < 1 / alpha}
+        half_width = np.where(
+            has_variance,
+            np.sqrt(variance * (variance + tau_sq) / tau_sq * (np.log((variance + tau_sq) / variance) - 2 * np.log(alpha))),
+            np.inf
+        )
+    
+    # p-values siempre válidos: mínimo acumulado de 1 / LR; la secuencia de
+    # confianza es la intersección de los intervalos de todos los looks
+    p_value = np.minimum.accumulate(np.exp(-np.maximum(log_likelihood_ratio, 0.0)), axis=0)
+    lower = np.maximum.accumulate(np.nan_to_num(difference - half_width, nan=-np.inf), axis=0)
+    upper = np.minimum.accumulate(np.nan_to_num(difference + half_width, nan=np.inf), axis=0)
+    lower = np.maximum(lower, -1.0)
+    upper = np.minimum(upper, 1.0)
+    
+    significant = p_value < alpha
+    stop_look = np.where(significant.any(axis=0), significant.argmax(axis=0), -1)
+    return {
+        'difference': difference,
+        'p_value': p_value,
+        'lower': lower,
+        'upper': upper,
+        'significant': significant,
+        'stop_look': stop_look
+    }
+
+def sequential_decision(sequential, i, j, look=-1):
+    """Summarize the mSPRT result of variant j against variant i at a given look."""
+    stop_look = int(sequential['stop_look'][i, j])
+    if stop_look < 0:
+        decision = 'continue'
+    elif sequential['difference'][stop_look, i, j] > 0:
+        decision = 'stop_winner'
+    else:
+        decision = 'stop_loser'
+    return {
+        'difference': float(sequential['difference'][look, i, j]),
+        'p_value': float(sequential['p_value'][look, i, j]),
+        'lower': float(sequential['lower'][look, i, j]),
+        'upper': float(sequential['upper'][look, i, j]),
+        'significant': bool(sequential['significant'][look, i, j]),
+        'stop_look': stop_look,
+        'decision': decision
+    }
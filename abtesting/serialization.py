@@ -0,0 +1,26 @@
+"""JSON serialization of computed statistics, including numpy arrays and scalars."""
+import json
+
+import numpy as np
+
+def _encode_value(value):
+    """JSON default hook: numpy arrays and scalars to tagged JSON values."""
+    if isinstance(value, np.ndarray):
+        return {'__ndarray__': value.tolist(), 'dtype': str(value.dtype)}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+def _decode_value(value):
+    """JSON object hook: tagged values back to numpy arrays."""
+    if '__ndarray__' in value:
+        return np.array(value['__ndarray__'], dtype=value['dtype'])
+    return value
+
+def dumps(value):
+    """Serialize statistics (dicts, lists, numpy values) to a JSON string."""
+    return json.dumps(value, default=_encode_value)
+
+def loads(text):
+    """Inverse of dumps, restoring numpy arrays."""
+    return json.loads(text, object_hook=_decode_value)
@@ -0,0 +1,126 @@
+"""Encoding of metrics data for shareable URLs."""
+import base64
+import json
+import zlib
+
+# Prefijo del formato compacto; los links sin prefijo son JSON en base64 (formato legacy)
+COMPACT_FORMAT_PREFIX = 'v2.'
+
+def _write_varint(buffer, value):
+    """Append a non-negative integer as a LEB128 varint."""
+    if value < 0:
+        raise ValueError(f"No se pueden codificar valores negativos: {value}")
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _read_varint(payload, position):
+    """Read a LEB128 varint, returning (value, next_position)."""
+    value = 0
+    shift = 0
+    while True:
+        byte = payload[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def pack_metrics(data):
+    """Pack metrics data into the compact binary layout (before compression).
+    
+    Layout, all integers as varints: string table (count, then length-prefixed
+    UTF-8 strings), title (0 = none, else string index + 1), metric count and,
+    per metric, name index, variant count and (name index, n, x) per variant.
+    The duplicated legacy 'baseline'/'treatment' keys are not stored.
+    """
+    if isinstance(data, dict) and 'experiment_title' in data:
+        title, metrics_data = data['experiment_title'], data['metrics']
+    else:
+        title, metrics_data = None, data
+    
+    # Tabla de strings: los nombres de variantes se repiten en cada métrica
+    strings = {}
+    def string_index(text):
+        return strings.setdefault(text, len(strings))
+    
+    body = bytearray()
+    _write_varint(body, string_index(title) + 1 if title else 0)
+    _write_varint(body, len(metrics_data))
+    for metric_name, metric in metrics_data.items():
+        if metric.get('type') == 'continuous':
+            raise ValueError(f"La métrica {metric_name} es continua y no se puede compartir en formato compacto")
+        _write_varint(body, string_index(metric_name))
+        _write_varint(body, len(metric['variants']))
+        for variant in metric['variants']:
+            _write_varint(body, string_index(variant['name']))
+            _write_varint(body, int(variant['n']))
+            _write_varint(body, int(variant['x']))
+    
+    header = bytearray()
+    _write_varint(header, len(strings))
+    for text in strings:
+        encoded = text.encode('utf-8')
+        _write_varint(header, len(encoded))
+        header.extend(encoded)
+    return bytes(header + body)
+
+def unpack_metrics(payload):
+    """Rebuild the nested metrics dict from pack_metrics output."""
+    position = 0
+    n_strings, position = _read_varint(payload, position)
+    strings = []
+    for _ in range(n_strings):
+        length, position = _read_varint(payload, position)
+        strings.append(payload[position:position + length].decode('utf-8'))
+        position += length
+    
+    title_index, position = _read_varint(payload, position)
+    n_metrics, position = _read_varint(payload, position)
+    metrics_data = {}
+    for _ in range(n_metrics):
+        name_index, position = _read_varint(payload, position)
+        n_variants, position = _read_varint(payload, position)
+        variants = []
+        for _ in range(n_variants):
+            variant_index, position = _read_varint(payload, position)
+            n, position = _read_varint(payload, position)
+            x, position = _read_varint(payload, position)
+            variants.append({'name': strings[variant_index], 'n': n, 'x': x})
+        
+        metric = {'variants': variants}
+        # Mantener compatibilidad con formato legacy para 2 variantes
+        if len(variants) == 2:
+            metric['baseline'] = variants[0]
+            metric['treatment'] = variants[1]
+        metrics_data[strings[name_index]] = metric
+    
+    if title_index:
+        return {
+            'experiment_title': strings[title_index - 1],
+            'metrics': metrics_data
+        }
+    return metrics_data
+
+def encode_data_to_url(data):
+    """Encode data to a compact, compressed URL-safe string."""
+    try:
+        compressed = zlib.compress(pack_metrics(data), 9)
+        encoded = base64.urlsafe_b64encode(compressed).decode().rstrip('=')
+        return COMPACT_FORMAT_PREFIX + encoded
+    except Exception:
+        return None
+
+def decode_data_from_url(encoded_data):
+    """Decode data from the compact format or from legacy URL-safe base64 JSON."""
+    try:
+        if encoded_data.startswith(COMPACT_FORMAT_PREFIX):
+            encoded = encoded_data[len(COMPACT_FORMAT_PREFIX):]
+            compressed = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            return unpack_metrics(zlib.decompress(compressed))
+        
+        decoded = base64.urlsafe_b64decode(encoded_data.encode()).decode()
+        return json.loads(decoded)
+    except Exception:
+        return None
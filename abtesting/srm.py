@@ -0,0 +1,101 @@
+"""Sample ratio mismatch (SRM) checks of the traffic split across variants."""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .ingest import collapse_periods, group_metrics, sort_by_group, stack_order
+
+# Umbral habitual para SRM: muy estricto, porque el chequeo corre sobre todas las métricas
+SRM_ALPHA = 0.001
+
+
+def calculate_srm_batch(n, weights=None, alpha=SRM_ALPHA):
+    """Chi-square goodness-of-fit of the sessions of many metrics against the intended split.
+    
+    n has shape (..., N); weights (equal split by default) is broadcast
+    against it, so it can be one split for every metric or one per metric,
+    and does not need to sum to 1. A metric is flagged when its p-value is
+    below alpha.
+    """
+    n = np.asarray(n, dtype=float)
+    weights = np.ones(n.shape[-1]) if weights is None else np.asarray(weights, dtype=float)
+    if weights.shape[-1] != n.shape[-1]:
+        raise ValueError(f"Se esperaban {n.shape[-1]} pesos (uno por variante) y se recibieron {weights.shape[-1]}")
+    if (weights <= 0).any():
+        raise ValueError("Los pesos del split esperado deben ser positivos")
+    
+    expected_share = np.broadcast_to(weights / np.sum(weights, axis=-1, keepdims=True), n.shape)
+    total = np.sum(n, axis=-1, keepdims=True)
+    expected = total * expected_share
+    dof = n.shape[-1] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = np.sum(np.where(expected > 0, (n - expected) ** 2 / expected, 0.0), axis=-1)
+        observed_share = np.where(total > 0, n / total, np.nan)
+    # Sin sesiones no hay nada que contrastar
+    p_value = np.where(total[..., 0] > 0, stats.chi2.sf(chi2, dof), 1.0)
+    return {
+        'chi2': chi2,
+        'p_value': p_value,
+        'dof': dof,
+        'expected': expected,
+        'observed_share': observed_share,
+        'expected_share': expected_share,
+        'mismatch': p_value < alpha
+    }
+
+def check_srm(variants, weights=None, alpha=SRM_ALPHA):
+    """Run calculate_srm_batch on the sessions of one metric's variants."""
+    return calculate_srm_batch([variant['n'] for variant in variants], weights, alpha)
+
+def _split_label(shares):
+    """Format one row of shares like '50.1% / 49.9%'."""
+    return ' / '.join(f"{share:.1%}" for share in shares)
+
+def calculate_table_srm(table, weights=None, alpha=SRM_ALPHA):
+    """Check the split of every metric of a metrics table in one vectorized pass per variant count.
+    
+    weights is a sequence with one weight per variant position or a
+    {variant name: weight} mapping (every variant must be listed); by
+    default the split is equal. Returns a DataFrame with one row per metric;
+    time-series exports are summed over their periods first.
+    """
+    table = collapse_periods(table)
+    groups = group_metrics(table)
+    keys, labels, sizes = groups['keys'], groups['labels'], groups['sizes']
+    variant = table['variant'].astype(str).to_numpy()
+    sessions = table['sessions'].to_numpy()
+    
+    frames = []
+    for size in np.unique(sizes):
+        if size < 2:
+            continue
+        selected = np.flatnonzero(sizes == size)
+        order = stack_order(groups, selected)
+        shape = (len(selected), size)
+        n = sessions[order].reshape(shape)
+        
+        # Pesos por nombre de variante: una fila de pesos por métrica
+        if isinstance(weights, dict):
+            missing = sorted(set(variant[order]) - set(weights))
+            if missing:
+                raise ValueError(f"Faltan pesos del split esperado para: {', '.join(missing)}")
+            metric_weights = np.array([weights[name] for name in variant[order]], dtype=float).reshape(shape)
+        else:
+            metric_weights = weights
+        srm = calculate_srm_batch(n, metric_weights, alpha)
+        
+        frames.append(pd.DataFrame({
+            **{key: labels[key][selected] for key in keys},
+            'n_variants': size,
+            'sessions': n.sum(axis=-1),
+            'observed_split': [_split_label(shares) for shares in srm['observed_share']],
+            'expected_split': [_split_label(shares) for shares in srm['expected_share']],
+            'srm_chi2': srm['chi2'],
+            'srm_p_value': srm['p_value'],
+            'srm_mismatch': srm['mismatch'],
+            '_group': selected
+        }))
+    
+    if not frames:
+        return pd.DataFrame(columns=keys + ['srm_mismatch'])
+    return sort_by_group(pd.concat(frames, ignore_index=True))
@@ -0,0 +1,439 @@
+"""Frequentist and Bayesian comparison statistics for conversion metrics."""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.stats import chi2_contingency
+
+from .bayes import (
+    DEFAULT_P2BB_METHOD,
+    calculate_joint_posterior,
+    calculate_p2bb,
+    calculate_p2bb_matrix,
+    calculate_p2bb_pairs,
+)
+from .cache import persistent_cache
+from .ingest import collapse_periods, group_metrics, is_continuous_table, sort_by_group, stack_order
+from .intervals import calculate_intervals
+from .rng import DEFAULT_SEED, derive_rng
+
+
+def calculate_pairwise_matrix(n, x, alpha=0.05, p2bb_method=DEFAULT_P2BB_METHOD, rng=None):
+    """Calculate dense N×N matrices of lift, z, p-value, significance and P2BB.
+    
+    Entry [i, j] compares variant i (A) against variant j (B), as in
+    calculate_single_comparison(variants[i], variants[j]). Rate, credible
+    and lift intervals at level 1 - alpha come from calculate_intervals.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    rate, variance = _rate_and_variance(n, x)
+    
+    comparison = _compare_rates(
+        rate[..., :, None], variance[..., :, None],
+        rate[..., None, :], variance[..., None, :],
+        alpha
+    )
+    return {
+        'rate': rate,
+        **comparison,
+        'p2bb': calculate_p2bb_matrix(n, x, method=p2bb_method, rng=rng),
+        **calculate_intervals(n, x, alpha)
+    }
+
+def _rate_and_variance(n, x):
+    """Conversion rate and its binomial variance per variant."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = x / n
+        return rate, rate * (1 - rate) / n
+
+def _compare_rates(a_p, a_variance, b_p, b_variance, alpha):
+    """Two-proportion z-test and relative lift of B over A, element-wise."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Error estándar, z-score y p-value (dos colas) para todos los pares
+        se = np.sqrt(a_variance + b_variance)
+        has_se = se > 0
+        z_score = np.where(has_se, (b_p - a_p) / se, 0.0)
+        p_value = np.where(has_se, 2 * stats.norm.sf(np.abs(z_score)), 1.0)
+        
+        # Lift relativo de B sobre A (indefinido con A en cero o sin datos)
+        relative_lift = np.where(np.abs(a_p) > 0, (b_p - a_p) / a_p * 100, 0.0)
+    
+    return {
+        'se': se,
+        'z_score': z_score,
+        'p_value': p_value,
+        'relative_lift': relative_lift,
+        'significant': p_value < alpha
+    }
+
+def compare_means(a_mean, a_variance, b_mean, b_variance, alpha=0.05):
+    """Normal-approximation comparison of B against A from estimated means and their variances.
+    
+    Shared by the engines whose estimates are not raw conversion rates
+    (continuous, CUPED-adjusted and jackknifed ratio means). Adds to the
+    _compare_rates z-test a delta-method interval for the relative lift,
+    'lift_lower'/'lift_upper', and the normal approximation of P(B > A),
+    'p2bb'. Inputs broadcast element-wise, e.g. (..., N, 1) against (..., 1, N).
+    """
+    comparison = _compare_rates(a_mean, a_variance, b_mean, b_variance, alpha)
+    z = stats.norm.isf(alpha / 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        defined = np.abs(a_mean) > 0
+        ratio = b_mean / a_mean
+        ratio_se = np.sqrt(b_variance / a_mean ** 2 + b_mean ** 2 * a_variance / a_mean ** 4)
+        comparison['lift_lower'] = np.where(defined, (ratio - z * ratio_se - 1) * 100, np.nan)
+        comparison['lift_upper'] = np.where(defined, (ratio + z * ratio_se - 1) * 100, np.nan)
+    comparison['p2bb'] = np.where(comparison['se'] > 0, stats.norm.cdf(comparison['z_score']), 0.5)
+    return comparison
+
+def comparison_from_matrix(matrix, variants, i, j, is_control_comparison=False):
+    """Extract one pairwise comparison from calculate_pairwise_matrix (or correct_matrices) results."""
+    return {
+        'variant_a_name': variants[i]['name'],
+        'variant_b_name': variants[j]['name'],
+        'variant_a_p': float(matrix['rate'][i]),
+        'variant_b_p': float(matrix['rate'][j]),
+        'variant_a_ci': _interval(matrix, 'rate', i),
+        'variant_b_ci': _interval(matrix, 'rate', j),
+        'relative_lift': float(matrix['relative_lift'][i, j]),
+        'relative_lift_ci': _interval(matrix, 'lift', i, j),
+        'p_value': float(matrix['p_value'][i, j]),
+        'adjusted_p_value': float(matrix.get('adjusted_p_value', matrix['p_value'])[i, j]),
+        'p2bb': float(matrix['p2bb'][i, j]),
+        'significant': bool(matrix['significant'][i, j]),
+        'is_control_comparison': is_control_comparison
+    }
+
+def ab_test_from_matrix(matrix, i, j):
+    """Extract calculate_ab_test-style results for control i and treatment j."""
+    return {
+        'control_p': float(matrix['rate'][i]),
+        'treatment_p': float(matrix['rate'][j]),
+        'control_ci': _interval(matrix, 'rate', i),
+        'treatment_ci': _interval(matrix, 'rate', j),
+        'control_credible': _interval(matrix, 'credible', i),
+        'treatment_credible': _interval(matrix, 'credible', j),
+        'se': float(matrix['se'][i, j]),
+        'z_score': float(matrix['z_score'][i, j]),
+        'p_value': float(matrix['p_value'][i, j]),
+        'adjusted_p_value': float(matrix.get('adjusted_p_value', matrix['p_value'])[i, j]),
+        'significant': bool(matrix['significant'][i, j]),
+        'relative_lift': float(matrix['relative_lift'][i, j]),
+        'relative_lift_ci': _interval(matrix, 'lift', i, j),
+        'p2bb': float(matrix['p2bb'][i, j])
+    }
+
+def _interval(matrix, name, *index):
+    """(lower, upper) of one interval entry, or None for results computed without intervals."""
+    if f'{name}_lower' not in matrix:
+        return None
+    return (float(matrix[f'{name}_lower'][index]), float(matrix[f'{name}_upper'][index]))
+
+def _counts_cache_key(counts):
+    """Canonical cache key for a sequence of (n, x) counts."""
+    return [[int(n), int(x)] for n, x in counts]
+
+def calculate_ab_test(control_n, control_x, treatment_n, treatment_x, p2bb_method=DEFAULT_P2BB_METHOD, rng=None):
+    """Calculate A/B test statistics for legacy support."""
+    control_p = control_x / control_n
+    treatment_p = treatment_x / treatment_n
+    
+    # Calculate standard error
+    se = np.sqrt(
+        (control_p * (1 - control_p) / control_n) +
+        (treatment_p * (1 - treatment_p) / treatment_n)
+    )
+    
+    # Calculate z-score
+    z_score = (treatment_p - control_p) / se if se > 0 else 0
+    
+    # Calculate p-value (two-tailed)
+    p_value = 2 * (1 - stats.norm.cdf(abs(z_score))) if se > 0 else 1
+    
+    # Calculate relative lift
+    relative_lift = ((treatment_p - control_p) / control_p) * 100 if control_p > 0 else 0
+    
+    # Calculate bayesian probability
+    p2bb = calculate_p2bb(control_n, control_x, treatment_n, treatment_x, method=p2bb_method, rng=rng)
+    
+    return {
+        'control_p': control_p,
+        'treatment_p': treatment_p,
+        'se': se,
+        'z_score': z_score,
+        'p_value': p_value,
+        'relative_lift': relative_lift,
+        'p2bb': p2bb
+    }
+
+def calculate_chi_square_test(variants):
+    """Calculate Chi-square test for multiple variants."""
+    # Crear tabla de contingencia
+    conversions = [variant['x'] for variant in variants]
+    non_conversions = [variant['n'] - variant['x'] for variant in variants]
+    
+    # Tabla de contingencia: [conversiones, no_conversiones] para cada variante
+    contingency_table = np.array([conversions, non_conversions])
+    
+    # Test Chi-cuadrado
+    chi2, p_value, dof, expected = chi2_contingency(contingency_table)
+    
+    return {
+        'chi2': chi2,
+        'p_value': p_value,
+        'dof': dof,
+        'significant': p_value < 0.05
+    }
+
+def calculate_chi_square_batch(n, x):
+    """Calculate the chi-square test for many metrics at once from (..., N) count arrays."""
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    
+    # Tabla de contingencia (..., 2, N): conversiones y no conversiones por variante
+    observed = np.stack([x, n - x], axis=-2)
+    expected = (
+        observed.sum(axis=-1, keepdims=True) * observed.sum(axis=-2, keepdims=True)
+        / observed.sum(axis=(-2, -1), keepdims=True)
+    )
+    dof = n.shape[-1] - 1
+    
+    # Corrección de Yates para 2 variantes, igual que chi2_contingency
+    if dof == 1:
+        difference = expected - observed
+        observed = observed + np.sign(difference) * np.minimum(0.5, np.abs(difference))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = np.sum((observed - expected) ** 2 / expected, axis=(-2, -1))
+    p_value = stats.chi2.sf(chi2, dof)
+    return {
+        'chi2': chi2,
+        'p_value': p_value,
+        'dof': dof,
+        'significant': p_value < 0.05
+    }
+
+def calculate_table_results(table, p2bb_method=DEFAULT_P2BB_METHOD, seed=DEFAULT_SEED):
+    """Run the pairwise and chi-square engines directly over a metrics table.
+    
+    Metrics with the same number of variants are stacked and computed in a
+    single vectorized call. Returns a dict with a 'pairs' DataFrame (one row
+    per i < j comparison) and a 'metrics' DataFrame (one row per metric).
+    Continuous metrics (rows with sum/sum_sq) use the Welch engine: their
+    variant_*_p columns hold means and z_score holds the t statistic. Tables
+    with a 'segment' column (segment_table) get one group, and a 'segment'
+    result column, per segment × metric. Monte Carlo P2BB uses one seeded
+    stream per (experiment[, segment], metric), so the results do not depend
+    on how the table is split across processes. Time-series exports are
+    summed over their periods first.
+    """
+    # Import local: continuous usa compare_means de este módulo
+    from .continuous import calculate_continuous_matrix
+    
+    table = collapse_periods(table)
+    # Tablas segmentadas (segment_table): un grupo por experimento, segmento y métrica
+    groups = group_metrics(table)
+    keys, labels, sizes = groups['keys'], groups['labels'], groups['sizes']
+    first_rows = groups['first_rows']
+    
+    variant = table['variant'].astype(str).to_numpy()
+    sessions = table['sessions'].to_numpy()
+    conversions = table['conversions'].to_numpy()
+    
+    # Métricas continuas: todas sus filas traen sum/sum_sq
+    continuous = np.zeros(len(sizes), dtype=bool)
+    if is_continuous_table(table):
+        totals = table['sum'].to_numpy(dtype=float)
+        totals_sq = table['sum_sq'].to_numpy(dtype=float)
+        continuous[groups['group_id'][first_rows]] = ~np.isnan(totals[first_rows])
+    
+    pair_frames = []
+    metric_frames = []
+    for is_continuous, size in sorted(set(zip(continuous.tolist(), sizes.tolist()))):
+        if size < 2:
+            continue
+        # Matrices (grupos, variantes) para todas las métricas del mismo tipo y número de variantes
+        selected = np.flatnonzero((sizes == size) & (continuous == is_continuous))
+        order = stack_order(groups, selected)
+        shape = (len(selected), size)
+        n = sessions[order].reshape(shape)
+        names = variant[order].reshape(shape)
+        
+        if is_continuous:
+            matrix = calculate_continuous_matrix(n, totals[order].reshape(shape), totals_sq[order].reshape(shape))
+            value, value_lower, value_upper, score = 'mean', 'mean_lower', 'mean_upper', 't_score'
+            chi_square = {name: np.full(len(selected), np.nan) for name in ('chi2', 'p_value')}
+            chi_square['significant'] = np.zeros(len(selected), dtype=bool)
+        else:
+            # Un stream aleatorio independiente por métrica para Monte Carlo
+            x = conversions[order].reshape(shape)
+            rngs = None
+            if p2bb_method == 'montecarlo':
+                rngs = [derive_rng(*(labels[key][g] for key in keys), seed=seed) for g in selected]
+            matrix = calculate_pairwise_matrix(n, x, p2bb_method=p2bb_method, rng=rngs)
+            value, value_lower, value_upper, score = 'rate', 'rate_lower', 'rate_upper', 'z_score'
+            chi_square = calculate_chi_square_batch(n, x)
+        
+        a, b = np.triu_indices(size, 1)
+        pair_frames.append(pd.DataFrame({
+            **{key: np.repeat(labels[key][selected], len(a)) for key in keys},
+            'metric_type': 'continuous' if is_continuous else 'conversion',
+            'variant_a': names[:, a].ravel(),
+            'variant_b': names[:, b].ravel(),
+            'variant_a_p': matrix[value][:, a].ravel(),
+            'variant_b_p': matrix[value][:, b].ravel(),
+            'variant_a_ci_lower': matrix[value_lower][:, a].ravel(),
+            'variant_a_ci_upper': matrix[value_upper][:, a].ravel(),
+            'variant_b_ci_lower': matrix[value_lower][:, b].ravel(),
+            'variant_b_ci_upper': matrix[value_upper][:, b].ravel(),
+            'relative_lift': matrix['relative_lift'][:, a, b].ravel(),
+            'relative_lift_ci_lower': matrix['lift_lower'][:, a, b].ravel(),
+            'relative_lift_ci_upper': matrix['lift_upper'][:, a, b].ravel(),
+            'z_score': matrix[score][:, a, b].ravel(),
+            'p_value': matrix['p_value'][:, a, b].ravel(),
+            'p2bb': matrix['p2bb'][:, a, b].ravel(),
+            'significant': matrix['significant'][:, a, b].ravel(),
+            'is_control_comparison': np.tile(a == 0, len(selected)),
+            '_group': np.repeat(selected, len(a))
+        }))
+        metric_frames.append(pd.DataFrame({
+            **{key: labels[key][selected] for key in keys},
+            'metric_type': 'continuous' if is_continuous else 'conversion',
+            'n_variants': size,
+            'chi2': chi_square['chi2'],
+            'chi2_p_value': chi_square['p_value'],
+            'chi2_significant': chi_square['significant'],
+            '_group': selected
+        }))
+    
+    if not metric_frames:
+        return {'pairs': pd.DataFrame(), 'metrics': pd.DataFrame()}
+    
+    # Mantener el orden de aparición de las métricas en el archivo
+    return {
+        'pairs': sort_by_group(pd.concat(pair_frames, ignore_index=True)),
+        'metrics': sort_by_group(pd.concat(metric_frames, ignore_index=True))
+    }
+
+def calculate_pairwise_comparisons(variants, p2bb_method=DEFAULT_P2BB_METHOD, matrix=None, rng=None):
+    """Calculate pairwise comparisons between all variants."""
+    if matrix is None:
+        matrix = calculate_pairwise_matrix(
+            [variant['n'] for variant in variants],
+            [variant['x'] for variant in variants],
+            p2bb_method=p2bb_method,
+            rng=rng
+        )
+    
+    # Comparaciones vs control (primera variante)
+    return [
+        comparison_from_matrix(matrix, variants, 0, i, is_control_comparison=True)
+        for i in range(1, len(variants))
+    ]
+
+def calculate_all_pairwise_comparisons(variants, p2bb_method=DEFAULT_P2BB_METHOD, matrix=None, rng=None):
+    """Calculate all possible pairwise comparisons between variants."""
+    if matrix is None:
+        matrix = calculate_pairwise_matrix(
+            [variant['n'] for variant in variants],
+            [variant['x'] for variant in variants],
+            p2bb_method=p2bb_method,
+            rng=rng
+        )
+    
+    # Generar todas las combinaciones posibles de variantes
+    return [
+        comparison_from_matrix(matrix, variants, i, j, is_control_comparison=(i == 0))
+        for i, j in combinations(range(len(variants)), 2)
+    ]
+
+def calculate_single_comparison(variant_a, variant_b, is_control_comparison=False, p2bb_method=DEFAULT_P2BB_METHOD, rng=None):
+    """Calculate statistics for a single pairwise comparison."""
+    # Mismos cálculos que calculate_ab_test
+    result = calculate_ab_test(
+        variant_a['n'], variant_a['x'], variant_b['n'], variant_b['x'], p2bb_method=p2bb_method, rng=rng
+    )
+    
+    return {
+        'variant_a_name': variant_a['name'],
+        'variant_b_name': variant_b['name'],
+        'variant_a_p': result['control_p'],
+        'variant_b_p': result['treatment_p'],
+        'relative_lift': result['relative_lift'],
+        'p_value': result['p_value'],
+        'p2bb': result['p2bb'],
+        'significant': result['p_value'] < 0.05,
+        'is_control_comparison': is_control_comparison
+    }
+
+def _metric_statistics_cache_key(counts, p2bb_method=DEFAULT_P2BB_METHOD, rng=None):
+    # Con un rng explícito el resultado Monte Carlo depende del estado del generador
+    if rng is not None:
+        return None
+    return [p2bb_method, _counts_cache_key(counts)]
+
+@persistent_cache('metric_statistics', _metric_statistics_cache_key)
+def calculate_metric_statistics(counts, p2bb_method=DEFAULT_P2BB_METHOD, rng=None):
+    """Compute every statistic shown for one metric from its (n, x) counts."""
+    n = [variant_n for variant_n, _ in counts]
+    x = [variant_x for _, variant_x in counts]
+    return {
+        'matrix': calculate_pairwise_matrix(n, x, p2bb_method=p2bb_method, rng=rng),
+        'chi_square': calculate_chi_square_test([{'n': variant_n, 'x': variant_x} for variant_n, variant_x in counts]),
+        'joint': calculate_joint_posterior(n, x)
+    }
+
+def update_metric_statistics(results, counts, changed, p2bb_method=DEFAULT_P2BB_METHOD, alpha=0.05):
+    """Refresh calculate_metric_statistics results after the variants in changed got new counts.
+    
+    Only the comparisons involving a changed variant, the intervals, the
+    chi-square test and the joint posterior summary are recomputed; every
+    other matrix entry is reused from results. Exact P2BB comes from
+    calculate_p2bb_pairs, so it matches a full recompute within
+    P2BB_TOLERANCE rather than bit for bit. Monte Carlo P2BB, whose draws
+    are shared by all pairs, recomputes the whole P2BB matrix but nothing
+    else. Without results, or when the number of variants changed, it falls
+    back to a full calculate_metric_statistics.
+    """
+    n = np.array([variant_n for variant_n, _ in counts], dtype=float)
+    x = np.array([variant_x for _, variant_x in counts], dtype=float)
+    changed = np.unique(np.asarray(list(changed), dtype=int))
+    if results is None or results['matrix']['rate'].shape != n.shape:
+        return calculate_metric_statistics(counts, p2bb_method=p2bb_method)
+    if len(changed) == 0:
+        return results
+    
+    matrix = {key: value.copy() for key, value in results['matrix'].items()}
+    rate, variance = _rate_and_variance(n, x)
+    matrix['rate'][changed] = rate[changed]
+    
+    # Pares afectados (i < j) con al menos una variante modificada
+    first, second = np.triu_indices(len(n), 1)
+    affected = np.isin(first, changed) | np.isin(second, changed)
+    first, second = first[affected], second[affected]
+    
+    # Ambas orientaciones de cada par, [i, j] y [j, i], más la diagonal de las modificadas
+    rows = np.concatenate([first, second, changed])
+    cols = np.concatenate([second, first, changed])
+    comparison = _compare_rates(rate[rows], variance[rows], rate[cols], variance[cols], alpha)
+    for key, values in comparison.items():
+        matrix[key][rows, cols] = values
+    
+    # Los intervalos son aritmética vectorizada barata: se recalculan completos
+    matrix.update(calculate_intervals(n, x, alpha))
+    
+    if p2bb_method == 'exact':
+        p_second_beats_first = calculate_p2bb_pairs(n, x, first, second)
+        matrix['p2bb'][first, second] = p_second_beats_first
+        matrix['p2bb'][second, first] = 1 - p_second_beats_first
+    else:
+        matrix['p2bb'] = calculate_p2bb_matrix(n, x, method=p2bb_method)
+    
+    return {
+        'matrix': matrix,
+        'chi_square': calculate_chi_square_test([{'n': variant_n, 'x': variant_x} for variant_n, variant_x in counts]),
+        # La simulación conjunta depende de todas las variantes a la vez
+        'joint': calculate_joint_posterior(n, x)
+    }
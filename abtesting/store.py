@@ -0,0 +1,80 @@
+"""Content-addressed local store of shared experiments and their computed results."""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from .serialization import dumps, loads
+from .sharing import pack_metrics, unpack_metrics
+
+# Ruta de la base SQLite (configurable con ABTEST_STORE_PATH); por defecto junto al caché,
+# en el directorio de caché del usuario y no en el directorio de trabajo
+STORE_PATH_ENV = 'ABTEST_STORE_PATH'
+DEFAULT_STORE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'abtesting',
+    'store.sqlite3'
+)
+# Caracteres del ID corto que se comparte en la URL
+SHARE_ID_LENGTH = 12
+
+def _connect(path=None):
+    """Open the store, creating its schema on first use."""
+    path = path or os.environ.get(STORE_PATH_ENV, DEFAULT_STORE_PATH)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS experiments (
+            id TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            results TEXT,
+            created_at REAL NOT NULL
+        )
+    """)
+    return connection
+
+def results_key(counts, p2bb_method):
+    """Key under which one metric's statistics are stored: its (n, x) counts and P2BB method."""
+    return json.dumps([p2bb_method, [list(pair) for pair in counts]])
+
+def experiment_id(data):
+    """Short content hash of an experiment; identical data always gets the same ID."""
+    digest = hashlib.sha256(pack_metrics(data)).digest()
+    return base64.urlsafe_b64encode(digest).decode()[:SHARE_ID_LENGTH]
+
+def save_experiment(data, results=None, path=None):
+    """Store an experiment (and optionally its statistics by results_key) and return its ID."""
+    exp_id = experiment_id(data)
+    payload = zlib.compress(pack_metrics(data), 9)
+    results_json = dumps(results) if results is not None else None
+    
+    with _connect(path) as connection:
+        connection.execute(
+            "INSERT OR IGNORE INTO experiments (id, payload, results, created_at) VALUES (?, ?, ?, ?)",
+            (exp_id, payload, results_json, time.time())
+        )
+        if results_json is not None:
+            connection.execute("UPDATE experiments SET results = ? WHERE id = ?", (results_json, exp_id))
+    connection.close()
+    return exp_id
+
+def load_experiment(exp_id, path=None):
+    """Return (data, results) for a stored experiment, or (None, None) if the ID is unknown."""
+    connection = _connect(path)
+    try:
+        row = connection.execute(
+            "SELECT payload, results FROM experiments WHERE id = ?", (exp_id,)
+        ).fetchone()
+    finally:
+        connection.close()
+    
+    if row is None:
+        return None, None
+    payload, results_json = row
+    results = loads(results_json) if results_json else {}
+    return unpack_metrics(zlib.decompress(payload)), results
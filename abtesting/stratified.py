@@ -0,0 +1,158 @@
+"""Stratified (Cochran-Mantel-Haenszel) comparisons pooled across segments."""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .ingest import aggregate_table, sort_by_group
+
+
+def calculate_cmh_matrix(n, x, alpha=0.05, continuity=True):
+    """Calculate CMH tests and Mantel-Haenszel pooled estimates for every pair of variants.
+    
+    n and x have shape (..., K, N): sessions and conversions of N variants in
+    K strata (e.g. countries). Entry [..., i, j] compares variant j (B)
+    against variant i (A) through the 2×2×K contingency tensor, so strata
+    with different baselines or traffic mixes are never summed naively.
+    Returns the CMH chi-square and p-value, the MH odds ratio (with the
+    Robins-Breslow-Greenland interval) and the MH risk ratio as a relative
+    lift in % (with the Greenland-Robins interval), all of shape (..., N, N).
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    z = stats.norm.isf(alpha / 2)
+    
+    # Tensor de contingencia (..., K, N, N): a, b = B convierte / no; c, d = A convierte / no
+    a, n_b = x[..., None, :], n[..., None, :]
+    c, n_a = x[..., :, None], n[..., :, None]
+    b, d = n_b - a, n_a - c
+    total = n_a + n_b
+    conversions = a + c
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Estratos sin datos de alguna de las dos variantes no aportan información
+        informative = (n_a > 0) & (n_b > 0) & (total > 1)
+        expected = np.where(informative, n_b * conversions / total, 0.0)
+        variance = np.where(
+            informative, n_b * n_a * conversions * (total - conversions) / (total ** 2 * (total - 1)), 0.0
+        )
+        deviation = np.sum(np.where(informative, a, 0.0) - expected, axis=-3)
+        variance = np.sum(variance, axis=-3)
+        correction = 0.5 if continuity else 0.0
+        cmh_chi2 = np.where(
+            variance > 0, np.maximum(np.abs(deviation) - correction, 0.0) ** 2 / variance, 0.0
+        )
+        p_value = np.where(variance > 0, stats.chi2.sf(cmh_chi2, 1), 1.0)
+        
+        # Odds ratio de Mantel-Haenszel con varianza de Robins-Breslow-Greenland
+        r = np.where(informative, a * d / total, 0.0)
+        s = np.where(informative, b * c / total, 0.0)
+        p = np.where(informative, (a + d) / total, 0.0)
+        q = np.where(informative, (b + c) / total, 0.0)
+        r_sum, s_sum = np.sum(r, axis=-3), np.sum(s, axis=-3)
+        odds_ratio = r_sum / s_sum
+        log_or_variance = (
+            np.sum(p * r, axis=-3) / (2 * r_sum ** 2)
+            + np.sum(p * s + q * r, axis=-3) / (2 * r_sum * s_sum)
+            + np.sum(q * s, axis=-3) / (2 * s_sum ** 2)
+        )
+        or_lower = odds_ratio * np.exp(-z * np.sqrt(log_or_variance))
+        or_upper = odds_ratio * np.exp(z * np.sqrt(log_or_variance))
+        
+        # Risk ratio de Mantel-Haenszel (cociente de tasas) con varianza de Greenland-Robins
+        rr_numerator = np.sum(np.where(informative, a * n_a / total, 0.0), axis=-3)
+        rr_denominator = np.sum(np.where(informative, c * n_b / total, 0.0), axis=-3)
+        risk_ratio = rr_numerator / rr_denominator
+        log_rr_variance = np.sum(
+            np.where(informative, (n_b * n_a * conversions - a * c * total) / total ** 2, 0.0), axis=-3
+        ) / (rr_numerator * rr_denominator)
+        defined = rr_denominator > 0
+        relative_lift = np.where(defined, (risk_ratio - 1) * 100, 0.0)
+        lift_lower = np.where(defined, (risk_ratio * np.exp(-z * np.sqrt(log_rr_variance)) - 1) * 100, np.nan)
+        lift_upper = np.where(defined, (risk_ratio * np.exp(z * np.sqrt(log_rr_variance)) - 1) * 100, np.nan)
+    
+    return {
+        'cmh_chi2': cmh_chi2,
+        'p_value': p_value,
+        'odds_ratio': odds_ratio,
+        'odds_ratio_lower': or_lower,
+        'odds_ratio_upper': or_upper,
+        'risk_ratio': risk_ratio,
+        'relative_lift': relative_lift,
+        'lift_lower': lift_lower,
+        'lift_upper': lift_upper,
+        'significant': p_value < alpha,
+        'strata': np.sum(informative, axis=-3)
+    }
+
+def calculate_stratified_results(table, dimension, alpha=0.05):
+    """Run one CMH test per pair of every (experiment, metric), stratified by a dimension column.
+    
+    Rows are aggregated by (experiment, dimension, metric, variant) first;
+    variants are matched by name across strata and missing ones count as
+    empty. Metrics with the same number of variants are stacked into one
+    (metrics, strata, variants) tensor per call. Returns a DataFrame with
+    one row per i < j comparison.
+    """
+    if dimension not in table.columns:
+        raise ValueError(f"La tabla no tiene la dimensión: {dimension}")
+    rows = aggregate_table(table, [dimension])
+    # El CMH compara proporciones: las métricas continuas no aplican
+    if 'sum' in rows.columns:
+        rows = rows[rows['sum'].isna()]
+    keys = ['experiment', 'metric']
+    group_id = rows.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+    variant_id = rows.groupby(keys + ['variant'], sort=False, observed=True).ngroup()
+    position = (variant_id.groupby(group_id).rank(method='dense') - 1).astype(int).to_numpy()
+    stratum = rows[dimension].cat.remove_unused_categories().cat.codes.to_numpy()
+    n_groups = group_id.max() + 1 if len(rows) else 0
+    n_strata = stratum.max() + 1 if len(rows) else 0
+    sizes = np.zeros(n_groups, dtype=int)
+    np.maximum.at(sizes, group_id, position + 1)
+    
+    experiment = rows['experiment'].astype(str).to_numpy()
+    metric = rows['metric'].astype(str).to_numpy()
+    variant = rows['variant'].astype(str).to_numpy()
+    frames = []
+    for size in np.unique(sizes):
+        if size < 2:
+            continue
+        # Tensor (métricas, estratos, variantes) de las métricas con este número de variantes
+        selected = np.flatnonzero(sizes == size)
+        local = np.full(n_groups, -1)
+        local[selected] = np.arange(len(selected))
+        in_size = local[group_id] >= 0
+        index = (local[group_id][in_size], stratum[in_size], position[in_size])
+        n = np.zeros((len(selected), n_strata, size))
+        x = np.zeros((len(selected), n_strata, size))
+        n[index] = rows['sessions'].to_numpy()[in_size]
+        x[index] = rows['conversions'].to_numpy()[in_size]
+        names = np.empty((len(selected), size), dtype=object)
+        names[index[0], index[2]] = variant[in_size]
+        labels = np.empty((len(selected), 2), dtype=object)
+        labels[index[0]] = np.column_stack([experiment[in_size], metric[in_size]])
+        
+        cmh = calculate_cmh_matrix(n, x, alpha)
+        first, second = np.triu_indices(size, 1)
+        frames.append(pd.DataFrame({
+            'experiment': np.repeat(labels[:, 0], len(first)),
+            'metric': np.repeat(labels[:, 1], len(first)),
+            'variant_a': names[:, first].ravel(),
+            'variant_b': names[:, second].ravel(),
+            'strata': cmh['strata'][:, first, second].ravel(),
+            'relative_lift': cmh['relative_lift'][:, first, second].ravel(),
+            'relative_lift_ci_lower': cmh['lift_lower'][:, first, second].ravel(),
+            'relative_lift_ci_upper': cmh['lift_upper'][:, first, second].ravel(),
+            'odds_ratio': cmh['odds_ratio'][:, first, second].ravel(),
+            'odds_ratio_ci_lower': cmh['odds_ratio_lower'][:, first, second].ravel(),
+            'odds_ratio_ci_upper': cmh['odds_ratio_upper'][:, first, second].ravel(),
+            'cmh_chi2': cmh['cmh_chi2'][:, first, second].ravel(),
+            'p_value': cmh['p_value'][:, first, second].ravel(),
+            'significant': cmh['significant'][:, first, second].ravel(),
+            'is_control_comparison': np.tile(first == 0, len(selected)),
+            '_group': np.repeat(selected, len(first))
+        }))
+    
+    if not frames:
+        return pd.DataFrame()
+    # Mantener el orden de aparición de las métricas
+    return sort_by_group(pd.concat(frames, ignore_index=True))
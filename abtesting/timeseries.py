@@ -0,0 +1,130 @@
+"""Cumulative trajectories of rates, lift, p-value and P2BB from per-period count series."""
+import numpy as np
+import pandas as pd
+
+from .bayes import DEFAULT_P2BB_METHOD
+from .ingest import SEGMENT_COLUMN, SEGMENT_TOTAL, TIME_COLUMN, has_time_series, is_continuous_table
+from .rng import counts_key, derive_rng
+from .stats import calculate_pairwise_matrix
+
+
+def _segment_rows(rows, segment):
+    """Rows of one segment label: a 'segment' column value or a segment_table label like 'device=Mobile · country=CO'."""
+    if segment is None or segment == SEGMENT_TOTAL:
+        return rows
+    if SEGMENT_COLUMN in rows.columns:
+        return rows[rows[SEGMENT_COLUMN] == segment]
+    for part in str(segment).split(' · '):
+        dimension, _, value = part.partition('=')
+        if dimension not in rows.columns:
+            raise ValueError(f"Segmento desconocido: {segment}")
+        rows = rows[rows[dimension].astype(str) == value]
+    return rows
+
+def series_from_table(table, experiment=None, segment=None):
+    """Per-period (periods, variants) sessions and conversions of every conversion metric of one experiment.
+    
+    Periods are the sorted 'date' values of the experiment, shared by all its
+    metrics; a variant without a row in a period counts as 0. segment picks
+    one segment (a 'segment' label or a segment_table label); other
+    dimensions are aggregated. Returns {metric: {'dates', 'variants', 'n', 'x'}}.
+    """
+    if not has_time_series(table):
+        raise ValueError(f"La tabla no tiene la columna de periodo: {TIME_COLUMN}")
+    if experiment is None:
+        experiment = table['experiment'].iloc[0] if len(table) else ''
+    rows = _segment_rows(table[table['experiment'] == experiment], segment)
+    # Las trayectorias son de tasas de conversión: las métricas continuas no aplican
+    if is_continuous_table(rows):
+        rows = rows[rows['sum'].isna()]
+    rows = rows.groupby(['metric', TIME_COLUMN, 'variant'], sort=False, observed=True)[
+        ['sessions', 'conversions']
+    ].sum().reset_index()
+    dates, period = np.unique(rows[TIME_COLUMN].to_numpy(), return_inverse=True)
+    
+    series = {}
+    for metric, group in rows.groupby('metric', sort=False, observed=True):
+        variants = pd.unique(group['variant'].astype(str))
+        index = (period[group.index], pd.Categorical(group['variant'].astype(str), categories=variants).codes)
+        n = np.zeros((len(dates), len(variants)), dtype=np.int64)
+        x = np.zeros((len(dates), len(variants)), dtype=np.int64)
+        n[index] = group['sessions'].to_numpy()
+        x[index] = group['conversions'].to_numpy()
+        series[str(metric)] = {'dates': dates, 'variants': list(variants), 'n': n, 'x': x}
+    return series
+
+def _trajectory_points(dates, cumulative_n, cumulative_x, alpha, p2bb_method):
+    """Pairwise matrices of a batch of cumulative (periods, variants) counts."""
+    rngs = None
+    if p2bb_method == 'montecarlo':
+        # Un stream por punto, derivado de sus conteos: extender da lo mismo que recalcular todo
+        rngs = [derive_rng('trajectory', *counts_key(n, x)) for n, x in zip(cumulative_n, cumulative_x)]
+    return {
+        'dates': np.asarray(dates),
+        'n': cumulative_n,
+        'x': cumulative_x,
+        **calculate_pairwise_matrix(cumulative_n, cumulative_x, alpha, p2bb_method=p2bb_method, rng=rngs)
+    }
+
+def calculate_trajectory(dates, n, x, alpha=0.05, p2bb_method=DEFAULT_P2BB_METHOD):
+    """Cumulative trajectory of a metric from per-period (periods, variants) counts.
+    
+    Counts are accumulated with one cumulative sum and every period is
+    computed in a single vectorized calculate_pairwise_matrix call, so each
+    key has a leading periods axis: rate and its intervals are
+    (periods, variants), and relative_lift, p_value, p2bb, ... are
+    (periods, variants, variants) with entry [t, i, j] comparing j against i
+    with the data up to period t. 'n' and 'x' hold the cumulative counts.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if n.ndim != 2 or n.shape != x.shape:
+        raise ValueError("Los conteos por periodo deben ser arrays (periodos, variantes) del mismo tamaño")
+    return _trajectory_points(dates, np.cumsum(n, axis=0), np.cumsum(x, axis=0), alpha, p2bb_method)
+
+def extend_trajectory(trajectory, dates, n, x, alpha=0.05, p2bb_method=DEFAULT_P2BB_METHOD):
+    """Append new periods to a trajectory, computing only the new points.
+    
+    dates, n and x hold only the new periods, which must come after the
+    last period of trajectory; their counts are added to its last
+    cumulative counts.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    dates = np.asarray(dates)
+    if len(dates) == 0:
+        return trajectory
+    if n.shape[1:] != trajectory['n'].shape[1:]:
+        raise ValueError("Los periodos nuevos deben traer las mismas variantes que la trayectoria")
+    if len(trajectory['dates']) and dates[0] <= trajectory['dates'][-1]:
+        raise ValueError("Los periodos nuevos deben ser posteriores al último periodo de la trayectoria")
+    
+    last_n = trajectory['n'][-1] if len(trajectory['n']) else 0
+    last_x = trajectory['x'][-1] if len(trajectory['x']) else 0
+    points = _trajectory_points(
+        dates, last_n + np.cumsum(n, axis=0), last_x + np.cumsum(x, axis=0), alpha, p2bb_method
+    )
+    return {key: np.concatenate([trajectory[key], values]) for key, values in points.items()}
+
+def update_trajectory(trajectory, dates, n, x, alpha=0.05, p2bb_method=DEFAULT_P2BB_METHOD):
+    """Trajectory of a full per-period series, reusing trajectory when the series only gained new periods.
+    
+    When the stored periods and counts are a prefix of the new series only
+    the appended periods are computed (see extend_trajectory). Any other
+    change (edited past counts, new variants) recomputes the whole series.
+    """
+    n = np.asarray(n, dtype=float)
+    x = np.asarray(x, dtype=float)
+    dates = np.asarray(dates)
+    known = 0 if trajectory is None else len(trajectory['dates'])
+    reusable = (
+        trajectory is not None
+        and known <= len(dates)
+        and trajectory['n'].shape[1:] == n.shape[1:]
+        and np.array_equal(trajectory['dates'], dates[:known])
+        and np.array_equal(trajectory['n'], np.cumsum(n[:known], axis=0))
+        and np.array_equal(trajectory['x'], np.cumsum(x[:known], axis=0))
+    )
+    if not reusable:
+        return calculate_trajectory(dates, n, x, alpha, p2bb_method)
+    return extend_trajectory(trajectory, dates[known:], n[known:], x[known:], alpha, p2bb_method)
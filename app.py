@@ -1,14 +1,53 @@
 import streamlit as st
 import numpy as np
-from scipy import stats
 import plotly.graph_objects as go
-from scipy.stats import beta, chi2_contingency
 from plotly.subplots import make_subplots
 import pandas as pd
+import io
+import math
+import sqlite3
 from itertools import combinations
-import base64
-import json
-import urllib.parse
+
+from abtesting import (
+    CORRECTION_METHODS,
+    COVARIATE_COLUMNS,
+    DEFAULT_P2BB_METHOD,
+    SEGMENT_COLUMN,
+    SRM_ALPHA,
+    ab_test_from_matrix,
+    analyze_table,
+    calculate_all_pairwise_comparisons,
+    calculate_continuous_matrix,
+    calculate_cuped_matrix,
+    calculate_joint_posterior,
+    calculate_metric_statistics,
+    calculate_sequential_test,
+    calculate_stratified_results,
+    check_srm,
+    comparison_from_matrix,
+    continuous_comparison_from_matrix,
+    convert_metrics_to_text,
+    correct_matrices,
+    correct_pairs,
+    decode_data_from_url,
+    dimension_columns,
+    encode_data_to_url,
+    experiment_id,
+    has_time_series,
+    load_experiment,
+    load_metrics_table,
+    parse_metric_deltas,
+    parse_metrics_data,
+    plan_experiments,
+    results_key,
+    save_experiment,
+    segment_table,
+    sequential_decision,
+    series_from_table,
+    table_to_metrics,
+    update_experiment,
+    update_trajectory,
+)
 
 # Configuración de la página
 st.set_page_config(
@@ -122,23 +161,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def encode_data_to_url(data):
-    """Encode data to URL-safe base64 string."""
-    try:
-        json_str = json.dumps(data)
-        encoded = base64.urlsafe_b64encode(json_str.encode()).decode()
-        return encoded
-    except Exception:
-        return None
-
-def decode_data_from_url(encoded_data):
-    """Decode data from URL-safe base64 string."""
-    try:
-        decoded = base64.urlsafe_b64decode(encoded_data.encode()).decode()
-        return json.loads(decoded)
-    except Exception:
-        return None
-
 def get_browser_url():
     """Get current URL from browser using JavaScript."""
     import streamlit.components.v1 as components
@@ -160,10 +182,32 @@ def get_browser_url():
     )
     return None  # This approach needs session state to work
 
-def generate_share_url(data):
-    """Generate shareable URL with data."""
-    encoded = encode_data_to_url(data)
-    if encoded:
+def save_shared_experiment(data, with_results=True):
+    """Save an experiment (and, with with_results, its computed results) in the store once per session; return its ID."""
+    exp_id = experiment_id(data)
+    saved_ids = st.session_state.setdefault('saved_experiment_ids', set())
+    if (exp_id, with_results) not in saved_ids:
+        results = None
+        if with_results:
+            metrics = data['metrics'] if 'experiment_title' in data else data
+            results = {}
+            for metric in metrics.values():
+                counts = tuple((int(variant['n']), int(variant['x'])) for variant in metric['variants'])
+                results[results_key(counts, DEFAULT_P2BB_METHOD)] = get_metric_results(metric['variants'])
+        save_experiment(data, results)
+        saved_ids.add((exp_id, with_results))
+    return exp_id
+
+def generate_share_url(data, with_results=True):
+    """Generate shareable URL with a short experiment ID (or the encoded data as fallback)."""
+    # La URL solo lleva el ID; datos y resultados quedan guardados en el store local
+    try:
+        query = f"id={save_shared_experiment(data, with_results)}"
+    except (sqlite3.Error, OSError):
+        # Sin store disponible (p. ej. disco de solo lectura): datos completos en la URL
+        encoded = encode_data_to_url(data)
+        query = f"data={encoded}" if encoded else None
+    if query:
         # Strategy: Use a simple but effective detection
         server_address = st.get_option("browser.serverAddress")
         port = st.get_option("server.port") or 8501
@@ -199,233 +243,147 @@ def generate_share_url(data):
             if is_cloud:
                 # We're on a cloud platform but serverAddress is still localhost
                 # Create a placeholder that the user can easily replace
-                share_url = f"https://YOUR-STREAMLIT-APP-URL.streamlit.app/?data={encoded}"
+                share_url = f"https://YOUR-STREAMLIT-APP-URL.streamlit.app/?{query}"
             else:
                 # Actually localhost
-                share_url = f"http://localhost:{port}/?data={encoded}"
+                share_url = f"http://localhost:{port}/?{query}"
         else:
             # serverAddress is not localhost, use it
             if server_address.startswith("http"):
                 base_url = server_address.rstrip('/')
             else:
                 base_url = f"https://{server_address}"
-            share_url = f"{base_url}/?data={encoded}"
+            share_url = f"{base_url}/?{query}"
         
         return share_url
     return None
 
-def parse_metrics_data(text):
-    """Parse multiple metrics data from text input supporting both legacy and N variants."""
-    metrics_data = {}
-    current_metric = None
-    experiment_title = None
-    
-    for line in text.strip().split('\n'):
-        # Si la línea está vacía, continuar
-        if not line.strip():
-            continue
-        
-        # Detectar título del experimento (líneas que empiezan con EXP-)
-        if line.strip().startswith('EXP-'):
-            experiment_title = line.strip()
-            continue
-            
-        # Dividir por tabulaciones si hay, si no, buscar el último espacio antes de los números
-        if '\t' in line:
-            parts = line.split('\t')
-        else:
-            # Mejorar la detección de números: buscar los últimos 2 números
-            line_parts = line.strip().split()
-            
-            # Buscar desde el final para encontrar los últimos 2 números
-            numbers_found = []
-            name_parts = []
-            
-            # Revisar desde el final hacia atrás
-            for i in range(len(line_parts) - 1, -1, -1):
-                part = line_parts[i].replace(',', '')
-                if part.isdigit() and len(numbers_found) < 2:
-                    numbers_found.insert(0, part)
-                else:
-                    name_parts = line_parts[:i+1]
-                    break
-            
-            if len(numbers_found) >= 2:
-                name = ' '.join(name_parts)
-                parts = [name] + numbers_found
-            else:
-                # Si no hay al menos 2 números, es un nombre de métrica
-                current_metric = line.strip()
-                metrics_data[current_metric] = {'variants': []}
-                continue
-            
-        # Si tenemos 3 o más partes (nombre y números)
-        if len(parts) >= 3:
-            try:
-                variant_name = parts[0].strip()
-                n = int(parts[1].strip().replace(',', ''))  # sesiones
-                x = int(parts[2].strip().replace(',', ''))  # conversiones
-                
-                if n < x:
-                    raise ValueError(f"El número de conversiones ({x}) no puede ser mayor que el número de sesiones ({n}) en: {line}")
-                
-                if current_metric:
-                    metrics_data[current_metric]['variants'].append({
-                        'name': variant_name,
-                        'n': n,
-                        'x': x
-                    })
-                
-            except ValueError as e:
-                if "El número de conversiones" in str(e):
-                    raise e
-                raise ValueError(f"Los valores deben ser números enteros en la línea: {line}")
-    
-    # Validar que cada métrica tenga al menos 2 variantes
-    for metric, data in metrics_data.items():
-        if len(data['variants']) < 2:
-            raise ValueError(f"La métrica {metric} debe tener al menos 2 variantes")
-    
-    # Mantener compatibilidad con formato legacy para 2 variantes
-    for metric, data in metrics_data.items():
-        if len(data['variants']) == 2:
-            data['baseline'] = data['variants'][0]
-            data['treatment'] = data['variants'][1]
-            
-    # Agregar título del experimento si existe
-    if experiment_title:
-        return {
-            'experiment_title': experiment_title,
-            'metrics': metrics_data
-        }
-    else:
-        return metrics_data
+METRIC_RESULTS_CACHE_SIZE = 256
 
-def calculate_ab_test(control_n, control_x, treatment_n, treatment_x):
-    """Calculate A/B test statistics for legacy support."""
-    control_p = control_x / control_n
-    treatment_p = treatment_x / treatment_n
+@st.cache_data(max_entries=METRIC_RESULTS_CACHE_SIZE, show_spinner=False)
+def _cached_metric_statistics(counts, p2bb_method):
+    """Memoize calculate_metric_statistics across Streamlit reruns and sessions."""
+    return calculate_metric_statistics(counts, p2bb_method)
+
+def get_metric_results(variants, p2bb_method=DEFAULT_P2BB_METHOD):
+    """Get the shared comparison results for one metric, computed at most once."""
+    counts = tuple((int(variant['n']), int(variant['x'])) for variant in variants)
     
-    # Calculate standard error
-    se = np.sqrt(
-        (control_p * (1 - control_p) / control_n) +
-        (treatment_p * (1 - treatment_p) / treatment_n)
+    # Resultados precalculados de un experimento abierto desde un link con ID
+    stored = st.session_state.get('stored_results', {}).get(results_key(counts, p2bb_method))
+    if stored is not None:
+        return stored
+    return _cached_metric_statistics(counts, p2bb_method)
+
+@st.cache_data(max_entries=METRIC_RESULTS_CACHE_SIZE, show_spinner=False)
+def _cached_continuous_matrix(statistics):
+    """Memoize calculate_continuous_matrix across Streamlit reruns and sessions."""
+    n, total, total_sq = zip(*statistics)
+    return calculate_continuous_matrix(n, total, total_sq)
+
+def get_continuous_results(variants):
+    """Get the Welch/Student-t comparison matrices for one continuous metric."""
+    return _cached_continuous_matrix(
+        tuple((int(variant['n']), float(variant['sum']), float(variant['sum_sq'])) for variant in variants)
     )
-    
-    # Calculate z-score
-    z_score = (treatment_p - control_p) / se if se > 0 else 0
-    
-    # Calculate p-value (two-tailed)
-    p_value = 2 * (1 - stats.norm.cdf(abs(z_score))) if se > 0 else 1
-    
-    # Calculate relative lift
-    relative_lift = ((treatment_p - control_p) / control_p) * 100 if control_p > 0 else 0
-    
-    # Calculate bayesian probability
-    n_simulations = 10000
-    baseline_posterior = np.random.beta(control_x + 1, control_n - control_x + 1, n_simulations)
-    treatment_posterior = np.random.beta(treatment_x + 1, treatment_n - treatment_x + 1, n_simulations)
-    p2bb = np.mean(treatment_posterior > baseline_posterior)
-    
-    return {
-        'control_p': control_p,
-        'treatment_p': treatment_p,
-        'se': se,
-        'z_score': z_score,
-        'p_value': p_value,
-        'relative_lift': relative_lift,
-        'p2bb': p2bb
-    }
 
-def calculate_chi_square_test(variants):
-    """Calculate Chi-square test for multiple variants."""
-    # Crear tabla de contingencia
-    conversions = [variant['x'] for variant in variants]
-    non_conversions = [variant['n'] - variant['x'] for variant in variants]
-    
-    # Tabla de contingencia: [conversiones, no_conversiones] para cada variante
-    contingency_table = np.array([conversions, non_conversions])
-    
-    # Test Chi-cuadrado
-    chi2, p_value, dof, expected = chi2_contingency(contingency_table)
+@st.cache_data(max_entries=METRIC_RESULTS_CACHE_SIZE, show_spinner=False)
+def _cached_cuped_matrix(aggregates):
+    """Memoize calculate_cuped_matrix across Streamlit reruns and sessions."""
+    return calculate_cuped_matrix(*zip(*aggregates))
+
+def get_cuped_results(variants):
+    """CUPED results for a metric whose variants all carry pre-period covariates, else None."""
+    if not all(column in variant for variant in variants for column in COVARIATE_COLUMNS):
+        return None
+    return _cached_cuped_matrix(tuple(
+        (
+            int(variant['n']),
+            float(variant.get('sum', variant.get('x'))),
+            float(variant.get('sum_sq', variant.get('x'))),
+            *(float(variant[column]) for column in COVARIATE_COLUMNS)
+        )
+        for variant in variants
+    ))
+
+def apply_metric_deltas(delta_text, p2bb_method=DEFAULT_P2BB_METHOD):
+    """Add new sessions/conversions to the current experiment, recomputing only what changed."""
+    data = st.session_state.metrics
+    deltas = parse_metric_deltas(delta_text)
+    if not deltas:
+        raise ValueError("No se encontraron datos nuevos")
     
-    return {
-        'chi2': chi2,
-        'p_value': p_value,
-        'dof': dof,
-        'significant': p_value < 0.05
+    # Solo se necesitan los resultados previos de las métricas con datos nuevos
+    metrics = data['metrics'] if 'experiment_title' in data else data
+    results = {
+        metric_name: get_metric_results(metrics[metric_name]['variants'], p2bb_method)
+        for metric_name in deltas
+        if metric_name in metrics and metrics[metric_name].get('type') != 'continuous'
     }
-
-def calculate_pairwise_comparisons(variants):
-    """Calculate pairwise comparisons between all variants."""
-    comparisons = []
+    updated_data, updated_results = update_experiment(data, results, deltas, p2bb_method)
     
-    # Comparaciones vs control (primera variante)
-    control = variants[0]
-    for i, variant in enumerate(variants[1:], 1):
-        comparison = calculate_single_comparison(control, variant, is_control_comparison=True)
-        comparisons.append(comparison)
+    # Los resultados actualizados se guardan por conteos, igual que los de un link con ID
+    updated_metrics = updated_data['metrics'] if 'experiment_title' in updated_data else updated_data
+    stored_results = st.session_state.setdefault('stored_results', {})
+    for metric_name in deltas:
+        counts = tuple((int(variant['n']), int(variant['x'])) for variant in updated_metrics[metric_name]['variants'])
+        stored_results[results_key(counts, p2bb_method)] = updated_results[metric_name]
+    st.session_state.metrics = updated_data
     
-    return comparisons
+    # El link compartido y la vista por segmento ya no corresponden a los datos actualizados
+    st.query_params.clear()
+    st.session_state.segment_table = None
+    st.session_state.dimension_table = None
+    st.session_state.series_table = None
 
-def calculate_all_pairwise_comparisons(variants):
-    """Calculate all possible pairwise comparisons between variants."""
-    all_comparisons = []
-    
-    # Generar todas las combinaciones posibles de variantes
-    for i in range(len(variants)):
-        for j in range(i + 1, len(variants)):
-            variant_a = variants[i]
-            variant_b = variants[j]
-            
-            comparison = calculate_single_comparison(variant_a, variant_b, is_control_comparison=(i == 0))
-            all_comparisons.append(comparison)
-    
-    return all_comparisons
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_segment_table(table):
+    """Aggregate a segmented export into every segment × metric once per distinct table."""
+    return segment_table(table)
 
-def calculate_single_comparison(variant_a, variant_b, is_control_comparison=False):
-    """Calculate statistics for a single pairwise comparison."""
-    a_p = variant_a['x'] / variant_a['n']
-    b_p = variant_b['x'] / variant_b['n']
-    
-    # Calculate standard error
-    se = np.sqrt(
-        (a_p * (1 - a_p) / variant_a['n']) +
-        (b_p * (1 - b_p) / variant_b['n'])
-    )
-    
-    # Calculate z-score
-    if se > 0:
-        z_score = (b_p - a_p) / se
-        # Calculate p-value (two-tailed)
-        p_value = 2 * (1 - stats.norm.cdf(abs(z_score)))
-    else:
-        z_score = 0
-        p_value = 1
-    
-    # Calculate relative lift
-    if a_p > 0:
-        relative_lift = ((b_p - a_p) / a_p) * 100
-    else:
-        relative_lift = 0
-    
-    # Calculate bayesian probability
-    n_simulations = 10000
-    a_posterior = np.random.beta(variant_a['x'] + 1, variant_a['n'] - variant_a['x'] + 1, n_simulations)
-    b_posterior = np.random.beta(variant_b['x'] + 1, variant_b['n'] - variant_b['x'] + 1, n_simulations)
-    p2bb = np.mean(b_posterior > a_posterior)
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_segment_results(table, correction):
+    """Run the batch engine over every segment × metric of one experiment in a single pass."""
+    # El SRM ya se revisó en la vista principal, que decide si se muestran los resultados
+    return analyze_table(table, correction=correction, skip_srm=False)['pairs']
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_stratified_results(table, dimension, correction):
+    """CMH tests of every pair and metric of one experiment, stratified by a dimension."""
+    return correct_pairs(calculate_stratified_results(table, dimension), method=correction)
+
+def get_trajectories(table, segment=None, p2bb_method=DEFAULT_P2BB_METHOD):
+    """Cumulative trajectories of every conversion metric of a time-series export.
     
-    return {
-        'variant_a_name': variant_a['name'],
-        'variant_b_name': variant_b['name'],
-        'variant_a_p': a_p,
-        'variant_b_p': b_p,
-        'relative_lift': relative_lift,
-        'p_value': p_value,
-        'p2bb': p2bb,
-        'significant': p_value < 0.05,
-        'is_control_comparison': is_control_comparison
-    }
+    Trajectories are kept in the session by (experiment, segment, metric):
+    re-analysing an export with new periods only computes the new points.
+    """
+    experiment = str(table['experiment'].iloc[0]) if len(table) else ''
+    stored = st.session_state.setdefault('trajectories', {})
+    trajectories = {}
+    for metric_name, series in series_from_table(table, segment=segment).items():
+        key = (experiment, segment, metric_name, p2bb_method)
+        stored[key] = update_trajectory(
+            stored.get(key), series['dates'], series['n'], series['x'], p2bb_method=p2bb_method
+        )
+        trajectories[metric_name] = (series['variants'], stored[key])
+    return trajectories
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_uploaded_table(content, file_name):
+    """Read an uploaded CSV/Parquet file once per distinct content."""
+    return load_metrics_table(io.BytesIO(content), 'parquet' if file_name.lower().endswith('.parquet') else 'csv')
+
+# Nombres de las correcciones por comparaciones múltiples en el selector
+CORRECTION_LABELS = {
+    'holm': 'Holm (FWER)',
+    'bh': 'Benjamini-Hochberg (FDR)',
+    'bonferroni': 'Bonferroni (FWER)',
+    'none': 'Sin corrección',
+}
+
+# Tarjetas de comparación que se renderizan por página
+CARDS_PER_PAGE = 6
 
 def get_smart_label(name):
     """Generate smart, differentiated labels for variant names."""
@@ -590,6 +548,13 @@ def create_metric_card(metric_name, data, results, experiment_title=None):
             line-height: 20px;
             color: #69BE28;
         }
+        .metric-ci {
+            margin-top: 4px;
+            font-size: 11px;
+            color: #4A6489;
+            text-align: center;
+            white-space: nowrap;
+        }
         .p2bb-section {
             display: flex;
             flex-direction: column;
@@ -674,11 +639,18 @@ def create_metric_card(metric_name, data, results, experiment_title=None):
     v1_percentage = round(results['p2bb'] * 100)
     og_percentage = round((1 - results['p2bb']) * 100)
     
-    # Determinar si es significativo
-    is_significant = results['p_value'] < 0.05
+    # Determinar si es significativo (con el p-value corregido por comparaciones múltiples)
+    is_significant = results.get('significant', results['p_value'] < 0.05)
+    adjusted_p_value = results.get('adjusted_p_value', results['p_value'])
     significance_text = "✓ Significativo" if is_significant else "✗ No significativo"
     significance_color = "#2E7D32" if is_significant else "#C62828"
     
+    # Intervalos al 95% (los resultados guardados en links antiguos no los tienen)
+    control_ci_title = format_rate_intervals(results.get('control_ci'), results.get('control_credible'))
+    treatment_ci_title = format_rate_intervals(results.get('treatment_ci'), results.get('treatment_credible'))
+    lift_ci = results.get('relative_lift_ci')
+    lift_ci_html = f'<div class="metric-ci">IC 95%: {format_lift_interval(lift_ci)}</div>' if lift_ci else ''
+    
     # Construir HTML con título del experimento y KPI si están disponibles
     experiment_title_html = ""
     if experiment_title:
@@ -714,11 +686,11 @@ def create_metric_card(metric_name, data, results, experiment_title=None):
                     <div class="conversion-container">
                         <div class="conversion-row">
                             <span class="conversion-label" title="{data['baseline']['name']}">{get_smart_label(data['baseline']['name'])}</span>
-                            <div class="metric-value">{results['control_p']*100:.1f}%</div>
+                            <div class="metric-value" title="{control_ci_title}">{results['control_p']*100:.1f}%</div>
                         </div>
                         <div class="conversion-row">
                             <span class="conversion-label" title="{data['treatment']['name']}">{get_smart_label(data['treatment']['name'])}</span>
-                            <div class="metric-value">{results['treatment_p']*100:.1f}%</div>
+                            <div class="metric-value" title="{treatment_ci_title}">{results['treatment_p']*100:.1f}%</div>
                         </div>
                     </div>
                 </div>
@@ -744,10 +716,11 @@ def create_metric_card(metric_name, data, results, experiment_title=None):
                     <div class="metric-improvement" style="color: {'#69BE28' if results['relative_lift'] > 0 else '#FF0000'}">
                         {'+' if results['relative_lift'] > 0 else ''}{results['relative_lift']:.2f}%
                     </div>
+                    {lift_ci_html}
                 </div>
                 <div class="metric-section">
-                    <div class="metric-label">P-value</div>
-                    <div class="metric-value">{results['p_value']:.3f}</div>
+                    <div class="metric-label">{'P-value ajustado' if adjusted_p_value != results['p_value'] else 'P-value'}</div>
+                    <div class="metric-value">{adjusted_p_value:.3f}</div>
                 </div>
             </div>
             <div class="significance-label" style="background: {significance_color};">
@@ -757,8 +730,58 @@ def create_metric_card(metric_name, data, results, experiment_title=None):
     """, unsafe_allow_html=True)
     
 
-def create_comparison_matrix(metric_name, variants):
+def format_lift_interval(interval):
+    """Format a relative lift interval in percent, e.g. [-1.20%, +8.35%]."""
+    lower, upper = interval
+    return f"[{lower:+.2f}%, {upper:+.2f}%]"
+
+def format_rate_intervals(confidence, credible=None):
+    """Describe the confidence (Wilson) and credible intervals of a conversion rate."""
+    if confidence is None:
+        return ""
+    text = f"IC 95% (Wilson): [{confidence[0]*100:.2f}%, {confidence[1]*100:.2f}%]"
+    if credible is not None:
+        text += f" · Credibilidad 95% (Beta): [{credible[0]*100:.2f}%, {credible[1]*100:.2f}%]"
+    return text
+
+def format_tooltip_interval(interval):
+    """Rate interval suffix for the matrix tooltips (empty when not available)."""
+    if interval is None:
+        return ""
+    return f" IC 95% [{interval[0]*100:.2f}%, {interval[1]*100:.2f}%]"
+
+def create_pair_metric_card(metric_name, variants, matrix, i, j, experiment_title=None):
+    """Create the metric card for variants i (baseline) and j (treatment) from the shared results."""
+    # Crear estructura de datos compatible con create_metric_card
+    comparison_data = {
+        'baseline': variants[i],
+        'treatment': variants[j]
+    }
+    
+    # Combinar KPI + comparación en el título de la tarjeta
+    comparison_name = f"{metric_name} - {variants[i]['name']} vs {variants[j]['name']}"
+    create_metric_card(comparison_name, comparison_data, ab_test_from_matrix(matrix, i, j), experiment_title)
+
+def paginate(items, key, page_size=CARDS_PER_PAGE):
+    """Return only the items on the page chosen with a selector (shown when there is more than one page)."""
+    n_pages = math.ceil(len(items) / page_size)
+    if n_pages <= 1:
+        return items
+    
+    page = st.selectbox(
+        "Página",
+        range(1, n_pages + 1),
+        format_func=lambda number: f"Página {number} de {n_pages}",
+        key=key,
+        label_visibility="collapsed"
+    )
+    return items[(page - 1) * page_size:page * page_size]
+
+def create_comparison_matrix(metric_name, variants, matrix=None):
     """Create an interactive matrix showing all pairwise comparison results with hover tooltips."""
+    if matrix is None:
+        matrix = get_metric_results(variants)['matrix']
+    
     st.markdown(f"### 📋 Matriz de Comparaciones - {metric_name}")
     
     # Crear datos para la matriz
@@ -786,14 +809,15 @@ def create_comparison_matrix(metric_name, variants):
                 # Comparación entre variantes
                 variant_a = variants[i]
                 variant_b = variants[j]
-                comparison = calculate_single_comparison(variant_a, variant_b)
+                comparison = comparison_from_matrix(matrix, variants, i, j)
                 
                 # Texto del tooltip
                 hover_text = f"""{variant_a['name']} vs {variant_b['name']}<br>
-• {variant_a['name']}: {comparison['variant_a_p']*100:.2f}% ({variant_a['x']:,}/{variant_a['n']:,})<br>
-• {variant_b['name']}: {comparison['variant_b_p']*100:.2f}% ({variant_b['x']:,}/{variant_b['n']:,})<br>
-• Lift: {'+' if comparison['relative_lift'] > 0 else ''}{comparison['relative_lift']:.2f}%<br>
+• {variant_a['name']}: {comparison['variant_a_p']*100:.2f}% ({variant_a['x']:,}/{variant_a['n']:,}){format_tooltip_interval(comparison['variant_a_ci'])}<br>
+• {variant_b['name']}: {comparison['variant_b_p']*100:.2f}% ({variant_b['x']:,}/{variant_b['n']:,}){format_tooltip_interval(comparison['variant_b_ci'])}<br>
+• Lift: {'+' if comparison['relative_lift'] > 0 else ''}{comparison['relative_lift']:.2f}%{' ' + format_lift_interval(comparison['relative_lift_ci']) if comparison['relative_lift_ci'] else ''}<br>
 • P-value: {comparison['p_value']:.4f}<br>
+• P-value ajustado: {comparison['adjusted_p_value']:.4f}<br>
 • P2BB: {comparison['p2bb']*100:.1f}%<br>
 • Significativo: {'Sí' if comparison['significant'] else 'No'}"""
                 
@@ -898,13 +922,15 @@ def create_all_comparisons_section(metric_name, all_comparisons):
     
     # Mostrar comparaciones vs control
     if control_comparisons:
-        st.markdown(f"### 📊 Comparaciones vs Control")
-        create_comparison_cards(control_comparisons, is_control_section=True)
+        st.markdown("### 📊 Comparaciones vs Control")
+        control_page = paginate(control_comparisons, key=f"detail_control_page_{metric_name}")
+        create_comparison_cards(control_page, is_control_section=True)
     
     # Mostrar comparaciones entre variantes
     if variant_comparisons:
-        st.markdown(f"### 🔄 Comparaciones entre Variantes")
-        create_comparison_cards(variant_comparisons, is_control_section=False)
+        st.markdown("### 🔄 Comparaciones entre Variantes")
+        variant_page = paginate(variant_comparisons, key=f"detail_variant_page_{metric_name}")
+        create_comparison_cards(variant_page, is_control_section=False)
 
 def create_comparison_cards(comparisons, is_control_section=True):
     """Create comparison cards with improved styling and visible p-values."""
@@ -937,11 +963,12 @@ def create_comparison_cards(comparisons, is_control_section=True):
                         <div class="metric-box" style="background: {'#E8F5E8' if comparison['relative_lift'] > 0 else '#FFE8E8'}; color: {'#2E7D32' if comparison['relative_lift'] > 0 else '#C62828'};">
                             {'+' if comparison['relative_lift'] > 0 else ''}{comparison['relative_lift']:.2f}%
                         </div>
+                        {'<div style="font-size: 0.75rem; opacity: 0.8; margin-top: 4px;">IC 95%: ' + format_lift_interval(comparison['relative_lift_ci']) + '</div>' if comparison['relative_lift_ci'] else ''}
                     </div>
                     <div>
-                        <div style="font-size: 0.9rem; opacity: 0.8; margin-bottom: 5px;">P-value</div>
+                        <div style="font-size: 0.9rem; opacity: 0.8; margin-bottom: 5px;">P-value ajustado</div>
                         <div class="metric-box" style="background: {'#E8F5E8' if comparison['significant'] else '#FFE8E8'}; color: {'#2E7D32' if comparison['significant'] else '#C62828'};">
-                            {comparison['p_value']:.4f}
+                            {comparison['adjusted_p_value']:.4f}
                         </div>
                     </div>
                     <div>
@@ -961,12 +988,335 @@ def create_comparison_cards(comparisons, is_control_section=True):
             </div>
         """, unsafe_allow_html=True)
 
-def create_visualization(metric_name, variants):
-    """Create visualization for multivariant test."""
+def check_metrics_srm(metrics):
+    """SRM check of every metric against the split typed in the results section (equal split by default).
+    
+    Returns (srm_results, error); an invalid split falls back to the equal
+    split and is reported in error. The split is read from session state,
+    so sections rendered before its input use the same value.
+    """
+    split_text = st.session_state.get('srm_split', '')
+    error = None
+    try:
+        split = parse_percent_list(split_text) if split_text.strip() else None
+        srm_results = {
+            metric_name: check_srm(data['variants'], split)
+            for metric_name, data in metrics.items()
+            if 'variants' in data and len(data['variants']) > 0
+        }
+    except ValueError as e:
+        error = str(e)
+        srm_results = {
+            metric_name: check_srm(data['variants'])
+            for metric_name, data in metrics.items()
+            if 'variants' in data and len(data['variants']) > 0
+        }
+    return srm_results, error
+
+def srm_blocks_analysis(stored_data):
+    """True when some metric fails the SRM check and the user has not chosen to analyse anyway."""
+    metrics = stored_data['metrics'] if isinstance(stored_data, dict) and 'experiment_title' in stored_data else stored_data
+    srm_results, _ = check_metrics_srm(metrics)
+    return any(srm['mismatch'] for srm in srm_results.values()) and not st.session_state.get('srm_override', False)
+
+def parse_percent_list(text):
+    """Parse a comma-separated list of percentages into fractions."""
+    try:
+        values = [float(value.strip().rstrip('%')) / 100 for value in text.split(',') if value.strip()]
+    except ValueError:
+        raise ValueError(f"Lista de porcentajes inválida: {text}")
+    if not values:
+        raise ValueError("Ingresa al menos un valor")
+    return values
+
+def create_planner_section():
+    """Sample-size planner: required sessions and days over a grid of scenarios."""
+    col_rates, col_settings = st.columns([1, 1])
+    with col_rates:
+        baseline_text = st.text_input("Tasas de conversión base (%)", value="1, 2, 5, 10", key="plan_baselines")
+        mde_text = st.text_input("Efectos mínimos detectables, lift relativo (%)", value="2, 5, 10, 20", key="plan_mdes")
+        daily_sessions = st.number_input(
+            "Sesiones diarias (total entre variantes)", min_value=1, value=10000, step=1000, key="plan_daily"
+        )
+    with col_settings:
+        n_variants = st.multiselect("Número de variantes", [2, 3, 4, 5, 6], default=[2], key="plan_variants")
+        alphas = st.multiselect("Alpha", [0.01, 0.05, 0.1], default=[0.05], key="plan_alphas")
+        powers = st.multiselect("Poder", [0.8, 0.9, 0.95], default=[0.8], key="plan_powers")
+    
+    try:
+        baselines = parse_percent_list(baseline_text)
+        mdes = parse_percent_list(mde_text)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    if not (n_variants and alphas and powers):
+        st.warning("Selecciona al menos un número de variantes, un alpha y un poder.")
+        return
+    
+    # Toda la grilla se evalúa en una sola llamada vectorizada
+    plan = plan_experiments(baselines, mdes, n_variants, alphas, powers, daily_sessions=daily_sessions)
+    
+    # Heatmap de días para la primera combinación de variantes, alpha y poder
+    heatmap = plan[
+        (plan['n_variants'] == n_variants[0]) & (plan['alpha'] == alphas[0]) & (plan['power'] == powers[0])
+    ].pivot(index='baseline_rate', columns='mde', values='days')
+    fig = go.Figure(go.Heatmap(
+        z=heatmap.values,
+        x=[f"{mde:.0%}" for mde in heatmap.columns],
+        y=[f"{rate:.1%}" for rate in heatmap.index],
+        text=[[f"{days:,.0f}" if days == days else "-" for days in row] for row in heatmap.values],
+        texttemplate="%{text}",
+        colorscale='Blues',
+        colorbar=dict(title="Días"),
+        hovertemplate="Tasa base: %{y}<br>MDE: %{x}<br>Días: %{text}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"Días necesarios ({n_variants[0]} variantes, alpha {alphas[0]}, poder {powers[0]})",
+        xaxis_title="MDE (lift relativo)",
+        yaxis_title="Tasa base",
+        height=400
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    table = plan.rename(columns={
+        'baseline_rate': 'Tasa base',
+        'mde': 'MDE',
+        'n_variants': 'Variantes',
+        'alpha': 'Alpha',
+        'power': 'Poder',
+        'sessions_per_variant': 'Sesiones por variante',
+        'total_sessions': 'Sesiones totales',
+        'days': 'Días'
+    })
+    st.dataframe(
+        table.style.format({
+            'Tasa base': '{:.2%}',
+            'MDE': '{:.0%}',
+            'Sesiones por variante': '{:,.0f}',
+            'Sesiones totales': '{:,.0f}',
+            'Días': '{:,.0f}'
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption("Con más de 2 variantes el alpha se reparte entre las comparaciones vs control (Bonferroni).")
+
+def create_continuous_section(variants, matrix):
+    """Show means with confidence intervals and Welch comparisons vs control for a continuous metric."""
+    st.dataframe(pd.DataFrame({
+        'Variante': [variant['name'] for variant in variants],
+        'Usuarios': [f"{int(variant['n']):,}" for variant in variants],
+        'Media': [f"{mean:,.2f}" for mean in matrix['mean']],
+        'IC 95%': [f"[{lower:,.2f}, {upper:,.2f}]" for lower, upper in zip(matrix['mean_lower'], matrix['mean_upper'])],
+        'Desv. estándar': [f"{std:,.2f}" for std in matrix['std']]
+    }), hide_index=True, use_container_width=True)
+    
+    st.markdown("### 📊 Comparaciones vs Control")
+    rows = []
+    for j in range(1, len(variants)):
+        comparison = continuous_comparison_from_matrix(matrix, variants, 0, j, is_control_comparison=True)
+        rows.append({
+            'Variante': comparison['variant_b_name'],
+            'Lift': f"{comparison['relative_lift']:+.2f}%",
+            'IC del lift': format_lift_interval(comparison['relative_lift_ci']),
+            'P-value (Welch)': f"{comparison['p_value']:.4f}",
+            'P-value ajustado': f"{matrix['adjusted_p_value'][0, j]:.4f}" if 'adjusted_p_value' in matrix else '-',
+            'P2BB': f"{comparison['p2bb'] * 100:.1f}%",
+            'Significativo': '✅' if matrix['significant'][0, j] else '—'
+        })
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    st.caption(
+        "Métrica continua: test t de Welch sobre las medias y P2BB con posteriores t de Student, "
+        "calculados a partir de n, suma y suma de cuadrados de cada variante."
+    )
+
+def create_cuped_section(variants, cuped):
+    """Compare plain and CUPED-adjusted results of every variant vs control."""
+    # Métricas de conversión en %, continuas en sus unidades
+    format_value = (lambda value: f"{value * 100:.2f}%") if 'x' in variants[0] else (lambda value: f"{value:,.2f}")
+    rows = []
+    for j in range(1, len(variants)):
+        rows.append({
+            'Variante': variants[j]['name'],
+            'Media ajustada': f"{format_value(cuped['rate'][j])} (control {format_value(cuped['rate'][0])})",
+            'Lift ajustado': f"{cuped['relative_lift'][0, j]:+.2f}%",
+            'IC del lift': format_lift_interval((cuped['lift_lower'][0, j], cuped['lift_upper'][0, j])),
+            'P-value CUPED': f"{cuped['p_value'][0, j]:.4f}",
+            'Reducción de varianza': f"{cuped['variance_reduction'][j] * 100:.1f}%"
+        })
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    st.caption(
+        f"Ajuste por la covariable del pre-periodo (theta = {cuped['theta']:.4f}). La reducción de "
+        "varianza es también la fracción de sesiones que se ahorran para alcanzar el mismo poder. "
+        "Los p-values CUPED no incluyen la corrección por comparaciones múltiples."
+    )
+
+def create_segment_section(table, correction):
+    """Overview of every segment × metric vs control, with drill-down into one segment."""
+    pairs = get_segment_results(table, correction)
+    control = pairs[pairs['is_control_comparison']]
+    overview = pd.DataFrame({
+        'Segmento': control[SEGMENT_COLUMN],
+        'Métrica': control['metric'],
+        'Variante': control['variant_b'],
+        'Lift': [f"{lift:+.2f}%" for lift in control['relative_lift']],
+        'IC del lift': [
+            format_lift_interval(interval)
+            for interval in zip(control['relative_lift_ci_lower'], control['relative_lift_ci_upper'])
+        ],
+        'P-value ajustado': [f"{p_value:.4f}" for p_value in control['adjusted_p_value']],
+        'Significativo': ['✅' if significant else '—' for significant in control['significant']]
+    })
+    st.dataframe(overview, hide_index=True, use_container_width=True)
+    st.caption(
+        "Todos los segmentos y métricas se calculan en una sola pasada; la corrección por "
+        "comparaciones múltiples se aplica a todos los pares de todos los segmentos juntos."
+    )
+    
+    # Drill-down: mostrar el análisis completo de un segmento
+    col_segment, col_button = st.columns([3, 1])
+    with col_segment:
+        segment = st.selectbox(
+            "Segmento", list(pd.unique(table[SEGMENT_COLUMN].astype(str))), key="drill_segment",
+            label_visibility="collapsed"
+        )
+    with col_button:
+        if st.button("Ver detalle", key="drill_down"):
+            st.session_state.metrics = table_to_metrics(table, segment=segment)
+            st.session_state.current_segment = segment
+            st.session_state.count_history = {}
+            st.rerun()
+
+def create_stratified_section(table, correction):
+    """Pooled CMH comparisons vs control across the values of one dimension."""
+    dimension = st.selectbox("Estratificar por", dimension_columns(table), key="stratify_dimension")
+    pairs = get_stratified_results(table, dimension, correction)
+    if pairs.empty:
+        st.info("No hay métricas de conversión para estratificar.")
+        return
+    control = pairs[pairs['is_control_comparison']]
+    st.dataframe(pd.DataFrame({
+        'Métrica': control['metric'],
+        'Variante': control['variant_b'],
+        'Lift (Mantel-Haenszel)': [f"{lift:+.2f}%" for lift in control['relative_lift']],
+        'IC del lift': [
+            format_lift_interval(interval)
+            for interval in zip(control['relative_lift_ci_lower'], control['relative_lift_ci_upper'])
+        ],
+        'Odds ratio': [f"{odds_ratio:.3f}" for odds_ratio in control['odds_ratio']],
+        'P-value CMH': [f"{p_value:.4f}" for p_value in control['p_value']],
+        'P-value ajustado': [f"{p_value:.4f}" for p_value in control['adjusted_p_value']],
+        'Estratos': control['strata']
+    }), hide_index=True, use_container_width=True)
+    st.caption(
+        f"Compara las variantes dentro de cada valor de '{dimension}' y combina los estratos, "
+        "así las diferencias de mezcla de tráfico entre segmentos no sesgan el resultado "
+        "(paradoja de Simpson) como al sumar los conteos."
+    )
+
+def create_srm_section(metrics, srm_results):
+    """Observed vs expected sessions of the metrics whose split fails the SRM check."""
+    rows = []
+    for metric_name, srm in srm_results.items():
+        if not srm['mismatch']:
+            continue
+        for variant, expected, observed_share, expected_share in zip(
+            metrics[metric_name]['variants'], srm['expected'], srm['observed_share'], srm['expected_share']
+        ):
+            rows.append({
+                'Métrica': metric_name,
+                'Variante': variant['name'],
+                'Sesiones': f"{variant['n']:,}",
+                'Esperadas': f"{expected:,.0f}",
+                '% observado': f"{observed_share:.2%}",
+                '% esperado': f"{expected_share:.2%}",
+                'P-value SRM': f"{srm['p_value']:.2e}"
+            })
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    st.caption(
+        f"Test chi-cuadrado de bondad de ajuste de las sesiones contra el split esperado (alpha {SRM_ALPHA}). "
+        "Un desbalance así suele venir de un error en la aleatorización o en el tracking, "
+        "y hace que los p-values y las probabilidades bayesianas no sean confiables."
+    )
+
+def create_joint_posterior_section(variants, joint):
+    """Show each variant's probability of being best and expected loss from the joint simulation."""
+    table = pd.DataFrame({
+        'Variante': [variant['name'] for variant in variants],
+        'Conversión': [f"{variant['x'] / variant['n'] * 100:.2f}%" for variant in variants],
+        'P(ser la mejor)': [f"{probability * 100:.1f}%" for probability in joint['prob_best']],
+        'Pérdida esperada': [f"{loss * 100:.3f} pp" for loss in joint['expected_loss']]
+    })
+    st.dataframe(table, hide_index=True, use_container_width=True)
+    st.caption(
+        "Calculado con una sola simulación conjunta de las posteriores Beta de todas las variantes. "
+        "La pérdida esperada es cuánta conversión se pierde en promedio si se elige esa variante "
+        "y no era la mejor: conviene elegir la de menor pérdida."
+    )
+
+def get_count_history(metric_name, variants):
+    """Record the cumulative counts seen for a metric in this session, one look per distinct update."""
+    counts = tuple((int(variant['n']), int(variant['x'])) for variant in variants)
+    histories = st.session_state.setdefault('count_history', {})
+    history = histories.get(metric_name, [])
+    
+    # Si cambian las variantes o algún conteo disminuye, los datos no son acumulados: nueva serie
+    if history and (
+        len(history[-1]) != len(counts)
+        or any(n < last_n or x < last_x for (n, x), (last_n, last_x) in zip(counts, history[-1]))
+    ):
+        history = []
+    if not history or history[-1] != counts:
+        history = history + [counts]
+    histories[metric_name] = history
+    return history
+
+SEQUENTIAL_DECISIONS = {
+    'continue': '⏳ Continuar',
+    'stop_winner': '🟢 Detener: gana',
+    'stop_loser': '🔴 Detener: pierde',
+}
+
+def create_sequential_section(variants, history):
+    """Show always-valid mSPRT results of every variant vs control over the session's looks."""
+    n = np.array([[look_n for look_n, _ in look] for look in history])
+    x = np.array([[look_x for _, look_x in look] for look in history])
+    sequential = calculate_sequential_test(n, x)
+    
+    rows = []
+    for j in range(1, len(variants)):
+        result = sequential_decision(sequential, 0, j)
+        rows.append({
+            'Variante': variants[j]['name'],
+            'Diferencia': f"{result['difference'] * 100:+.2f} pp",
+            'Secuencia de confianza (95%)': f"[{result['lower'] * 100:+.2f}, {result['upper'] * 100:+.2f}] pp",
+            'P-value siempre válido': f"{result['p_value']:.4f}",
+            'Decisión': SEQUENTIAL_DECISIONS[result['decision']]
+        })
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    st.caption(
+        f"{len(history)} look(s) en esta sesión. A diferencia del z-test, estos p-values y "
+        "secuencias de confianza siguen siendo válidos aunque se revisen los datos después de "
+        "cada actualización, así que se puede detener el experimento apenas haya una decisión."
+    )
+
+def create_visualization(metric_name, variants, matrix=None):
+    """Create visualization for multivariant test, with 95% interval error bars when available."""
     # Crear gráfico de barras con conversiones
     variant_names = [v['name'] for v in variants]
     conversion_rates = [(v['x'] / v['n']) * 100 for v in variants]
     
+    # Barras de error asimétricas con el intervalo de Wilson de cada variante
+    error_y = None
+    if matrix is not None and 'rate_lower' in matrix:
+        error_y = dict(
+            type='data',
+            symmetric=False,
+            array=np.asarray(matrix['rate_upper']) * 100 - conversion_rates,
+            arrayminus=conversion_rates - np.asarray(matrix['rate_lower']) * 100,
+            color='white'
+        )
+    
     fig = go.Figure()
     
     # Colores diferentes para cada variante
@@ -978,6 +1328,7 @@ def create_visualization(metric_name, variants):
         marker_color=colors[:len(variants)],
         text=[f'{rate:.2f}%' for rate in conversion_rates],
         textposition='auto',
+        error_y=error_y,
     ))
     
     fig.update_layout(
@@ -991,32 +1342,73 @@ def create_visualization(metric_name, variants):
     
     return fig
 
-def convert_metrics_to_text(metrics):
-    """Convert metrics data back to text format for sharing."""
-    text_lines = []
+def create_trajectory_chart(metric_name, variant_names, trajectory, alpha=0.05):
+    """Line charts of cumulative rate, lift, p-value and P2BB of every variant vs control over time."""
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=(
+            "Tasa de conversión acumulada (%)", "Lift vs control (%)",
+            "P-value vs control", "Probabilidad de superar al control"
+        ),
+        vertical_spacing=0.15
+    )
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FECA57', '#FF9FF3', '#54A0FF']
+    dates = trajectory['dates']
     
-    # Si hay título de experimento, agregarlo primero
-    if isinstance(metrics, dict) and 'experiment_title' in metrics:
-        text_lines.append(metrics['experiment_title'])
-        text_lines.append("")  # Línea vacía después del título
-        metrics_data = metrics['metrics']
-    else:
-        metrics_data = metrics
+    for i, name in enumerate(variant_names):
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Scatter(
+            x=dates, y=trajectory['rate'][:, i] * 100, name=name, legendgroup=name,
+            mode='lines', line=dict(color=color)
+        ), row=1, col=1)
+        if i == 0:
+            continue
+        # Columna i de la fila del control: la variante i contra el control
+        lift_interval = [
+            format_lift_interval(interval)
+            for interval in zip(trajectory['lift_lower'][:, 0, i], trajectory['lift_upper'][:, 0, i])
+        ]
+        fig.add_trace(go.Scatter(
+            x=dates, y=trajectory['relative_lift'][:, 0, i], name=name, legendgroup=name, showlegend=False,
+            mode='lines', line=dict(color=color), customdata=lift_interval,
+            hovertemplate="%{x}<br>Lift: %{y:+.2f}%<br>IC: %{customdata}<extra>" + name + "</extra>"
+        ), row=1, col=2)
+        fig.add_trace(go.Scatter(
+            x=dates, y=trajectory['p_value'][:, 0, i], name=name, legendgroup=name, showlegend=False,
+            mode='lines', line=dict(color=color)
+        ), row=2, col=1)
+        fig.add_trace(go.Scatter(
+            x=dates, y=trajectory['p2bb'][:, 0, i], name=name, legendgroup=name, showlegend=False,
+            mode='lines', line=dict(color=color)
+        ), row=2, col=2)
     
-    for metric_name, data in metrics_data.items():
-        text_lines.append(metric_name)
-        for variant in data['variants']:
-            text_lines.append(f"{variant['name']} {variant['n']} {variant['x']}")
-        text_lines.append("")  # Empty line between metrics
-    return "\n".join(text_lines)
+    fig.add_hline(y=0, line=dict(color='white', dash='dot', width=1), row=1, col=2)
+    fig.add_hline(y=alpha, line=dict(color='white', dash='dash', width=1), row=2, col=1)
+    fig.add_hline(y=0.95, line=dict(color='white', dash='dash', width=1), row=2, col=2)
+    fig.update_yaxes(range=[0, 1], row=2, col=1)
+    fig.update_yaxes(range=[0, 1], row=2, col=2)
+    fig.update_layout(
+        title=f'Evolución Acumulada - {metric_name}',
+        height=600,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    return fig
 
-def create_share_url_section(metrics):
-    """Create section for sharing URL with current data."""
+def create_share_url_section(metrics, with_results=True):
+    """Create section for sharing URL with current data; without with_results only the data is stored."""
     if metrics:
         st.markdown("#### 🔗 Compartir")
         
+        # El formato compacto de los links solo guarda sesiones y conversiones
+        metrics_data = metrics['metrics'] if 'experiment_title' in metrics else metrics
+        if any(metric.get('type') == 'continuous' for metric in metrics_data.values()):
+            st.caption("Los links compartidos aún no admiten métricas continuas.")
+            return
+        
         # Generar URL compartible
-        share_url = generate_share_url(metrics)
+        share_url = generate_share_url(metrics, with_results)
         
         if share_url:
             # Si la URL contiene el placeholder, mostrar ayuda especial
@@ -1067,8 +1459,19 @@ def create_share_url_section(metrics):
 def load_data_from_url():
     """Load data from URL parameter if present."""
     try:
+        # Links con ID corto: datos y resultados precalculados desde el store
+        if 'id' in st.query_params:
+            stored_data, stored_results = load_experiment(st.query_params['id'])
+            
+            if stored_data:
+                # Se suman a los resultados de la sesión en vez de reemplazarlos en cada rerun
+                st.session_state.setdefault('stored_results', {}).update(stored_results or {})
+                return convert_metrics_to_text(stored_data), stored_data
+            else:
+                st.error("❌ No se encontró el experimento compartido")
+        
         # Usar la nueva API de query params
-        if 'data' in st.query_params:
+        elif 'data' in st.query_params:
             encoded_data = st.query_params['data']
             
             decoded_data = decode_data_from_url(encoded_data)
@@ -1174,14 +1577,66 @@ Variant-1 3830 1417
 Variant-2 3835 1350"""
         )
         
+        # Para exports grandes: texto línea a línea o tablas CSV/Parquet
+        # (columnas experiment, metric, variant, sessions, conversions; sum y sum_sq para métricas continuas)
+        uploaded_file = st.file_uploader(
+            "O sube un archivo (.txt con el mismo formato, o export .csv / .parquet)",
+            type=['txt', 'csv', 'parquet']
+        )
+        
+        # Los exports tabulares pueden traer varios experimentos: elegir cuál mostrar
+        metrics_table = None
+        selected_experiment = None
+        selected_segment = None
+        dimension_table = None
+        if uploaded_file is not None and not uploaded_file.name.lower().endswith('.txt'):
+            try:
+                metrics_table = load_uploaded_table(uploaded_file.getvalue(), uploaded_file.name)
+                experiments = list(metrics_table['experiment'].cat.categories)
+                if len(experiments) > 1:
+                    selected_experiment = st.selectbox("Experimento", experiments)
+                
+                # Exports con dimensiones (device, country, ...): todos los segmentos en una sola tabla
+                if dimension_columns(metrics_table) or SEGMENT_COLUMN in metrics_table.columns:
+                    dimension_table = metrics_table
+                    metrics_table = get_segment_table(metrics_table)
+                    experiment = selected_experiment or experiments[0]
+                    segments = list(pd.unique(
+                        metrics_table.loc[metrics_table['experiment'] == experiment, SEGMENT_COLUMN].astype(str)
+                    ))
+                    selected_segment = st.selectbox("Segmento", segments)
+            except Exception as e:
+                st.error(f"Error al leer el archivo: {str(e)}")
+                uploaded_file = None
+        
         # Cambiar texto del botón si hay datos cargados desde URL
         button_text = "Re-analizar" if loaded_text else "Analizar"
         
         if st.button(button_text, type="primary"):
-            if data:
+            if uploaded_file is not None or data:
                 try:
-                    parsed_data = parse_metrics_data(data)
+                    if metrics_table is not None:
+                        parsed_data = table_to_metrics(metrics_table, selected_experiment, selected_segment)
+                    else:
+                        parsed_data = parse_metrics_data(uploaded_file if uploaded_file is not None else data)
                     st.session_state.metrics = parsed_data
+                    
+                    # Tabla de segmentos del experimento para la vista por segmento
+                    st.session_state.segment_table = None
+                    st.session_state.dimension_table = None
+                    st.session_state.series_table = None
+                    st.session_state.current_segment = selected_segment
+                    if selected_segment is not None:
+                        experiment = selected_experiment or metrics_table['experiment'].iloc[0]
+                        st.session_state.segment_table = metrics_table[metrics_table['experiment'] == experiment]
+                        st.session_state.dimension_table = dimension_table[dimension_table['experiment'] == experiment]
+                    
+                    # Exports diarios u horarios: trayectorias acumuladas además de los totales
+                    series_table = dimension_table if dimension_table is not None else metrics_table
+                    if series_table is not None and has_time_series(series_table):
+                        experiment = selected_experiment or series_table['experiment'].iloc[0]
+                        st.session_state.series_table = series_table[series_table['experiment'] == experiment]
+                    st.session_state.count_history = {}  # Datos nuevos: reiniciar el monitoreo secuencial
                     st.session_state.show_results = True
                     st.session_state.auto_loaded = False  # Marcar como análisis manual
                 except Exception as e:
@@ -1193,12 +1648,33 @@ Variant-2 3835 1350"""
     with col_input_right:
         if 'show_results' in st.session_state and st.session_state.show_results:
             stored_data = st.session_state.metrics
-            # Sección para compartir URL
-            create_share_url_section(stored_data)
+            # Sección para compartir URL; con SRM no se calculan resultados para guardarlos
+            create_share_url_section(stored_data, with_results=not srm_blocks_analysis(stored_data))
+            
+            # Actualización incremental: solo se suman los conteos nuevos
+            with st.expander("➕ Agregar Datos Nuevos", expanded=False):
+                delta_text = st.text_area(
+                    "Sesiones y conversiones nuevas (mismo formato, solo las variantes que cambiaron):",
+                    height=150,
+                    key="delta_text"
+                )
+                if st.button("Actualizar", key="apply_deltas"):
+                    try:
+                        apply_metric_deltas(delta_text)
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error al actualizar los datos: {str(e)}")
+
+    # Planificación de tamaño de muestra y duración
+    with st.expander("🧮 Planificador de Experimentos", expanded=False):
+        create_planner_section()
 
     # Auto-cargar y auto-analizar si hay datos de URL
     if loaded_metrics:
         st.session_state.metrics = loaded_metrics
+        st.session_state.segment_table = None
+        st.session_state.dimension_table = None
+        st.session_state.series_table = None
         st.session_state.show_results = True
         st.session_state.auto_loaded = True
 
@@ -1231,21 +1707,78 @@ Variant-2 3835 1350"""
             metrics = stored_data
             st.header("📊 Resultados del Análisis")
         
+        # Corrección por comparaciones múltiples: una sola familia con todos los pares de todas las métricas
+        correction = st.selectbox(
+            "Corrección por comparaciones múltiples",
+            CORRECTION_METHODS,
+            format_func=CORRECTION_LABELS.get,
+            key="correction_method"
+        )
+        
+        # Chequeo de SRM antes de calcular: un split roto invalida todos los resultados
+        st.text_input(
+            "Split esperado por variante (%)", value="", placeholder="Vacío = partes iguales (ej. 50, 25, 25)",
+            key="srm_split"
+        )
+        srm_results, split_error = check_metrics_srm(metrics)
+        if split_error:
+            st.error(f"Split esperado inválido: {split_error}")
+        if any(srm['mismatch'] for srm in srm_results.values()):
+            st.error("⚠️ Sample Ratio Mismatch: las sesiones por variante no coinciden con el split esperado.")
+            create_srm_section(metrics, srm_results)
+            if not st.checkbox("Analizar de todos modos", value=False, key="srm_override"):
+                return
+        
+        corrected_matrices = correct_matrices({
+            metric_name: (
+                get_continuous_results(data['variants']) if data.get('type') == 'continuous'
+                else get_metric_results(data['variants'])['matrix']
+            )
+            for metric_name, data in metrics.items()
+            if 'variants' in data and len(data['variants']) > 0
+        }, correction)
+        
+        # Vista por segmento de un export con dimensiones (device, country, ...)
+        if st.session_state.get('segment_table') is not None:
+            st.caption(f"Segmento: {st.session_state.current_segment}")
+            with st.expander("🗂️ Resultados por Segmento", expanded=False):
+                create_segment_section(st.session_state.segment_table, correction)
+            
+            # Un solo test por par estratificado por una dimensión, en lugar de uno por segmento
+            dimension_table = st.session_state.get('dimension_table')
+            if dimension_table is not None and dimension_columns(dimension_table):
+                with st.expander("🧩 Test Estratificado (Cochran-Mantel-Haenszel)", expanded=False):
+                    create_stratified_section(dimension_table, correction)
+        
+        # Trayectorias acumuladas de los exports en serie de tiempo
+        trajectories = {}
+        if st.session_state.get('series_table') is not None:
+            trajectories = get_trajectories(st.session_state.series_table, st.session_state.get('current_segment'))
+        
         # Procesar cada métrica
         for metric_name, data in metrics.items():
             # Verificar si tiene la estructura de variantes nueva o la legacy
-            if 'variants' in data and len(data['variants']) > 0:
+            if 'variants' in data and len(data['variants']) > 0 and data.get('type') == 'continuous':
+                # Métricas continuas (ingresos, AOV): medias en lugar de tasas de conversión
+                st.subheader(f"🎯 {metric_name}")
+                create_continuous_section(data['variants'], corrected_matrices[metric_name])
+                cuped = get_cuped_results(data['variants'])
+                if cuped is not None:
+                    with st.expander("📉 Ajuste CUPED (covariable del pre-periodo)", expanded=False):
+                        create_cuped_section(data['variants'], cuped)
+            elif 'variants' in data and len(data['variants']) > 0:
                 variants = data['variants']
                 
+                # Resultados compartidos por cards, matriz y comparaciones (calculados una sola vez)
+                metric_results = get_metric_results(variants)
+                matrix = corrected_matrices[metric_name]
+                
                 # Contenedor para cada métrica
                 st.subheader(f"🎯 {metric_name}")
                 
                 # Si solo hay 2 variantes, usar el formato original (más compacto)
                 if len(variants) == 2 and 'baseline' in data and 'treatment' in data:
-                    results = calculate_ab_test(
-                        data['baseline']['n'], data['baseline']['x'],
-                        data['treatment']['n'], data['treatment']['x']
-                    )
+                    results = ab_test_from_matrix(matrix, 0, 1)
                     
                     # Mostrar en dos columnas: card + gráfico
                     col_card, col_chart = st.columns([1, 1])
@@ -1254,67 +1787,33 @@ Variant-2 3835 1350"""
                         experiment_title = stored_data.get('experiment_title') if isinstance(stored_data, dict) else None
                         create_metric_card(metric_name, data, results, experiment_title)
                     
+                    # Evolución diaria u horaria junto a la card
+                    if metric_name in trajectories:
+                        with col_chart:
+                            st.plotly_chart(
+                                create_trajectory_chart(metric_name, *trajectories[metric_name]),
+                                use_container_width=True
+                            )
+                    
                 else:
                     # Análisis multivariante - Usar exactamente el mismo diseño que A/B
-                    control = variants[0]  # Primera variante es el control
+                    experiment_title = stored_data.get('experiment_title') if isinstance(stored_data, dict) else None
                     
-                    # Sección 1: Comparaciones vs Control
+                    # Sección 1: Comparaciones vs Control (primera variante), paginadas
                     st.markdown("### 📊 Comparaciones vs Control")
-                    for i, treatment in enumerate(variants[1:], 1):
-                        # Crear estructura de datos compatible con create_metric_card
-                        comparison_data = {
-                            'baseline': control,
-                            'treatment': treatment
-                        }
-                        
-                        # Calcular estadísticas para esta comparación específica
-                        results = calculate_ab_test(
-                            control['n'], control['x'],
-                            treatment['n'], treatment['x']
-                        )
-                        
-                        # Usar la función original create_metric_card
-                        # Para multivariante, combinar KPI + comparación
-                        comparison_name = f"{metric_name} - {control['name']} vs {treatment['name']}"
-                        
-                        # Pasar el título del experimento si existe
-                        experiment_title = stored_data.get('experiment_title') if isinstance(stored_data, dict) else None
-                        create_metric_card(comparison_name, comparison_data, results, experiment_title)
+                    control_pairs = [(0, i) for i in range(1, len(variants))]
+                    for i, j in paginate(control_pairs, key=f"control_page_{metric_name}"):
+                        create_pair_metric_card(metric_name, variants, matrix, i, j, experiment_title)
                     
-                    # Sección 2: Comparaciones entre Variantes
+                    # Sección 2: Comparaciones entre Variantes (excluyendo vs control)
                     if len(variants) > 2:  # Solo si hay más de 2 variantes en total
                         st.markdown("### 🔄 Comparaciones entre Variantes")
-                        
-                        # Generar todas las comparaciones entre variantes (excluyendo vs control)
-                        treatment_variants = variants[1:]  # Todas menos el control
-                        
-                        for i in range(len(treatment_variants)):
-                            for j in range(i + 1, len(treatment_variants)):
-                                variant_a = treatment_variants[i]
-                                variant_b = treatment_variants[j]
-                                
-                                # Crear estructura de datos compatible con create_metric_card
-                                comparison_data = {
-                                    'baseline': variant_a,
-                                    'treatment': variant_b
-                                }
-                                
-                                # Calcular estadísticas para esta comparación específica
-                                results = calculate_ab_test(
-                                    variant_a['n'], variant_a['x'],
-                                    variant_b['n'], variant_b['x']
-                                )
-                                
-                                # Usar la función original create_metric_card
-                                # Para comparaciones entre variantes, también incluir el KPI
-                                comparison_name = f"{metric_name} - {variant_a['name']} vs {variant_b['name']}"
-                                
-                                # Pasar el título del experimento si existe
-                                experiment_title = stored_data.get('experiment_title') if isinstance(stored_data, dict) else None
-                                create_metric_card(comparison_name, comparison_data, results, experiment_title)
+                        variant_pairs = list(combinations(range(1, len(variants)), 2))
+                        for i, j in paginate(variant_pairs, key=f"variant_page_{metric_name}"):
+                            create_pair_metric_card(metric_name, variants, matrix, i, j, experiment_title)
                     
                     # Test Chi-cuadrado como información adicional
-                    chi_square_result = calculate_chi_square_test(variants)
+                    chi_square_result = metric_results['chi_square']
                     with st.expander("📊 Test Chi-cuadrado General", expanded=False):
                         st.markdown(f"""
                         **Test Chi-cuadrado:** {'Significativo' if chi_square_result['significant'] else 'No significativo'} 
@@ -1323,22 +1822,47 @@ Variant-2 3835 1350"""
                         Este test evalúa si existe una diferencia significativa entre **todas** las variantes de forma global.
                         """)
                     
-                    # Análisis adicional (colapsado)
-                    with st.expander("📋 Análisis Detallado", expanded=False):
+                    # Análisis adicional: un expander siempre ejecuta su contenido, así que
+                    # la matriz, el gráfico y las tarjetas solo se construyen al activarlo
+                    if st.toggle("📋 Análisis Detallado", value=False, key=f"detail_{metric_name}"):
                         # Dos columnas para matriz y gráfico
                         col_matrix, col_chart = st.columns([1, 1])
                         
                         with col_matrix:
-                            create_comparison_matrix(metric_name, variants)
+                            create_comparison_matrix(metric_name, variants, matrix)
                         
                         with col_chart:
-                            fig = create_visualization(metric_name, variants)
+                            fig = create_visualization(metric_name, variants, matrix)
                             st.plotly_chart(fig, use_container_width=True)
                         
+                        if metric_name in trajectories:
+                            st.plotly_chart(
+                                create_trajectory_chart(metric_name, *trajectories[metric_name]),
+                                use_container_width=True
+                            )
+                        
                         # Comparaciones detalladas
                         st.markdown("### Todas las Comparaciones Pairwise")
-                        all_comparisons = calculate_all_pairwise_comparisons(variants)
+                        all_comparisons = calculate_all_pairwise_comparisons(variants, matrix=matrix)
                         create_all_comparisons_section(metric_name, all_comparisons)
+                
+                # Resumen bayesiano multi-brazo (resultados guardados antes de esta sección no lo traen)
+                joint = metric_results.get('joint') or calculate_joint_posterior(
+                    [variant['n'] for variant in variants], [variant['x'] for variant in variants]
+                )
+                with st.expander("🏆 Probabilidad de ser la Mejor (Bayesiano)", expanded=False):
+                    create_joint_posterior_section(variants, joint)
+                
+                # Reducción de varianza con la covariable del pre-periodo, si el archivo la trae
+                cuped = get_cuped_results(variants)
+                if cuped is not None:
+                    with st.expander("📉 Ajuste CUPED (covariable del pre-periodo)", expanded=False):
+                        create_cuped_section(variants, cuped)
+                
+                # Monitoreo secuencial sobre los conteos acumulados de cada actualización
+                history = get_count_history(metric_name, variants)
+                with st.expander("⏱️ Monitoreo Secuencial (mSPRT)", expanded=False):
+                    create_sequential_section(variants, history)
             
             st.markdown("---")
 
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_databases(tmp_path, monkeypatch):
+    """Keep the persistent cache and the experiment store of each test in its own directory."""
+    monkeypatch.setenv('ABTEST_CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setenv('ABTEST_STORE_PATH', str(tmp_path / 'store.sqlite3'))
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from abtesting.analysis import analyze_table, split_table
+
+
+def _table(n_metrics=7):
+    rng = np.random.default_rng(11)
+    rows = []
+    for metric in range(n_metrics):
+        n_variants = 2 + metric % 3
+        sessions = int(rng.integers(2000, 4000))
+        for variant in range(n_variants):
+            rows.append(('E', f'M{metric}', f'V{variant}', sessions, int(rng.binomial(sessions, 0.1))))
+    return pd.DataFrame(rows, columns=['experiment', 'metric', 'variant', 'sessions', 'conversions'])
+
+def test_split_table_keeps_whole_metrics_in_order():
+    table = _table()
+    chunks = split_table(table, 3)
+    assert [chunk['metric'].unique().tolist() for chunk in chunks] == [
+        ['M0', 'M1', 'M2'], ['M3', 'M4', 'M5'], ['M6']
+    ]
+    pd.testing.assert_frame_equal(pd.concat(chunks), table)
+
+@pytest.mark.parametrize('method', ['exact', 'montecarlo'])
+def test_parallel_results_equal_serial(method):
+    table = _table()
+    serial = analyze_table(table, p2bb_method=method)
+    parallel = analyze_table(table, p2bb_method=method, workers=2, chunksize=2)
+    for name in ('pairs', 'metrics'):
+        pd.testing.assert_frame_equal(parallel[name], serial[name])
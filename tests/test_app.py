@@ -0,0 +1,105 @@
+import os
+import re
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import abtesting
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+EXPERIMENT = """EXP-1 - Modal
+
+[Cabin bag A2C]
+Baseline 3824 42
+Variant-1 3830 55
+Variant-2 3835 46
+
+[NSR Baggage]
+Baseline 3824 1405
+Variant-1 3830 1417
+"""
+
+
+@pytest.fixture
+def app():
+    st.cache_data.clear()
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.run()
+    return app
+
+def _analyze(app, text=EXPERIMENT):
+    app.text_area[0].input(text)
+    app.button[0].click().run()
+    assert not app.exception
+
+@pytest.fixture
+def statistics_calls(monkeypatch):
+    calls = []
+    original = abtesting.calculate_metric_statistics
+    
+    def counting(counts, *args, **kwargs):
+        calls.append(counts)
+        return original(counts, *args, **kwargs)
+    
+    # app.py importa desde abtesting en cada rerun, así que toma la versión que cuenta
+    monkeypatch.setattr(abtesting, 'calculate_metric_statistics', counting)
+    return calls
+
+def test_metric_statistics_are_computed_once_per_metric(app, statistics_calls):
+    calls = statistics_calls
+    _analyze(app)
+    assert len(calls) == 2
+    
+    # Un rerun (widgets, expanders) reutiliza los resultados compartidos
+    app.run()
+    assert not app.exception
+    assert len(calls) == 2
+
+def _shown_pairs(app):
+    return set(re.findall(r'V\d vs V\d', ' '.join(markdown.value for markdown in app.markdown)))
+
+def test_comparison_cards_are_paginated_and_details_rendered_on_demand(app):
+    _analyze(app, "[M]\n" + "\n".join(f"V{i} 5000 {400 + 7 * i}" for i in range(7)))
+    
+    # 15 comparaciones entre variantes: solo la primera página de 6 se renderiza
+    page = app.selectbox(key='variant_page_[M]')
+    assert len(page.options) == 3
+    assert {'V1 vs V2', 'V2 vs V3'} <= _shown_pairs(app)
+    assert 'V5 vs V6' not in _shown_pairs(app)
+    page.set_value(3).run()
+    assert {'V4 vs V6', 'V5 vs V6'} <= _shown_pairs(app)
+    assert 'V1 vs V2' not in _shown_pairs(app)
+    
+    # El análisis detallado (matriz y gráficos) solo se construye al activarlo
+    charts = len(app.get('plotly_chart'))
+    app.toggle(key='detail_[M]').set_value(True).run()
+    assert not app.exception
+    assert len(app.get('plotly_chart')) > charts
+
+def test_srm_flagged_experiment_is_not_analysed(app, statistics_calls):
+    _analyze(app, "[A2C]\nA 10000 500\nB 12000 700\n")
+    assert any('Sample Ratio Mismatch' in error.value for error in app.error)
+    # Ni los resultados ni el link compartido calculan estadísticas
+    assert statistics_calls == []
+    
+    app.checkbox(key='srm_override').check().run()
+    assert not app.exception
+    assert len(statistics_calls) == 1
+
+def test_shared_id_results_are_merged_into_the_session():
+    data = abtesting.parse_metrics_data(EXPERIMENT)
+    counts = tuple((v['n'], v['x']) for v in data['metrics']['[NSR Baggage]']['variants'])
+    stored_key = abtesting.results_key(counts, 'exact')
+    exp_id = abtesting.save_experiment(data, {stored_key: abtesting.calculate_metric_statistics(counts)})
+    
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.query_params['id'] = exp_id
+    app.session_state['stored_results'] = {'session': 'kept'}
+    app.run()
+    assert not app.exception
+    # Los resultados del link se suman a los de la sesión en cada rerun
+    for _ in range(2):
+        assert app.session_state['stored_results']['session'] == 'kept'
+        assert stored_key in app.session_state['stored_results']
+        app.run()
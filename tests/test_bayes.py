@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from abtesting.bayes import calculate_p2bb, calculate_p2bb_matrix, calculate_p2bb_pairs
+
+CASES = [
+    ([100, 120], [3, 9]),
+    ([10, 12], [0, 1]),
+    ([5000, 5000], [500, 560]),
+    ([20, 3000], [19, 2990]),
+    ([2000000, 2000000], [40000, 40500])
+]
+
+
+@pytest.mark.parametrize('n, x', CASES)
+@pytest.mark.parametrize('n_nodes', [4, 64])
+def test_matrix_matches_scalar_exact_within_tol(n, x, n_nodes):
+    tol = 1e-9
+    matrix = calculate_p2bb_matrix(n, x, n_nodes=n_nodes, tol=tol)
+    scalar = calculate_p2bb(n[0], x[0], n[1], x[1])
+    assert matrix[0, 1] == pytest.approx(scalar, abs=tol)
+    assert matrix[1, 0] == pytest.approx(1 - scalar, abs=tol)
+
+@pytest.mark.parametrize('total', [10 ** 6, 10 ** 7, 10 ** 8, 10 ** 9])
+@pytest.mark.parametrize('small', [10, None])
+def test_scalar_large_symmetric_counts_within_tol(total, small):
+    # Posteriores con la misma media: P(B > A) = 0.5 exacto
+    tol = 1e-10
+    a_n = small or total
+    assert abs(calculate_p2bb(a_n, a_n // 2, total, total // 2, tol=tol) - 0.5) <= tol
+    assert abs(calculate_p2bb(total, total // 2, a_n, a_n // 2, tol=tol) - 0.5) <= tol
+
+@pytest.mark.parametrize('total', [10 ** 8, 10 ** 9])
+def test_matrix_large_symmetric_counts_within_tol(total):
+    tol = 1e-10
+    n = [[total, total, total], [10, total, total]]
+    x = [[total // 2, total // 2, total // 20], [5, total // 2, total // 2]]
+    matrix = calculate_p2bb_matrix(n, x, tol=tol)
+    assert abs(matrix[0, 0, 1] - 0.5) <= tol
+    assert abs(matrix[1, 0, 1] - 0.5) <= tol
+    assert abs(matrix[1, 1, 2] - 0.5) <= tol
+    assert matrix[0, 0, 2] <= tol
+
+def test_pairs_match_matrix_entries():
+    n, x = np.array([1000, 1200, 900, 30]), np.array([100, 130, 80, 1])
+    tol = 1e-10
+    matrix = calculate_p2bb_matrix(n, x, tol=tol)
+    first, second = np.triu_indices(4, 1)
+    pairs = calculate_p2bb_pairs(n, x, first[:2], second[:2], tol=tol)
+    assert np.allclose(pairs, matrix[first[:2], second[:2]], rtol=0, atol=tol)
+    assert np.allclose(np.diagonal(matrix), 0.5)
+
+def test_batched_matrix_matches_each_metric():
+    n = np.array([[1000, 1000, 1000], [50, 60, 70]])
+    x = np.array([[100, 110, 90], [2, 9, 1]])
+    batch = calculate_p2bb_matrix(n, x)
+    for k in range(len(n)):
+        assert np.allclose(batch[k], calculate_p2bb_matrix(n[k], x[k]), rtol=0, atol=1e-10)
+
+def test_montecarlo_agrees_with_exact_and_is_reproducible():
+    n, x = [5000, 5000, 5000], [500, 540, 470]
+    exact = calculate_p2bb_matrix(n, x)
+    simulated = calculate_p2bb_matrix(n, x, method='montecarlo', n_simulations=200000)
+    assert np.allclose(simulated, exact, atol=0.005)
+    assert np.array_equal(simulated, calculate_p2bb_matrix(n, x, method='montecarlo', n_simulations=200000))
+    with pytest.raises(ValueError):
+        calculate_p2bb_matrix(n, x, method='bogus')
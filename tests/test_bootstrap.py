@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from abtesting import bootstrap_ratios, calculate_ratio_matrix
+
+
+def _units(rng, rate, users=400):
+    sessions = rng.poisson(3, users) + 1
+    return rng.binomial(sessions, rate), sessions
+
+def test_jackknife_standard_error_matches_leave_one_out():
+    rng = np.random.default_rng(0)
+    (x_a, n_a), (x_b, n_b) = _units(rng, 0.10), _units(rng, 0.12)
+    result = calculate_ratio_matrix([x_a, x_b], [n_a, n_b], method='jackknife')
+    
+    def variance(x, n):
+        leave_one_out = np.array([np.delete(x, k).sum() / np.delete(n, k).sum() for k in range(len(x))])
+        return (len(x) - 1) / len(x) * np.sum((leave_one_out - leave_one_out.mean()) ** 2)
+    
+    np.testing.assert_allclose(result['rate'], [x_a.sum() / n_a.sum(), x_b.sum() / n_b.sum()])
+    np.testing.assert_allclose(result['se'][0, 1], np.sqrt(variance(x_a, n_a) + variance(x_b, n_b)))
+    np.testing.assert_allclose(result['p2bb'][0, 1] + result['p2bb'][1, 0], 1.0)
+
+def test_bootstrap_does_not_depend_on_chunking_or_workers():
+    rng = np.random.default_rng(1)
+    units = [_units(rng, 0.1), _units(rng, 0.1)]
+    numerators, denominators = [x for x, _ in units], [n for _, n in units]
+    serial = bootstrap_ratios(numerators, denominators, n_resamples=300, chunk_size=100)
+    parallel = bootstrap_ratios(numerators, denominators, n_resamples=300, chunk_size=100, workers=2)
+    np.testing.assert_array_equal(serial, parallel)
+    assert serial.shape == (300, 2)
+
+@pytest.mark.parametrize('weights', ['poisson', 'multinomial'])
+def test_bootstrap_interval_covers_the_jackknife_interval(weights):
+    rng = np.random.default_rng(2)
+    units = [_units(rng, 0.10, 2000), _units(rng, 0.13, 2000)]
+    numerators, denominators = [x for x, _ in units], [n for _, n in units]
+    bootstrap = calculate_ratio_matrix(numerators, denominators, n_resamples=1000, weights=weights, unit_block=700)
+    jackknife = calculate_ratio_matrix(numerators, denominators, method='jackknife')
+    np.testing.assert_allclose(bootstrap['se'][0, 1], jackknife['se'][0, 1], rtol=0.15)
+    assert bootstrap['significant'][0, 1] == jackknife['significant'][0, 1]
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        calculate_ratio_matrix([[1]], [[2]], method='delta')
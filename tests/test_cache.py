@@ -0,0 +1,52 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from abtesting import cache_stats, calculate_ab_test, calculate_chi_square_test, calculate_metric_statistics
+from abtesting.cache import CACHE_FLUSH_INTERVAL, DEFAULT_CACHE_PATH
+
+
+COUNTS = ((1000, 50), (1000, 60), (1000, 55))
+
+
+def test_metric_statistics_hit_returns_the_computed_result():
+    first = calculate_metric_statistics(COUNTS)
+    second = calculate_metric_statistics(COUNTS)
+    np.testing.assert_array_equal(first['matrix']['p2bb'], second['matrix']['p2bb'])
+    stats = cache_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+def test_hits_are_not_written_until_flushed():
+    calculate_metric_statistics(COUNTS)
+    for _ in range(CACHE_FLUSH_INTERVAL - 1):
+        calculate_metric_statistics(COUNTS)
+    # Otra conexión todavía no ve los hits pendientes
+    with sqlite3.connect(os.environ['ABTEST_CACHE_PATH']) as connection:
+        counters = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+    assert counters.get('hits', 0) == 0
+    assert cache_stats()['hits'] == CACHE_FLUSH_INTERVAL - 1
+
+def test_threads_share_the_connection_safely():
+    # Hits, misses, flushes y desalojos de varios hilos sobre la misma conexión
+    os.environ['ABTEST_CACHE_MAX_ENTRIES'] = '20'
+    try:
+        calls = [((1000, 50 + k % 30), (1000, 60)) for k in range(3 * CACHE_FLUSH_INTERVAL)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(calculate_metric_statistics, calls))
+    finally:
+        del os.environ['ABTEST_CACHE_MAX_ENTRIES']
+    assert len(results) == len(calls)
+    stats = cache_stats()
+    assert stats['hits'] + stats['misses'] == len(calls)
+    assert stats['entries'] <= 20
+
+def test_closed_form_functions_are_not_cached():
+    calculate_ab_test(1000, 50, 1000, 60)
+    calculate_chi_square_test([{'n': n, 'x': x} for n, x in COUNTS])
+    assert cache_stats()['entries'] == 0
+
+def test_default_path_is_outside_the_working_directory():
+    assert os.path.isabs(DEFAULT_CACHE_PATH)
+    assert os.path.dirname(DEFAULT_CACHE_PATH).endswith('abtesting')
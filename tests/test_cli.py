@@ -0,0 +1,46 @@
+import json
+
+import pandas as pd
+
+from abtesting.analysis import analyze_files
+from abtesting.cli import main
+
+TEXT = """EXP-1 - Modal
+
+[A2C]
+Baseline 3824 42
+Variant-1 3830 55
+Variant-2 3835 46
+"""
+CSV = """experiment,metric,variant,sessions,conversions
+EXP-2,[Pay],A,1000,100
+EXP-2,[Pay],B,1010,120
+"""
+
+
+def _write_experiments(directory):
+    directory.mkdir()
+    (directory / 'one.txt').write_text(TEXT)
+    (directory / 'two.csv').write_text(CSV)
+    (directory / 'notes.md').write_text('ignorado')
+    return directory
+
+def test_analyze_files_reads_every_supported_file(tmp_path):
+    results = analyze_files([_write_experiments(tmp_path / 'exps')])
+    assert list(results['metrics']['experiment']) == ['EXP-1 - Modal', 'EXP-2']
+    assert len(results['pairs']) == 4
+
+def test_cli_writes_csv_and_json(tmp_path, capsys):
+    inputs = _write_experiments(tmp_path / 'exps')
+    output = tmp_path / 'out'
+    assert main([str(inputs), '-o', str(output), '-f', 'csv', 'json']) == 0
+    assert '2 métricas, 4 comparaciones analizadas' in capsys.readouterr().out
+    
+    pairs = pd.read_csv(output / 'pairs.csv')
+    assert len(pairs) == 4
+    assert len(json.loads((output / 'pairs.json').read_text())) == 4
+    assert (output / 'srm.csv').exists()
+
+def test_cli_reports_errors_without_a_traceback(tmp_path, capsys):
+    assert main([str(tmp_path / 'missing'), '-o', str(tmp_path / 'out')]) == 1
+    assert capsys.readouterr().err.startswith('Error:')
@@ -0,0 +1,48 @@
+import numpy as np
+from scipy import stats
+
+from abtesting import (
+    accumulate_sufficient_stats,
+    calculate_continuous_matrix,
+    merge_sufficient_stats,
+    sufficient_stats,
+)
+
+
+def test_continuous_matrix_matches_welch_t_test():
+    rng = np.random.default_rng(0)
+    samples = [rng.gamma(2.0, 15.0, 800), rng.gamma(2.0, 16.5, 900)]
+    statistics = [sufficient_stats(values) for values in samples]
+    result = calculate_continuous_matrix(*(np.array(column) for column in zip(*(
+        (s['n'], s['sum'], s['sum_sq']) for s in statistics
+    ))))
+    
+    welch = stats.ttest_ind(samples[1], samples[0], equal_var=False)
+    np.testing.assert_allclose(result['mean'], [values.mean() for values in samples])
+    np.testing.assert_allclose(result['t_score'][0, 1], welch.statistic)
+    np.testing.assert_allclose(result['p_value'][0, 1], welch.pvalue)
+    np.testing.assert_allclose(result['relative_lift'][0, 1], (samples[1].mean() / samples[0].mean() - 1) * 100)
+    np.testing.assert_allclose(result['p2bb'][0, 1] + result['p2bb'][1, 0], 1.0)
+
+def test_p2bb_matches_student_t_posterior_simulation():
+    n, total, total_sq = np.array([200, 220]), np.array([2000.0, 2300.0]), np.array([30000.0, 36000.0])
+    result = calculate_continuous_matrix(n, total, total_sq)
+    mean = total / n
+    scale = np.sqrt((total_sq - total * mean) / (n - 1) / n)
+    draws = mean + scale * stats.t.rvs(n - 1, size=(400000, 2), random_state=np.random.default_rng(0))
+    np.testing.assert_allclose(result['p2bb'][0, 1], np.mean(draws[:, 1] > draws[:, 0]), atol=3e-3)
+
+def test_sufficient_stats_merge_like_the_concatenated_data():
+    rng = np.random.default_rng(1)
+    first, second = rng.normal(5, 2, 100), rng.normal(5, 2, 50)
+    merged = merge_sufficient_stats(sufficient_stats(first), sufficient_stats(second))
+    expected = sufficient_stats(np.concatenate([first, second]))
+    for key in ('n', 'sum', 'sum_sq'):
+        np.testing.assert_allclose(merged[key], expected[key])
+    
+    # Bloques (variantes, valores) de datos crudos por usuario
+    chunks = [(np.array(['A'] * 100), first), (np.array(['A'] * 30 + ['B'] * 20), second)]
+    accumulated = accumulate_sufficient_stats(chunks)
+    assert list(accumulated) == ['A', 'B']
+    np.testing.assert_allclose(accumulated['A']['sum'], first.sum() + second[:30].sum())
+    np.testing.assert_allclose(accumulated['B']['sum_sq'], np.square(second[30:]).sum())
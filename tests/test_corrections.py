@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from abtesting.corrections import adjust_p_values, correct_matrices, correct_pairs
+from abtesting.stats import calculate_pairwise_matrix
+
+
+def _reference(p_values, method):
+    """Textbook step-down (Holm) / step-up (Benjamini-Hochberg) adjustment, one p-value at a time."""
+    m = len(p_values)
+    order = np.argsort(p_values)
+    adjusted = np.empty(m)
+    if method == 'bonferroni':
+        return np.minimum(np.asarray(p_values) * m, 1.0)
+    if method == 'holm':
+        running = 0.0
+        for rank, index in enumerate(order):
+            running = max(running, min(1.0, (m - rank) * p_values[index]))
+            adjusted[index] = running
+    else:
+        running = 1.0
+        for rank in range(m - 1, -1, -1):
+            index = order[rank]
+            running = min(running, p_values[index] * m / (rank + 1))
+            adjusted[index] = running
+    return adjusted
+
+@pytest.mark.parametrize('method', ['holm', 'bh', 'bonferroni'])
+def test_grouped_adjustment_matches_the_reference(method):
+    rng = np.random.default_rng(2)
+    p_values = rng.uniform(0, 0.2, 30) ** 2
+    groups = np.repeat(['E1', 'E2', 'E3'], [12, 10, 8])
+    adjusted = adjust_p_values(p_values, method, groups=groups)
+    for group in np.unique(groups):
+        family = groups == group
+        assert np.allclose(adjusted[family], _reference(p_values[family], method))
+
+def test_nan_is_ignored_and_none_is_a_copy():
+    p_values = np.array([0.01, np.nan, 0.04])
+    adjusted = adjust_p_values(p_values, 'holm')
+    assert np.isnan(adjusted[1])
+    assert np.allclose(adjusted[[0, 2]], [0.02, 0.04])
+    assert np.array_equal(adjust_p_values(p_values, 'none'), p_values, equal_nan=True)
+    with pytest.raises(ValueError):
+        adjust_p_values(p_values, 'sidak')
+
+def test_matrices_and_pairs_correct_each_experiment_as_one_family():
+    matrices = {
+        'A2C': calculate_pairwise_matrix([5000, 5000, 5000], [500, 560, 470]),
+        'Pay': calculate_pairwise_matrix([5000, 5000], [100, 130])
+    }
+    corrected = correct_matrices(matrices, 'bonferroni')
+    for name, matrix in corrected.items():
+        assert np.array_equal(matrix['adjusted_p_value'], matrix['adjusted_p_value'].T)
+        upper = np.triu_indices(len(matrix['rate']), 1)
+        assert np.allclose(matrix['adjusted_p_value'][upper], np.minimum(matrices[name]['p_value'][upper] * 4, 1))
+    
+    pairs = pd.DataFrame({'experiment': ['E1', 'E1', 'E2'], 'p_value': [0.01, 0.03, 0.03]})
+    result = correct_pairs(pairs, 'holm')
+    assert list(result['adjusted_p_value']) == pytest.approx([0.02, 0.03, 0.03])
+    assert list(result['significant']) == [True, True, True]
@@ -0,0 +1,63 @@
+import numpy as np
+from scipy import stats
+
+from abtesting import calculate_cuped_matrix, cuped_from_variants
+from abtesting.stats import compare_means
+
+
+def _user_level_data(rng, effect=0.5, users=4000):
+    """Per-user pre-period covariate X and outcome Y for a control and a treatment."""
+    data = []
+    for lift in (0.0, effect):
+        pre = rng.normal(10, 3, users)
+        data.append((pre, 2 + 0.8 * pre + lift + rng.normal(0, 1, users)))
+    return data
+
+def _aggregates(data):
+    return [
+        [len(y) for _, y in data],
+        [y.sum() for _, y in data],
+        [(y ** 2).sum() for _, y in data],
+        [x.sum() for x, _ in data],
+        [(x ** 2).sum() for x, _ in data],
+        [(x * y).sum() for x, y in data]
+    ]
+
+def test_cuped_matches_pooled_within_variant_regression():
+    data = _user_level_data(np.random.default_rng(0))
+    result = calculate_cuped_matrix(*_aggregates(data))
+    
+    # Pendiente común de Y sobre X centrando dentro de cada variante
+    centered = [(x - x.mean(), y - y.mean()) for x, y in data]
+    theta = sum((cx * cy).sum() for cx, cy in centered) / sum((cx ** 2).sum() for cx, _ in centered)
+    pooled_pre_mean = np.concatenate([x for x, _ in data]).mean()
+    adjusted = [y - theta * (x - pooled_pre_mean) for x, y in data]
+    
+    np.testing.assert_allclose(result['theta'], theta)
+    np.testing.assert_allclose(result['rate'], [values.mean() for values in adjusted])
+    residual_se = np.sqrt(sum(values.var(ddof=1) / len(values) for values in adjusted))
+    np.testing.assert_allclose(result['se'][0, 1], residual_se)
+    assert result['variance_reduction'].min() > 0.8
+    assert result['significant'][0, 1]
+
+def test_cuped_from_variants_uses_conversions_as_outcome():
+    variants = [
+        {'n': 1000, 'x': 100, 'pre_sum': 90, 'pre_sum_sq': 90, 'cross_sum': 60},
+        {'n': 1000, 'x': 120, 'pre_sum': 95, 'pre_sum_sq': 95, 'cross_sum': 70}
+    ]
+    result = cuped_from_variants(variants)
+    expected = calculate_cuped_matrix([1000, 1000], [100, 120], [100, 120], [90, 95], [90, 95], [60, 70])
+    np.testing.assert_array_equal(result['rate'], expected['rate'])
+
+def test_compare_means_delta_method_lift_interval():
+    result = compare_means(np.array(2.0), np.array(0.01), np.array(2.2), np.array(0.02))
+    z = stats.norm.isf(0.025)
+    ratio_se = np.sqrt(0.02 / 2.0 ** 2 + 2.2 ** 2 * 0.01 / 2.0 ** 4)
+    np.testing.assert_allclose(result['relative_lift'], 10.0)
+    np.testing.assert_allclose(result['lift_lower'], (1.1 - z * ratio_se - 1) * 100)
+    np.testing.assert_allclose(result['lift_upper'], (1.1 + z * ratio_se - 1) * 100)
+    np.testing.assert_allclose(result['p2bb'], stats.norm.cdf(0.2 / np.sqrt(0.03)))
+    
+    # Sin línea base el lift queda sin definir
+    empty = compare_means(np.array(0.0), np.array(0.0), np.array(1.0), np.array(0.1))
+    assert empty['relative_lift'] == 0 and np.isnan(empty['lift_lower'])
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from abtesting.bayes import P2BB_TOLERANCE
+from abtesting.incremental import merge_metric_deltas, parse_metric_deltas, update_experiment
+from abtesting.parsing import parse_metrics_data
+from abtesting.stats import calculate_metric_statistics, update_metric_statistics
+
+DATA = parse_metrics_data("""EXP-5
+
+[A2C]
+A 1000 100
+B 1000 120
+C 1000 90
+D 1000 95
+
+[Pay]
+A 1000 40
+B 1000 45
+""")
+DELTAS = "[A2C]\nB 500 70\nB 100 10\nE 300 20\n"
+
+
+def _assert_same_statistics(updated, full):
+    assert updated['matrix'].keys() == full['matrix'].keys()
+    for key in full['matrix']:
+        # La P2BB exacta de los pares recalculados coincide dentro de la tolerancia de la cuadratura
+        atol = P2BB_TOLERANCE if key == 'p2bb' else 1e-9
+        assert np.allclose(updated['matrix'][key], full['matrix'][key], rtol=0, atol=atol, equal_nan=True), key
+    assert updated['chi_square']['p_value'] == pytest.approx(full['chi_square']['p_value'])
+    assert np.array_equal(updated['joint']['prob_best'], full['joint']['prob_best'])
+
+@pytest.mark.parametrize('method', ['exact', 'montecarlo'])
+def test_update_equals_full_recompute(method):
+    before = ((1000, 100), (1000, 120), (1000, 90), (1000, 95))
+    after = ((1000, 100), (1600, 200), (1000, 90), (1000, 95))
+    results = calculate_metric_statistics(before, p2bb_method=method)
+    updated = update_metric_statistics(results, after, [1], p2bb_method=method)
+    _assert_same_statistics(updated, calculate_metric_statistics(after, p2bb_method=method))
+    # Los resultados anteriores no se modifican
+    assert results['matrix']['rate'][1] == 0.12
+
+def test_deltas_are_added_and_new_variants_appended():
+    deltas = parse_metric_deltas(DELTAS)
+    assert deltas == {'[A2C]': {'B': (600, 80), 'E': (300, 20)}}
+    updated, changed = merge_metric_deltas(DATA, deltas)
+    variants = updated['metrics']['[A2C]']['variants']
+    assert [(v['name'], v['n'], v['x']) for v in variants][1:] == [
+        ('B', 1600, 200), ('C', 1000, 90), ('D', 1000, 95), ('E', 300, 20)
+    ]
+    assert changed == {'[A2C]': [1, 4]}
+    assert DATA['metrics']['[A2C]']['variants'][1]['n'] == 1000
+
+def test_update_experiment_only_touches_changed_metrics():
+    results = {name: calculate_metric_statistics(tuple((v['n'], v['x']) for v in metric['variants']))
+               for name, metric in DATA['metrics'].items()}
+    updated_data, updated_results = update_experiment(DATA, results, parse_metric_deltas(DELTAS))
+    assert updated_results['[Pay]'] is results['[Pay]']
+    
+    counts = tuple((v['n'], v['x']) for v in updated_data['metrics']['[A2C]']['variants'])
+    _assert_same_statistics(updated_results['[A2C]'], calculate_metric_statistics(counts))
+
+def test_invalid_deltas_are_rejected():
+    with pytest.raises(ValueError, match='Conteos inválidos'):
+        merge_metric_deltas(DATA, {'[Pay]': {'A': (0, 1000)}})
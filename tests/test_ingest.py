@@ -0,0 +1,42 @@
+import io
+
+import pandas as pd
+import pytest
+
+from abtesting.ingest import columns_to_table, load_metrics_table, normalize_metrics_table, table_to_metrics
+from abtesting.parsing import parse_metrics_columns, parse_metrics_data
+
+CSV = """Experiment_Title,Metric_Name,Variant_Name,n,x
+EXP-7,[A2C],Baseline,3824,42
+EXP-7,[A2C],Variant 1,3830,55
+EXP-7,[Pay],Baseline,3824,1405
+EXP-7,[Pay],Variant 1,3830,1417
+"""
+
+
+def test_csv_aliases_are_normalized_to_the_columnar_table():
+    table = load_metrics_table(io.StringIO(CSV))
+    assert list(table.columns) == ['experiment', 'metric', 'variant', 'sessions', 'conversions']
+    assert table['sessions'].dtype == 'int64'
+    assert list(table['metric'].cat.categories) == ['[A2C]', '[Pay]']
+
+def test_parquet_matches_csv(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'export.parquet'
+    pd.read_csv(io.StringIO(CSV)).to_parquet(path)
+    pd.testing.assert_frame_equal(load_metrics_table(path), load_metrics_table(io.StringIO(CSV)))
+
+def test_table_and_text_give_the_same_metrics():
+    table = load_metrics_table(io.StringIO(CSV))
+    text = "EXP-7\n\n[A2C]\nBaseline 3824 42\nVariant 1 3830 55\n\n[Pay]\nBaseline 3824 1405\nVariant 1 3830 1417\n"
+    assert table_to_metrics(table) == parse_metrics_data(text)
+    pd.testing.assert_frame_equal(columns_to_table(parse_metrics_columns(text)), table)
+
+@pytest.mark.parametrize('rows, message', [
+    ({'metric': ['M'], 'variant': ['A'], 'sessions': [10]}, 'Faltan columnas'),
+    ({'metric': ['M'], 'variant': ['A'], 'sessions': [10], 'conversions': [1.5]}, 'enteros'),
+    ({'metric': ['M'], 'variant': ['A'], 'sessions': [10], 'conversions': [11]}, 'no puede ser mayor')
+])
+def test_invalid_exports_are_rejected(rows, message):
+    with pytest.raises(ValueError, match=message):
+        normalize_metrics_table(pd.DataFrame(rows))
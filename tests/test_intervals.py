@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from abtesting.intervals import calculate_intervals, credible_intervals, lift_intervals, rate_intervals
+
+N = np.array([1000, 1200, 50, 40])
+X = np.array([100, 150, 0, 3])
+
+
+def test_wilson_matches_scipy():
+    lower, upper = rate_intervals(N, X)
+    for n, x, low, high in zip(N, X, lower, upper):
+        reference = stats.binomtest(int(x), int(n)).proportion_ci(0.95, method='wilson')
+        assert low == pytest.approx(reference.low, abs=1e-12)
+        assert high == pytest.approx(reference.high)
+
+def test_agresti_coull_contains_the_wilson_center():
+    wilson = rate_intervals(N, X)
+    agresti = rate_intervals(N, X, method='agresti_coull')
+    center = (wilson[0] + wilson[1]) / 2
+    assert ((agresti[0] <= center) & (center <= agresti[1])).all()
+    with pytest.raises(ValueError):
+        rate_intervals(N, X, method='exact')
+
+def test_credible_intervals_are_beta_quantiles():
+    lower, upper = credible_intervals(N, X, alpha=0.1)
+    assert np.allclose(lower, stats.beta.ppf(0.05, X + 1, N - X + 1))
+    assert np.allclose(upper, stats.beta.ppf(0.95, X + 1, N - X + 1))
+
+def test_lift_intervals_bracket_the_lift_and_agree_for_large_samples():
+    n, x = np.array([200000, 200000]), np.array([10000, 10600])
+    delta = lift_intervals(n, x)
+    fieller = lift_intervals(n, x, method='fieller')
+    lift = (x[1] / n[1]) / (x[0] / n[0]) * 100 - 100
+    assert delta[0][0, 1] < lift < delta[1][0, 1]
+    assert fieller[0][0, 1] == pytest.approx(delta[0][0, 1], abs=0.1)
+    assert fieller[1][0, 1] == pytest.approx(delta[1][0, 1], abs=0.1)
+
+def test_fieller_bounds_solve_the_ratio_test():
+    lower, upper = lift_intervals(N[:2], X[:2], method='fieller')
+    rate = X[:2] / N[:2]
+    variance = rate * (1 - rate) / N[:2]
+    z = stats.norm.isf(0.025)
+    for bound in (lower[0, 1], upper[0, 1]):
+        ratio = 1 + bound / 100
+        assert (rate[1] - ratio * rate[0]) ** 2 == pytest.approx(z ** 2 * (variance[1] + ratio ** 2 * variance[0]))
+
+def test_batch_intervals_and_undefined_lift():
+    intervals = calculate_intervals(np.stack([N, N]), np.stack([X, X]))
+    assert intervals['lift_lower'].shape == (2, 4, 4)
+    # Sin conversiones en A el lift no está definido
+    assert np.isnan(intervals['lift_lower'][0, 2, 3])
+    assert np.isfinite(intervals['lift_upper'][0, 3, 2])
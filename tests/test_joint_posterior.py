@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from abtesting.bayes import calculate_joint_posterior, calculate_p2bb_matrix
+
+
+def test_two_arms_prob_best_matches_exact_p2bb():
+    n, x = [5000, 5000], [500, 560]
+    joint = calculate_joint_posterior(n, x, n_draws=200000)
+    exact = calculate_p2bb_matrix(n, x, method='exact')
+    assert joint['prob_best'].sum() == pytest.approx(1.0)
+    assert joint['prob_best'][1] == pytest.approx(exact[0, 1], abs=0.005)
+    assert joint['p2bb'][0, 1] == pytest.approx(joint['prob_best'][1])
+
+def test_expected_loss_orders_the_arms():
+    joint = calculate_joint_posterior([4000, 4000, 4000], [400, 440, 300])
+    assert np.argmax(joint['prob_best']) == 1
+    assert np.argmin(joint['expected_loss']) == 1
+    assert (joint['expected_loss'] >= 0).all()
+    assert np.allclose(np.diagonal(joint['p2bb']), 0.5)
+
+def test_joint_posterior_is_reproducible_and_batched():
+    n, x = np.array([[1000, 1000], [800, 900]]), np.array([[100, 120], [80, 70]])
+    first = calculate_joint_posterior(n, x)
+    second = calculate_joint_posterior(n, x)
+    assert np.array_equal(first['prob_best'], second['prob_best'])
+    assert first['prob_best'].shape == (2, 2)
+    assert first['p2bb'].shape == (2, 2, 2)
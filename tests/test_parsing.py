@@ -0,0 +1,54 @@
+import io
+
+import numpy as np
+import pytest
+
+from abtesting.parsing import convert_metrics_to_text, parse_metrics_columns, parse_metrics_data
+
+TEXT = """EXP-7 - Checkout
+
+[Cabin bag A2C]
+Baseline\t3,824\t42
+Variant 1 3830 55
+
+[NSR Baggage]
+Baseline 3824 1405
+Variant 1 3830 1417
+Variant 2 3835 1350
+"""
+
+
+@pytest.mark.parametrize('source', [
+    TEXT,
+    TEXT.splitlines(),
+    io.StringIO(TEXT),
+    io.BytesIO(TEXT.replace('\n', '\r\n').encode('utf-8'))
+])
+def test_every_source_streams_into_the_same_columns(source):
+    columns = parse_metrics_columns(source)
+    assert columns['experiment_title'] == 'EXP-7 - Checkout'
+    assert columns['metric_names'] == ['[Cabin bag A2C]', '[NSR Baggage]']
+    assert columns['variant_names'] == ['Baseline', 'Variant 1', 'Variant 2']
+    assert columns['metric_id'].tolist() == [0, 0, 1, 1, 1]
+    assert columns['variant_id'].tolist() == [0, 1, 0, 1, 2]
+    assert columns['n'].tolist() == [3824, 3830, 3824, 3830, 3835]
+    assert columns['x'].dtype == np.int64
+
+def test_nested_dict_roundtrips_through_text():
+    metrics = parse_metrics_data(TEXT)
+    cabin = metrics['metrics']['[Cabin bag A2C]']
+    assert cabin['baseline'] == {'name': 'Baseline', 'n': 3824, 'x': 42}
+    assert len(metrics['metrics']['[NSR Baggage]']['variants']) == 3
+    assert parse_metrics_data(convert_metrics_to_text(metrics)) == metrics
+
+def test_lazy_iterable_is_consumed_once():
+    lines = (line for line in TEXT.splitlines())
+    assert len(parse_metrics_columns(lines)['n']) == 5
+
+@pytest.mark.parametrize('text, message', [
+    ("[M]\nA 10 20\nB 10 1", 'no puede ser mayor'),
+    ("[M]\nA 10 2", 'al menos 2 variantes')
+])
+def test_invalid_input_is_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_metrics_data(text)
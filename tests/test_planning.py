@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from abtesting.planning import calculate_mde, calculate_sample_size, plan_experiments
+from abtesting.stats import calculate_ab_test
+
+
+def _power(sessions, baseline_rate, treatment_rate, alpha=0.05):
+    """Power of the two-sided two-proportion z-test with calculate_ab_test's unpooled standard error."""
+    z_alpha = stats.norm.isf(alpha / 2)
+    spread = np.sqrt(baseline_rate * (1 - baseline_rate) + treatment_rate * (1 - treatment_rate))
+    return stats.norm.cdf(abs(treatment_rate - baseline_rate) * np.sqrt(sessions) / spread - z_alpha)
+
+@pytest.mark.parametrize('baseline_rate, mde', [(0.10, 0.10), (0.02, 0.20), (0.50, -0.05)])
+def test_sample_size_is_the_smallest_with_the_target_power(baseline_rate, mde):
+    sessions = calculate_sample_size(baseline_rate, mde)
+    treatment_rate = baseline_rate * (1 + mde)
+    assert _power(sessions, baseline_rate, treatment_rate) >= 0.8
+    assert _power(sessions - 1, baseline_rate, treatment_rate) < 0.8
+
+def test_mde_inverts_the_sample_size():
+    sessions = calculate_sample_size(0.05, 0.08, n_variants=3)
+    assert calculate_mde(sessions, 0.05, n_variants=3) == pytest.approx(0.08, rel=1e-3)
+    assert np.isnan(calculate_sample_size(0.5, 1.5))
+
+def test_mde_uses_the_ab_test_standard_error():
+    # Con las tasas esperadas, el z de calculate_ab_test es exactamente z_alpha + z_power
+    difference = calculate_mde(10000, 0.1, relative=False)
+    result = calculate_ab_test(10000, 1000, 10000, 10000 * (0.1 + difference), p2bb_method='montecarlo')
+    assert result['z_score'] == pytest.approx(stats.norm.isf(0.025) + stats.norm.ppf(0.8))
+
+def test_grid_matches_pointwise_calls():
+    plan = plan_experiments([0.05, 0.1], [0.05, 0.1], n_variants=(2, 4), daily_sessions=10000)
+    assert len(plan) == 8
+    for row in plan.itertuples():
+        expected = calculate_sample_size(row.baseline_rate, row.mde, row.n_variants)
+        assert row.sessions_per_variant == expected
+        assert row.days == np.ceil(expected * row.n_variants / 10000)
+    # Bonferroni: más variantes piden más sesiones por variante
+    by_variants = plan.groupby('n_variants')['sessions_per_variant'].sum()
+    assert by_variants[4] > by_variants[2]
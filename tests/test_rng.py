@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from abtesting.bayes import calculate_p2bb, calculate_p2bb_matrix
+from abtesting.rng import derive_rng
+from abtesting.stats import calculate_table_results
+
+
+def _table():
+    return pd.DataFrame([
+        ('E', 'A2C', 'A', 3000, 300), ('E', 'A2C', 'B', 3000, 330),
+        ('E', 'Pay', 'A', 3000, 90), ('E', 'Pay', 'B', 3000, 100), ('E', 'Pay', 'C', 3000, 80)
+    ], columns=['experiment', 'metric', 'variant', 'sessions', 'conversions'])
+
+def test_streams_depend_only_on_key_and_seed():
+    np.random.seed(123)
+    first = derive_rng('E', 'A2C').random(5)
+    np.random.random(10)
+    assert np.array_equal(derive_rng('E', 'A2C').random(5), first)
+    assert not np.array_equal(derive_rng('E', 'Pay').random(5), first)
+    assert not np.array_equal(derive_rng('E', 'A2C', seed=1).random(5), first)
+
+def test_default_montecarlo_streams_are_derived_from_the_counts():
+    assert calculate_p2bb(1000, 100, 1000, 110, method='montecarlo') == calculate_p2bb(
+        1000, 100, 1000, 110, method='montecarlo'
+    )
+    assert np.array_equal(
+        calculate_p2bb_matrix([1000, 1000], [100, 110], method='montecarlo'),
+        calculate_p2bb_matrix([1000, 1000], [100, 110], method='montecarlo')
+    )
+
+def test_table_results_do_not_depend_on_metric_order():
+    table = _table()
+    results = calculate_table_results(table, p2bb_method='montecarlo')
+    reordered = calculate_table_results(table.iloc[[2, 3, 4, 0, 1]], p2bb_method='montecarlo')
+    by_metric = reordered['pairs'].set_index(['metric', 'variant_a', 'variant_b'])
+    expected = results['pairs'].set_index(['metric', 'variant_a', 'variant_b'])
+    pd.testing.assert_series_equal(by_metric.loc[expected.index, 'p2bb'], expected['p2bb'])
+    
+    reseeded = calculate_table_results(table, p2bb_method='montecarlo', seed=1)
+    assert not np.array_equal(reseeded['pairs']['p2bb'], results['pairs']['p2bb'])
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from abtesting.analysis import analyze_table
+from abtesting.ingest import SEGMENT_TOTAL, segment_table
+from abtesting.stats import calculate_pairwise_matrix
+
+
+def _table():
+    rows = []
+    for device, country, sessions, rates in (
+        ('Mobile', 'CO', 2000, (0.10, 0.12)), ('Mobile', 'MX', 1500, (0.08, 0.09)),
+        ('Desktop', 'CO', 1000, (0.15, 0.14)), ('Desktop', 'MX', 800, (0.20, 0.22))
+    ):
+        for variant, rate in zip(('A', 'B'), rates):
+            rows.append(('E', 'A2C', variant, sessions, int(sessions * rate), device, country))
+    return pd.DataFrame(rows, columns=['experiment', 'metric', 'variant', 'sessions', 'conversions', 'device', 'country'])
+
+def test_segment_table_stacks_total_dimensions_and_combinations():
+    segmented = segment_table(_table())
+    segments = list(segmented['segment'].cat.categories)
+    assert segments == [
+        SEGMENT_TOTAL, 'device=Mobile', 'device=Desktop', 'country=CO', 'country=MX',
+        'device=Mobile · country=CO', 'device=Mobile · country=MX',
+        'device=Desktop · country=CO', 'device=Desktop · country=MX'
+    ]
+    assert 'device' not in segmented.columns
+    
+    mobile = segmented[segmented['segment'] == 'device=Mobile']
+    assert list(mobile['sessions']) == [3500, 3500]
+    assert list(mobile['conversions']) == [200 + 120, 240 + 135]
+    total = segmented[segmented['segment'] == SEGMENT_TOTAL]
+    assert list(total['sessions']) == [5300, 5300]
+
+def test_every_segment_is_analysed_in_one_pass():
+    segmented = segment_table(_table(), dimensions=['device'], include_total=False)
+    pairs = analyze_table(segmented, correction='none')['pairs']
+    assert list(pairs['segment']) == ['device=Mobile', 'device=Desktop']
+    
+    rows = segmented[segmented['segment'] == 'device=Desktop']
+    matrix = calculate_pairwise_matrix(rows['sessions'], rows['conversions'])
+    assert pairs['p_value'].iloc[1] == matrix['p_value'][0, 1]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from abtesting.sequential import SEQUENTIAL_MIXTURE_SD, calculate_sequential_test, sequential_decision
+
+
+def test_single_look_matches_the_mixture_likelihood_ratio():
+    n, x = np.array([[20000, 20000]]), np.array([[2000, 2200]])
+    result = calculate_sequential_test(n, x)
+    rate = x[0] / n[0]
+    variance = np.sum(rate * (1 - rate) / n[0])
+    difference = rate[1] - rate[0]
+    tau_sq = SEQUENTIAL_MIXTURE_SD ** 2
+    likelihood_ratio = np.sqrt(variance / (variance + tau_sq)) * np.exp(
+        tau_sq * difference ** 2 / (2 * variance * (variance + tau_sq))
+    )
+    assert result['p_value'][0, 0, 1] == pytest.approx(min(1, 1 / likelihood_ratio))
+    assert result['difference'][0, 0, 1] == pytest.approx(difference)
+    # El 0 queda fuera de la secuencia de confianza justo cuando el p-value es menor que alpha
+    assert (result['lower'][0, 0, 1] > 0) == bool(result['significant'][0, 0, 1])
+
+def test_p_values_and_confidence_sequence_only_tighten():
+    rng = np.random.default_rng(5)
+    n = np.cumsum(np.full((30, 3), 500), axis=0)
+    x = np.cumsum(rng.binomial(500, [0.10, 0.10, 0.13], size=(30, 3)), axis=0)
+    result = calculate_sequential_test(n, x)
+    assert (np.diff(result['p_value'], axis=0) <= 0).all()
+    assert (np.diff(result['lower'], axis=0) >= 0).all()
+    assert (np.diff(result['upper'], axis=0) <= 0).all()
+    
+    decision = sequential_decision(result, 0, 2)
+    assert decision['decision'] == 'stop_winner'
+    assert sequential_decision(result, 2, 0)['decision'] == 'stop_loser'
+
+def test_continuous_monitoring_keeps_the_false_positive_rate():
+    rng = np.random.default_rng(8)
+    # 400 experimentos A/A mirados en 50 looks cada uno
+    n = np.cumsum(np.full((50, 400, 2), 200), axis=0)
+    x = np.cumsum(rng.binomial(200, 0.1, size=(50, 400, 2)), axis=0)
+    result = calculate_sequential_test(n, x)
+    false_positives = np.mean(result['stop_look'][:, 0, 1] >= 0)
+    assert false_positives <= 0.05 + 0.02
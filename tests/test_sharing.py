@@ -0,0 +1,34 @@
+import base64
+import json
+
+from abtesting.parsing import parse_metrics_data
+from abtesting.sharing import COMPACT_FORMAT_PREFIX, decode_data_from_url, encode_data_to_url
+
+
+def _experiment(n_metrics=20, n_variants=4):
+    lines = ["EXP-9 - Large experiment", ""]
+    for metric in range(n_metrics):
+        lines.append(f"[Metric {metric}]")
+        lines.extend(f"Variant-{v} {100000 + 37 * metric + v} {5000 + 11 * metric + v}" for v in range(n_variants))
+        lines.append("")
+    return parse_metrics_data("\n".join(lines))
+
+def test_compact_encoding_roundtrips():
+    data = _experiment()
+    encoded = encode_data_to_url(data)
+    assert encoded.startswith(COMPACT_FORMAT_PREFIX)
+    assert decode_data_from_url(encoded) == data
+    
+    untitled = data['metrics']
+    assert decode_data_from_url(encode_data_to_url(untitled)) == untitled
+
+def test_compact_encoding_is_much_shorter_than_json():
+    data = _experiment()
+    legacy = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+    assert len(encode_data_to_url(data)) * 4 < len(legacy)
+
+def test_legacy_and_invalid_links():
+    data = _experiment(2, 2)
+    legacy = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+    assert decode_data_from_url(legacy) == data
+    assert decode_data_from_url(COMPACT_FORMAT_PREFIX + 'not-valid') is None
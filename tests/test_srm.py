@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from abtesting.analysis import analyze_table
+from abtesting.srm import calculate_srm_batch, calculate_table_srm
+
+
+def _table(rows):
+    return pd.DataFrame(rows, columns=['experiment', 'metric', 'variant', 'sessions', 'conversions'])
+
+def test_srm_batch_matches_chisquare():
+    n = np.array([[5000, 5210], [1000, 1000], [3000, 2000]])
+    weights = [0.6, 0.4]
+    result = calculate_srm_batch(n, weights)
+    for row, chi2, p_value in zip(n, result['chi2'], result['p_value']):
+        expected = row.sum() * np.array(weights)
+        reference = stats.chisquare(row, expected)
+        assert chi2 == pytest.approx(reference.statistic)
+        assert p_value == pytest.approx(reference.pvalue)
+
+def test_table_srm_keeps_metric_order_and_dict_weights():
+    table = _table([
+        ('E1', 'A2C', 'A', 1000, 100), ('E1', 'A2C', 'B', 1010, 110),
+        ('E2', 'Pay', 'A', 1000, 50), ('E2', 'Pay', 'B', 500, 40), ('E2', 'Pay', 'C', 510, 45),
+        ('E3', 'Pay', 'A', 2000, 50), ('E3', 'Pay', 'B', 1000, 60)
+    ])
+    srm = calculate_table_srm(table)
+    assert list(srm['experiment']) == ['E1', 'E2', 'E3']
+    assert list(srm['srm_mismatch']) == [False, True, True]
+    
+    # Con los pesos por nombre el split 2:1:1 / 2:1 es el esperado y el 50/50 pasa a ser el mismatch
+    weighted = calculate_table_srm(table, {'A': 2, 'B': 1, 'C': 1})
+    assert list(weighted['srm_mismatch']) == [True, False, False]
+    with pytest.raises(ValueError, match='C'):
+        calculate_table_srm(table, {'A': 2, 'B': 1})
+
+def test_analyze_table_skips_flagged_experiments():
+    table = _table([
+        ('E1', 'A2C', 'A', 1000, 100), ('E1', 'A2C', 'B', 1010, 110),
+        ('E2', 'A2C', 'A', 2000, 100), ('E2', 'A2C', 'B', 1000, 60)
+    ])
+    results = analyze_table(table)
+    assert list(results['srm']['skipped']) == [False, True]
+    assert set(results['pairs']['experiment']) == {'E1'}
+    
+    kept = analyze_table(table, skip_srm=False)
+    assert set(kept['pairs']['experiment']) == {'E1', 'E2'}
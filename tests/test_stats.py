@@ -0,0 +1,66 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency
+
+from abtesting.stats import (
+    calculate_all_pairwise_comparisons,
+    calculate_chi_square_batch,
+    calculate_pairwise_matrix,
+    calculate_single_comparison,
+    calculate_table_results,
+)
+
+VARIANTS = [
+    {'name': 'D', 'n': 20, 'x': 0},
+    {'name': 'A', 'n': 5000, 'x': 500},
+    {'name': 'B', 'n': 5100, 'x': 560},
+    {'name': 'C', 'n': 4900, 'x': 470}
+]
+
+
+def test_matrix_matches_single_comparisons():
+    matrix = calculate_pairwise_matrix([v['n'] for v in VARIANTS], [v['x'] for v in VARIANTS])
+    for i, j in combinations(range(len(VARIANTS)), 2):
+        single = calculate_single_comparison(VARIANTS[i], VARIANTS[j])
+        assert matrix['p_value'][i, j] == pytest.approx(single['p_value'])
+        assert matrix['p2bb'][i, j] == pytest.approx(single['p2bb'], abs=1e-9)
+        assert bool(matrix['significant'][i, j]) == single['significant']
+        assert matrix['relative_lift'][i, j] == pytest.approx(single['relative_lift'])
+    # Lift indefinido con A en cero (D primero): ambas versiones lo dejan en 0
+    assert np.array_equal(matrix['relative_lift'][0, 1:], np.zeros(len(VARIANTS) - 1))
+
+def test_all_pairwise_comparisons_come_from_the_matrix():
+    comparisons = calculate_all_pairwise_comparisons(VARIANTS)
+    assert [(c['variant_a_name'], c['variant_b_name']) for c in comparisons] == [
+        (a['name'], b['name']) for a, b in combinations(VARIANTS, 2)
+    ]
+    assert [c['is_control_comparison'] for c in comparisons] == [True, True, True, False, False, False]
+
+@pytest.mark.parametrize('size', [2, 3])
+def test_chi_square_batch_matches_scipy(size):
+    n = np.array([[5000, 5100, 4900], [100, 120, 90]])[:, :size]
+    x = np.array([[500, 560, 470], [3, 9, 4]])[:, :size]
+    batch = calculate_chi_square_batch(n, x)
+    for k in range(len(n)):
+        chi2, p_value, dof, _ = chi2_contingency([x[k], n[k] - x[k]])
+        assert batch['chi2'][k] == pytest.approx(chi2)
+        assert batch['p_value'][k] == pytest.approx(p_value)
+        assert batch['dof'] == dof
+
+def test_table_results_stack_metrics_of_any_size():
+    table = pd.DataFrame(
+        [('E', 'Two', v['name'], v['n'], v['x']) for v in VARIANTS[:2]]
+        + [('E', 'Four', v['name'], v['n'], v['x']) for v in VARIANTS],
+        columns=['experiment', 'metric', 'variant', 'sessions', 'conversions']
+    )
+    results = calculate_table_results(table)
+    assert list(results['metrics']['metric']) == ['Two', 'Four']
+    assert list(results['pairs']['metric']) == ['Two'] + ['Four'] * 6
+    
+    matrix = calculate_pairwise_matrix([v['n'] for v in VARIANTS], [v['x'] for v in VARIANTS])
+    four = results['pairs'][results['pairs']['metric'] == 'Four']
+    first, second = np.triu_indices(len(VARIANTS), 1)
+    assert np.allclose(four['p_value'], matrix['p_value'][first, second])
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+
+from abtesting.parsing import parse_metrics_data
+from abtesting.stats import calculate_metric_statistics
+from abtesting.store import DEFAULT_STORE_PATH, SHARE_ID_LENGTH, experiment_id, load_experiment, results_key, save_experiment
+
+DATA = parse_metrics_data("EXP-3\n\n[A2C]\nA 1000 100\nB 1000 120\n")
+
+
+def test_identical_data_gets_the_same_short_id():
+    exp_id = save_experiment(DATA)
+    assert len(exp_id) == SHARE_ID_LENGTH
+    assert save_experiment(parse_metrics_data("EXP-3\n\n[A2C]\nA 1000 100\nB 1000 120\n")) == exp_id
+    assert experiment_id(parse_metrics_data("EXP-3\n\n[A2C]\nA 1000 100\nB 1000 121\n")) != exp_id
+
+def test_results_are_stored_with_numpy_arrays():
+    counts = ((1000, 100), (1000, 120))
+    statistics = calculate_metric_statistics(counts)
+    exp_id = save_experiment(DATA, {results_key(counts, 'exact'): statistics})
+    
+    data, results = load_experiment(exp_id)
+    assert data == DATA
+    stored = results[results_key(counts, 'exact')]
+    assert np.array_equal(stored['matrix']['p2bb'], statistics['matrix']['p2bb'])
+    assert stored['chi_square']['p_value'] == statistics['chi_square']['p_value']
+
+def test_unknown_id():
+    assert load_experiment('missing') == (None, None)
+
+def test_default_path_is_outside_the_working_directory():
+    assert os.path.isabs(DEFAULT_STORE_PATH)
+    assert os.path.dirname(DEFAULT_STORE_PATH).endswith('abtesting')
+
+def test_missing_store_directory_is_created(tmp_path):
+    path = str(tmp_path / 'nested' / 'store.sqlite3')
+    exp_id = save_experiment(DATA, path=path)
+    assert load_experiment(exp_id, path=path)[0] == DATA
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from abtesting.stats import calculate_pairwise_matrix
+from abtesting.stratified import calculate_cmh_matrix, calculate_stratified_results
+
+# Paradoja de Simpson: B gana en cada país pero recibe más tráfico del país que convierte peor
+N = np.array([[2000, 8000], [8000, 2000]])
+X = np.array([[200, 1040], [2400, 700]])
+
+
+def _reference(n, x):
+    """CMH chi-square (with continuity correction) and MH odds ratio, one 2×2 table at a time."""
+    deviation = variance = numerator = denominator = 0.0
+    for (n_a, n_b), (c, a) in zip(n, x):
+        b, d = n_b - a, n_a - c
+        total = n_a + n_b
+        deviation += a - n_b * (a + c) / total
+        variance += n_b * n_a * (a + c) * (b + d) / (total ** 2 * (total - 1))
+        numerator += a * d / total
+        denominator += b * c / total
+    return (abs(deviation) - 0.5) ** 2 / variance, numerator / denominator
+
+def test_cmh_matches_the_per_stratum_reference():
+    result = calculate_cmh_matrix(N, X)
+    chi2, odds_ratio = _reference(N, X)
+    assert result['cmh_chi2'][0, 1] == pytest.approx(chi2)
+    assert result['odds_ratio'][0, 1] == pytest.approx(odds_ratio)
+    assert result['odds_ratio'][1, 0] == pytest.approx(1 / odds_ratio)
+    assert result['odds_ratio_lower'][0, 1] < odds_ratio < result['odds_ratio_upper'][0, 1]
+    assert result['strata'][0, 1] == 2
+
+def test_stratification_reverses_a_simpsons_paradox():
+    pooled = calculate_pairwise_matrix(N.sum(axis=0), X.sum(axis=0))
+    stratified = calculate_cmh_matrix(N, X)
+    assert pooled['relative_lift'][0, 1] < 0
+    assert stratified['relative_lift'][0, 1] > 0
+    assert stratified['lift_lower'][0, 1] > 0
+
+def test_stratified_results_from_a_table():
+    rows = []
+    for country, (n_a, n_b), (x_a, x_b) in zip(('CO', 'MX'), N, X):
+        rows += [('E', 'A2C', 'A', n_a, x_a, country), ('E', 'A2C', 'B', n_b, x_b, country)]
+    # Una variante que solo aparece en un estrato cuenta como vacía en los demás
+    rows.append(('E', 'A2C', 'C', 500, 60, 'CO'))
+    table = pd.DataFrame(rows, columns=['experiment', 'metric', 'variant', 'sessions', 'conversions', 'country'])
+    table['country'] = table['country'].astype('category')
+    
+    results = calculate_stratified_results(table, 'country')
+    assert list(zip(results['variant_a'], results['variant_b'])) == [('A', 'B'), ('A', 'C'), ('B', 'C')]
+    assert results['p_value'].iloc[0] == pytest.approx(calculate_cmh_matrix(N, X)['p_value'][0, 1])
+    with pytest.raises(ValueError, match='device'):
+        calculate_stratified_results(table, 'device')
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from abtesting import analyze_table, calculate_table_srm, collapse_periods, series_from_table
+from abtesting.stats import calculate_pairwise_matrix
+from abtesting.timeseries import calculate_trajectory, update_trajectory
+
+
+def _daily_table(days=6):
+    rng = np.random.default_rng(3)
+    rows = []
+    for day in pd.date_range('2026-01-01', periods=days):
+        for metric in ('A2C', 'Pay'):
+            # Split parejo por día, para que el SRM no descarte el experimento
+            sessions = int(rng.integers(900, 1100))
+            for variant, rate in (('A', 0.10), ('B', 0.11)):
+                rows.append(('E', metric, variant, sessions, int(rng.binomial(sessions, rate)), day))
+    return pd.DataFrame(rows, columns=['experiment', 'metric', 'variant', 'sessions', 'conversions', 'date'])
+
+@pytest.mark.parametrize('method', ['exact', 'montecarlo'])
+def test_extending_a_trajectory_equals_a_full_recompute(method):
+    series = series_from_table(_daily_table())['A2C']
+    dates, n, x = series['dates'], series['n'], series['x']
+    full = calculate_trajectory(dates, n, x, p2bb_method=method)
+    partial = calculate_trajectory(dates[:4], n[:4], x[:4], p2bb_method=method)
+    extended = update_trajectory(partial, dates, n, x, p2bb_method=method)
+    assert extended.keys() == full.keys()
+    for key in full:
+        assert np.array_equal(extended[key], full[key], equal_nan=key != 'dates'), key
+
+def test_last_trajectory_point_is_the_snapshot():
+    series = series_from_table(_daily_table())['Pay']
+    trajectory = calculate_trajectory(series['dates'], series['n'], series['x'])
+    snapshot = calculate_pairwise_matrix(series['n'].sum(axis=0), series['x'].sum(axis=0))
+    for key in ('rate', 'relative_lift', 'p_value', 'p2bb'):
+        assert np.allclose(trajectory[key][-1], snapshot[key], equal_nan=True), key
+
+def test_time_series_table_is_analysed_as_its_totals():
+    table = _daily_table()
+    totals = collapse_periods(table)
+    assert len(totals) == 4 and 'date' not in totals.columns
+    
+    daily = analyze_table(table)
+    aggregated = analyze_table(totals)
+    assert len(daily['pairs']) == 2
+    pd.testing.assert_frame_equal(daily['pairs'], aggregated['pairs'])
+    pd.testing.assert_frame_equal(calculate_table_srm(table), calculate_table_srm(totals))